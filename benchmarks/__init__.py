@@ -0,0 +1,121 @@
+"""
+Standalone performance benchmarks for BloodConnect.
+
+Run them from the project root as modules, e.g. ``python -m benchmarks.query_plans``.
+Each benchmark works on a throwaway test database and never touches db.sqlite3.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Configure Django for a standalone benchmark script."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bloodconnect.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def temporary_database():
+    """Create and migrate a test database for the duration of the block."""
+    from django.db import connection
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextmanager
+def timed(label):
+    """Print how long the block took."""
+    start = time.perf_counter()
+    yield
+    print(f'{label}: {time.perf_counter() - start:.2f}s')
+
+
+def seed_blood_requests(total, requesters=1000, batch_size=10000):
+    """Bulk insert ``total`` blood requests spread over ``requesters`` receiver accounts."""
+    from bloodconnectapp.models import User, DonorProfile, BloodRequest
+
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f'bench_receiver{i}',
+                email=f'bench_receiver{i}@example.com',
+                user_type='receiver',
+                city=f'City {i % 200}',
+                first_name='Receiver',
+                last_name=str(i),
+                password='!',
+            )
+            for i in range(requesters)
+        ],
+        batch_size=batch_size,
+    )
+    blood_groups = [code for code, _ in DonorProfile.BLOOD_GROUP_CHOICES]
+    urgencies = [code for code, _ in BloodRequest.URGENCY_CHOICES]
+    statuses = ['pending', 'accepted', 'completed', 'cancelled']
+    today = date.today()
+    for start in range(0, total, batch_size):
+        BloodRequest.objects.bulk_create(
+            [
+                BloodRequest(
+                    requester=users[i % requesters],
+                    blood_group=blood_groups[i % len(blood_groups)],
+                    urgency=urgencies[i % len(urgencies)],
+                    status=statuses[(i // 7) % len(statuses)],
+                    units_needed=1 + i % 5,
+                    hospital_name=f'Hospital {i % 500}',
+                    hospital_address='1 Main Road',
+                    reason='Surgery',
+                    required_date=today + timedelta(days=i % 30),
+                )
+                for i in range(start, min(start + batch_size, total))
+            ]
+        )
+    return users
+
+
+def seed_donors(total, batch_size=10000):
+    """Bulk insert ``total`` donor accounts with profiles."""
+    from bloodconnectapp.models import User, DonorProfile
+
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f'bench_donor{i}',
+                email=f'bench_donor{i}@example.com',
+                user_type='donor',
+                city=f'City {i % 200}',
+                password='!',
+            )
+            for i in range(total)
+        ],
+        batch_size=batch_size,
+    )
+    blood_groups = [code for code, _ in DonorProfile.BLOOD_GROUP_CHOICES]
+    DonorProfile.objects.bulk_create(
+        [
+            DonorProfile(
+                user=user,
+                blood_group=blood_groups[i % len(blood_groups)],
+                gender='MF'[i % 2],
+                age=18 + i % 47,
+                is_available=i % 3 != 0,
+            )
+            for i, user in enumerate(users)
+        ],
+        batch_size=batch_size,
+    )
+    return users
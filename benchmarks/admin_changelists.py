@@ -0,0 +1,90 @@
+"""
+Time the admin changelists of the largest tables, as configured and with
+Django's stock settings (exact COUNT(*), full result count, date_hierarchy).
+
+    python -m benchmarks.admin_changelists --requests 1000000 --donors 200000
+
+Seeds the tables with bulk inserts, logs in a superuser, and reports the
+median milliseconds of each changelist page through the test client.
+"""
+
+import argparse
+import statistics
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+from benchmarks import setup_django, temporary_database, timed, seed_blood_requests, seed_donors
+
+PAGES = (
+    ('blood requests', 'bloodrequest', {}),
+    ('  pending', 'bloodrequest', {'status__exact': 'pending'}),
+    ('  past 7 days', 'bloodrequest', {'within': '7'}),
+    ('donors', 'donorprofile', {}),
+    ('  A+ available', 'donorprofile', {'blood_group__exact': 'A+', 'is_available__exact': '1'}),
+    ('  search', 'donorprofile', {'q': 'bench_donor12'}),
+)
+
+
+def stock_settings():
+    """Patch the large-table admins back to Django's defaults."""
+    from django.core.paginator import Paginator
+
+    from bloodconnectapp import admin
+
+    stack = ExitStack()
+    for model_admin in (admin.BloodRequestAdmin, admin.DonorProfileAdmin):
+        stack.enter_context(mock.patch.object(model_admin, 'paginator', Paginator))
+        stack.enter_context(mock.patch.object(model_admin, 'show_full_result_count', True))
+        stack.enter_context(mock.patch.object(model_admin, 'prefix_search_fields', ()))
+    stack.enter_context(mock.patch.object(admin.BloodRequestAdmin, 'date_hierarchy', 'created_at'))
+    return stack
+
+
+def measure(client, url, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, params)
+        samples.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise SystemExit(f'{url} returned {response.status_code}')
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=1_000_000, help='blood requests to seed')
+    parser.add_argument('--donors', type=int, default=200_000, help='donors to seed')
+    parser.add_argument('--repeat', type=int, default=5, help='loads per page')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    from bloodconnectapp.models import User
+
+    setup_test_environment()
+    with temporary_database() as connection:
+        with timed(f'seeded {args.requests} requests and {args.donors} donors'):
+            seed_blood_requests(args.requests)
+            seed_donors(args.donors)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        admin_user = User.objects.create_superuser('bench_admin', 'bench_admin@example.com', 'x', user_type='admin')
+        client = Client()
+        client.force_login(admin_user)
+
+        print(f'{"changelist":<20}{"configured":>12}{"stock":>12}')
+        for label, model, params in PAGES:
+            url = reverse(f'admin:bloodconnectapp_{model}_changelist')
+            configured = measure(client, url, params, args.repeat)
+            with stock_settings():
+                stock = measure(client, url, params, args.repeat)
+            print(f'{label:<20}{configured:>9.1f} ms{stock:>9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Render time of a request list page of 500 cards with the card fragment cache
+cold and warm, against rendering every card inline.
+
+    python -m benchmarks.card_cache --cards 500 --repeat 20
+
+Calls the request_list view directly with a page size of ``--cards``, so the
+numbers include the page query and the whole template but not middleware.
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django, temporary_database, seed_blood_requests
+
+
+def measure(view, request, repeat, before=None):
+    """Median milliseconds per call of ``view(request)``, running ``before`` untimed ahead of each call."""
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        view(request).content
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=500, help='cards on the page')
+    parser.add_argument('--repeat', type=int, default=20, help='renders per measurement')
+    args = parser.parse_args()
+
+    setup_django()
+    from unittest import mock
+
+    from django.core.cache import cache
+    from django.template.loader import get_template
+    from django.test import RequestFactory
+
+    from bloodconnectapp import fragments, views
+
+    def render_inline(template_name, blood_requests):
+        template = get_template(template_name)
+        for blood_request in blood_requests:
+            blood_request.card_html = template.render({'request': blood_request})
+        return blood_requests
+
+    with temporary_database():
+        # Every fourth seeded request is pending, so seed enough for a full page.
+        seed_blood_requests(args.cards * 4)
+        request = RequestFactory().get('/requests/')
+        views.REQUESTS_PER_PAGE = args.cards
+        cards = views.request_list(request).content.count(b'Blood Needed</h5>')
+        if cards != args.cards:
+            raise SystemExit(f'expected {args.cards} cards on the page, got {cards}')
+
+        with mock.patch.object(fragments, 'render_cards', render_inline):
+            inline = measure(views.request_list, request, args.repeat)
+        cold = measure(views.request_list, request, args.repeat, before=cache.clear)
+        views.request_list(request)
+        warm = measure(views.request_list, request, args.repeat)
+
+    print(f'\n=== request_list, {args.cards} cards, median of {args.repeat} ===')
+    print(f'{"no fragment cache":<24}{inline:>10.1f} ms')
+    print(f'{"cold fragment cache":<24}{cold:>10.1f} ms')
+    print(f'{"warm fragment cache":<24}{warm:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
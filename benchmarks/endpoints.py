@@ -0,0 +1,272 @@
+"""
+Latency percentiles, query counts and peak memory for every URL in
+bloodconnectapp/urls.py, driven through the Django test client against a
+database filled by ``manage.py seed``, reported as JSON.
+
+    python -m benchmarks.endpoints --requests 100000 --iterations 50 --output before.json
+    python -m benchmarks.endpoints --requests 100000 --iterations 50 --baseline before.json
+
+The same --requests and --seed always produce the same rows, so reports from
+two commits can be diffed field by field; --baseline prints the change per
+endpoint. Every request runs in a transaction that is rolled back afterwards,
+so requests that accept, complete or cancel see the same data each time. Each
+endpoint is warmed up first, so caches are warm. Login rate limits are lifted
+while the benchmark runs, so the login figure is the cost of hashing.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+from benchmarks import BASE_DIR, setup_django, temporary_database, timed
+
+Scenario = namedtuple('Scenario', 'method user args data')
+
+PASSWORD = 'bloodconnect'
+
+
+class Rollback(Exception):
+    pass
+
+
+def fixtures():
+    """The users and requests the scenarios act on, picked from the seeded data."""
+    from bloodconnectapp.matching import COMPATIBLE_DONORS
+    from bloodconnectapp.models import User, DonorProfile, BloodRequest
+
+    pending = BloodRequest.objects.filter(status='pending').select_related('requester').order_by('-id').first()
+    accepted = BloodRequest.objects.filter(status='accepted').select_related('requester').order_by('-id').first()
+    if pending is None or accepted is None:
+        raise SystemExit('The seeded data has no pending or no accepted request; seed more --requests.')
+    donor = (
+        DonorProfile.objects.eligible().filter(blood_group__in=COMPATIBLE_DONORS[pending.blood_group])
+        .select_related('user').order_by('id').first()
+    )
+    if donor is None:
+        raise SystemExit('The seeded data has no eligible donor for the pending request; seed more --donors.')
+    new_donor = User.objects.create_user(
+        username='benchmark_new_donor', email='benchmark.new.donor@example.com', password=PASSWORD,
+        user_type='donor', city=pending.requester.city,
+    )
+    return {
+        'pending': pending.id,
+        'accepted': accepted.id,
+        'receiver': pending.requester,
+        'accepted_requester': accepted.requester,
+        'donor': donor.user,
+        'new_donor': new_donor,
+    }
+
+
+def scenarios(f):
+    """How to call each named URL: (method, user or None, URL args, query or form data)."""
+    receiver, donor = f['receiver'], f['donor']
+    return {
+        'home': Scenario('GET', None, [], {}),
+        'register': Scenario('GET', None, [], {}),
+        'login_view': Scenario('POST', None, [], {'email': receiver.email, 'password': PASSWORD}),
+        'logout_view': Scenario('GET', receiver, [], {}),
+        'profile': Scenario('GET', receiver, [], {}),
+        'edit_profile': Scenario('GET', receiver, [], {}),
+        'register_donor': Scenario('GET', f['new_donor'], [], {}),
+        'donor_profile': Scenario('GET', donor, [], {}),
+        'edit_donor_profile': Scenario('GET', donor, [], {}),
+        'request_list': Scenario('GET', None, [], {}),
+        'create_request': Scenario('GET', receiver, [], {}),
+        'request_events': Scenario('GET', None, [], {}),
+        'request_detail': Scenario('GET', None, [f['pending']], {}),
+        'accept_request': Scenario('POST', donor, [f['pending']], {}),
+        'complete_request': Scenario('POST', f['accepted_requester'], [f['accepted']], {}),
+        'cancel_request': Scenario('POST', receiver, [f['pending']], {}),
+        'api_request_list': Scenario('GET', None, [], {}),
+        'api_request_detail': Scenario('GET', None, [f['pending']], {}),
+        'api_accept_request': Scenario('POST', donor, [f['pending']], {}),
+        'api_complete_request': Scenario('POST', f['accepted_requester'], [f['accepted']], {}),
+        'api_cancel_request': Scenario('POST', receiver, [f['pending']], {}),
+        'api_donors': Scenario('GET', receiver, [], {'blood_group': 'A+', 'city': receiver.city}),
+        'metrics': Scenario('GET', None, [], {}),
+    }
+
+
+def url_names():
+    from bloodconnectapp import urls
+    return [pattern.name for pattern in urls.urlpatterns]
+
+
+def call(client, scenario, path, around=nullcontext):
+    """
+    Make one request, inside ``around()``, in a transaction that is rolled
+    back; return (seconds, response). Logging in is not included.
+    """
+    from django.db import transaction
+
+    client.logout()
+    if scenario.user is not None:
+        client.force_login(scenario.user)
+    try:
+        with transaction.atomic():
+            with around():
+                start = time.perf_counter()
+                response = client.generic(scenario.method, path, **request_options(scenario))
+                elapsed = time.perf_counter() - start
+            raise Rollback
+    except Rollback:
+        pass
+    return elapsed, response
+
+
+@contextmanager
+def peak_memory(result):
+    """Set ``result['bytes']`` to the most memory allocated at once inside the block."""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        result['bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+
+
+def request_options(scenario):
+    from urllib.parse import urlencode
+
+    if scenario.method == 'GET':
+        return {'QUERY_STRING': urlencode(scenario.data)}
+    return {'data': urlencode(scenario.data), 'content_type': 'application/x-www-form-urlencoded'}
+
+
+def measure(client, scenario, path, iterations, warmup):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        call(client, scenario, path)
+    samples = [call(client, scenario, path)[0] * 1000 for _ in range(iterations)]
+
+    # The log holds at most 9000 queries; start from empty so the count is not lost at the cap.
+    connection.queries_log.clear()
+    queries = CaptureQueriesContext(connection)
+    _, response = call(client, scenario, path, around=lambda: queries)
+    # Read now: the next request resets the log.
+    query_count = len(queries)
+    memory = {}
+    call(client, scenario, path, around=lambda: peak_memory(memory))
+
+    percentiles = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'method': scenario.method,
+        'path': path,
+        'status': response.status_code,
+        'p50_ms': round(percentiles[49], 3),
+        'p95_ms': round(percentiles[94], 3),
+        'p99_ms': round(percentiles[98], 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'queries': query_count,
+        'peak_memory_kib': round(memory['bytes'] / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, report, out):
+    """Print the change in each endpoint's p50, p95, p99 and query count from ``baseline`` to ``report``."""
+    out.write(f'\n{"endpoint":<24}{"p50 ms":>18}{"p95 ms":>18}{"p99 ms":>18}{"queries":>12}\n')
+    for name, result in report['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if before is None:
+            out.write(f'{name:<24}{"(new)":>18}\n')
+            continue
+        cells = ''.join(
+            f'{before[key]:>8.1f} -> {result[key]:<6.1f}' for key in ('p50_ms', 'p95_ms', 'p99_ms')
+        )
+        out.write(f'{name:<24}{cells}{before["queries"]:>5} -> {result["queries"]:<3}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=10_000, help='blood requests to seed (see manage.py seed)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the data')
+    parser.add_argument('--iterations', type=int, default=30, help='timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=3, help='untimed requests per endpoint first')
+    parser.add_argument('--only', action='append', help='benchmark only this URL name (repeatable)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='JSON report of an earlier run to compare with')
+    args = parser.parse_args()
+    if args.iterations < 2:
+        parser.error('--iterations must be at least 2')
+
+    setup_django()
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import Client, override_settings
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+
+    setup_test_environment()
+    # Server errors are reported in the results by status code, not as tracebacks.
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    with temporary_database() as connection, override_settings(
+        DEBUG=False,
+        BLOODCONNECT_RATE_LIMITS={rule: (sys.maxsize, period) for rule, (_, period) in settings.BLOODCONNECT_RATE_LIMITS.items()},
+    ):
+        with timed(f'seeded {args.requests} requests'):
+            call_command('seed', requests=args.requests, seed=args.seed, password=PASSWORD, verbosity=0)
+        plans = scenarios(fixtures())
+        missing = [name for name in url_names() if name not in plans]
+        if missing:
+            raise SystemExit(f'No benchmark scenario for URL names: {", ".join(missing)}')
+
+        client = Client(raise_request_exception=False)
+        endpoints = {}
+        for name in url_names():
+            if args.only and name not in args.only:
+                continue
+            scenario = plans[name]
+            path = reverse(f'bloodconnectapp:{name}', args=scenario.args)
+            endpoints[name] = measure(client, scenario, path, args.iterations, args.warmup)
+            result = endpoints[name]
+            print(
+                f'{name:<24}{result["status"]:>4}{result["p50_ms"]:>10.1f} ms p50{result["p99_ms"]:>10.1f} ms p99'
+                f'{result["queries"]:>5} queries',
+                file=sys.stderr,
+            )
+        vendor = connection.vendor
+
+    report = {
+        'commit': git_commit(),
+        'dataset': {'requests': args.requests, 'seed': args.seed},
+        'iterations': args.iterations,
+        'database': vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'endpoints': endpoints,
+    }
+    text = json.dumps(report, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(text)
+    else:
+        sys.stdout.write(text)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            compare(json.load(handle), report, sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Time the nightly shortage forecast over years of request history.
+
+    python -m benchmarks.forecast --requests 200000 --days 1095
+
+Seeds ``--requests`` requests over ``--days`` days with ``manage.py seed``,
+records whole blood stock for every seeded city and blood group, and reports
+the time of inventory.forecast() split into the database aggregate and the
+NumPy windowed aggregates.
+"""
+
+import argparse
+import time
+
+from benchmarks import setup_django, temporary_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200_000, help='blood requests to seed')
+    parser.add_argument('--days', type=int, default=3 * 365, help='days of history to spread them over')
+    parser.add_argument('--repeat', type=int, default=3, help='forecast runs; the fastest is reported')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.test import override_settings
+    from django.utils import timezone
+
+    from bloodconnectapp import inventory
+    from bloodconnectapp.models import BloodStock, DonorProfile, Location
+
+    with temporary_database(), override_settings(BLOODCONNECT_FORECAST={
+        'history_days': args.days, 'window_days': 28, 'recent_days': 7, 'shortage_days': 3,
+    }):
+        with timed(f'seeded {args.requests} requests over {args.days} days'):
+            call_command('seed', requests=args.requests, days=args.days, verbosity=0)
+        BloodStock.objects.bulk_create([
+            BloodStock(location=location, blood_group=blood_group, units=20)
+            for location in Location.objects.all() for blood_group, _ in DonorProfile.BLOOD_GROUP_CHOICES
+        ])
+
+        today = timezone.localdate()
+        aggregate = numpy = total = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            keys, matrix = inventory.daily_demand(today, args.days)
+            middle = time.perf_counter()
+            for window in (28, 7):
+                inventory.rolling_means(matrix, window)
+            end = time.perf_counter()
+            forecasts = inventory.forecast(today)
+            finish = time.perf_counter()
+            aggregate, numpy, total = min(aggregate, middle - start), min(numpy, end - middle), min(total, finish - end)
+
+        shortages = sum(forecast.shortage for forecast in forecasts)
+        print(f'{len(keys)} location/group series x {matrix.shape[1]} days, {shortages} shortages')
+        print(f'database aggregate: {aggregate * 1000:.1f} ms')
+        print(f'numpy windows:      {numpy * 1000:.1f} ms')
+        print(f'whole forecast:     {total * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Requests per second for the home page and the request list under each settings
+configuration, served by gunicorn from a seeded copy of the database.
+
+    python -m benchmarks.load_test --rows 100000 --duration 10 --concurrency 16
+
+Every configuration runs the same gunicorn command against the same SQLite
+file; only the environment read by bloodconnect/settings.py changes. The load
+generator runs in this process, so compare configurations with each other
+rather than reading the numbers as the server's ceiling.
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import BASE_DIR, setup_django, timed, seed_blood_requests, seed_donors
+
+CONFIGURATIONS = [
+    ('reconnect per request, rollback journal', {
+        'BLOODCONNECT_CONN_MAX_AGE': '0', 'BLOODCONNECT_SQLITE_WAL': '0', 'DJANGO_DEBUG': '1',
+    }),
+    ('persistent connections', {
+        'BLOODCONNECT_CONN_MAX_AGE': '600', 'BLOODCONNECT_SQLITE_WAL': '0', 'DJANGO_DEBUG': '1',
+    }),
+    ('persistent connections + WAL', {
+        'BLOODCONNECT_CONN_MAX_AGE': '600', 'BLOODCONNECT_SQLITE_WAL': '1', 'DJANGO_DEBUG': '1',
+    }),
+    ('production profile', {
+        'BLOODCONNECT_ENV': 'production', 'DJANGO_SECRET_KEY': 'load-test', 'DJANGO_DEBUG': '0',
+    }),
+]
+
+PAGES = [('home', '/'), ('request_list', '/requests/')]
+
+
+def seed(database_url, rows, donors):
+    os.environ['DATABASE_URL'] = database_url
+    setup_django()
+    from django.core.management import call_command
+    with timed(f'migrated and seeded {rows} requests and {donors} donors'):
+        call_command('migrate', verbosity=0)
+        seed_blood_requests(rows)
+        seed_donors(donors)
+    from django.db import connections
+    connections.close_all()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(environment, workers, threads):
+    port = free_port()
+    env = {**os.environ, **environment, 'DJANGO_SETTINGS_MODULE': 'bloodconnect.settings'}
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', 'bloodconnect.wsgi:application',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+            '--log-level', 'warning',
+        ],
+        cwd=BASE_DIR, env=env,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=5).read()
+            return server, base_url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn did not start within 30 seconds')
+
+
+def hammer(url, duration, concurrency):
+    """Fetch ``url`` from ``concurrency`` threads for ``duration`` seconds; return (requests/s, errors)."""
+    done = errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        nonlocal done, errors
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(url, timeout=30).read()
+                ok = True
+            except (urllib.error.URLError, ConnectionError):
+                ok = False
+            with lock:
+                done += ok
+                errors += not ok
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    return done / (time.monotonic() - started), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000, help='blood requests to seed')
+    parser.add_argument('--donors', type=int, default=10_000, help='donor profiles to seed')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of load per page and configuration')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent client threads')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f'sqlite:///{os.path.join(directory, "load_test.sqlite3")}'
+        seed(database_url, args.rows, args.donors)
+
+        results = {}
+        for name, environment in CONFIGURATIONS:
+            server, base_url = start_server({**environment, 'DATABASE_URL': database_url}, args.workers, args.threads)
+            try:
+                for page, path in PAGES:
+                    hammer(base_url + path, min(2, args.duration), args.concurrency)  # warm up
+                    results[name, page] = hammer(base_url + path, args.duration, args.concurrency)
+                    rate, errors = results[name, page]
+                    print(f'{name} / {page}: {rate:.1f} req/s, {errors} errors')
+            finally:
+                server.terminate()
+                server.wait()
+
+    print('\n=== requests per second ===')
+    print(f'{"configuration":<42}' + ''.join(f'{page:>14}' for page, _ in PAGES))
+    for name, _ in CONFIGURATIONS:
+        print(f'{name:<42}' + ''.join(f'{results[name, page][0]:>14.1f}' for page, _ in PAGES))
+
+
+if __name__ == '__main__':
+    main()
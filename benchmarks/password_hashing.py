@@ -0,0 +1,46 @@
+"""
+CPU time per login for each password hasher at its configured cost, so
+BLOODCONNECT_PASSWORD_HASHER and BLOODCONNECT_PASSWORD_COST can be tuned.
+
+    BLOODCONNECT_SCRYPT_WORK_FACTOR=16384 python -m benchmarks.password_hashing --repeat 5
+
+Times check_password(), which is what every login POST that gets past the rate
+limits pays. A worker can serve at most 1000 / ms logins per second per core.
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='checks per hasher')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.hashers import check_password, make_password
+    from django.utils.module_loading import import_string
+
+    print(f'{"hasher":<10}{"ms per login":>14}{"logins/s/core":>16}  cost')
+    for name, path in settings.PASSWORD_HASHER_CHOICES.items():
+        try:
+            encoded = make_password('correct horse battery staple', hasher=import_string(path).algorithm)
+        except ValueError as exc:
+            print(f'{name:<10}  skipped: {exc}')
+            continue
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            check_password('correct horse battery staple', encoded)
+            samples.append((time.perf_counter() - start) * 1000)
+        median = statistics.median(samples)
+        cost = settings.BLOODCONNECT_PASSWORD_COST.get(name, {})
+        print(f'{name:<10}{median:>14.1f}{1000 / median:>16.1f}  {cost}')
+
+
+if __name__ == '__main__':
+    main()
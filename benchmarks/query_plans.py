@@ -0,0 +1,108 @@
+"""
+Report query plans and timings for the hot BloodRequest/DonorProfile filters
+with and without the indexes declared in bloodconnectapp.models.
+
+    python -m benchmarks.query_plans --rows 1000000 --donors 100000
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django, temporary_database, timed, seed_blood_requests, seed_donors
+
+
+def hot_queries():
+    """(label, queryset, mode) for the filters the views run on every hit."""
+    from bloodconnectapp.models import DonorProfile, BloodRequest
+
+    pending = BloodRequest.objects.filter(status='pending')
+    return [
+        ('home: pending count', pending, 'count'),
+        ('home: recent pending', pending.order_by('-created_at')[:6], 'list'),
+        ('list: blood_group', pending.filter(blood_group='O-').order_by('-created_at')[:50], 'list'),
+        ('list: urgency', pending.filter(urgency='emergency').order_by('-created_at')[:50], 'list'),
+        ('list: city', pending.filter(requester__city__icontains='City 7').order_by('-created_at')[:50], 'list'),
+        ('profile: by status', BloodRequest.objects.filter(status='completed').order_by('-created_at')[:50], 'list'),
+        ('match: donors', DonorProfile.objects.filter(blood_group__in=['O-', 'O+'], is_available=True), 'count'),
+    ]
+
+
+def run(queryset, mode, repeat):
+    """Median wall time in milliseconds of evaluating ``queryset`` ``repeat`` times."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if mode == 'count':
+            queryset.count()
+        else:
+            list(queryset.all())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def report(title, repeat):
+    print(f'\n=== {title} ===')
+    results = {}
+    for label, queryset, mode in hot_queries():
+        results[label] = run(queryset, mode, repeat)
+        print(f'\n{label}: {results[label]:.2f} ms')
+        print('  ' + queryset.explain().replace('\n', '\n  '))
+    return results
+
+
+def indexed_models():
+    from bloodconnectapp.models import DonorProfile, BloodRequest
+    return [DonorProfile, BloodRequest]
+
+
+def drop_indexes(connection):
+    with connection.schema_editor() as editor:
+        for model in indexed_models():
+            for index in model._meta.indexes:
+                editor.remove_index(model, index)
+
+
+def create_indexes(connection):
+    with connection.schema_editor() as editor:
+        for model in indexed_models():
+            for index in model._meta.indexes:
+                editor.add_index(model, index)
+
+
+def analyze(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='blood requests to seed')
+    parser.add_argument('--donors', type=int, default=100_000, help='donor profiles to seed')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per query, the median is reported')
+    args = parser.parse_args()
+
+    setup_django()
+    with temporary_database() as connection:
+        with timed(f'seeded {args.rows} requests and {args.donors} donors'):
+            seed_blood_requests(args.rows)
+            seed_donors(args.donors)
+
+        drop_indexes(connection)
+        analyze(connection)
+        before = report('without indexes', args.repeat)
+
+        with timed('created indexes'):
+            create_indexes(connection)
+        analyze(connection)
+        after = report('with indexes', args.repeat)
+
+    print('\n=== summary (median ms) ===')
+    print(f'{"query":<24}{"before":>12}{"after":>12}{"speedup":>10}')
+    for label in before:
+        speedup = before[label] / after[label] if after[label] else float('inf')
+        print(f'{label:<24}{before[label]:>12.2f}{after[label]:>12.2f}{speedup:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Bytes transferred for a cold and a warm load of the home page with the
+production static pipeline, by the encoding the browser accepts.
+
+    python -m benchmarks.static_transfer
+
+Runs collectstatic into a temporary STATIC_ROOT under the production settings
+profile, then fetches the page and every local asset it references through the
+full middleware stack. Assets from CDNs are not counted.
+"""
+
+import argparse
+import os
+import re
+import tempfile
+
+from benchmarks import setup_django, temporary_database
+
+ENCODINGS = [('identity', ''), ('gzip', 'gzip'), ('brotli', 'br, gzip')]
+
+
+def fetch(client, path, accept_encoding):
+    response = client.get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    return response, len(body)
+
+
+def local_assets(html, static_url):
+    return sorted(set(re.findall(r'(?:href|src)="(%s[^"]+)"' % re.escape(static_url), html)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/', help='page to load')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as static_root:
+        os.environ.update({
+            'BLOODCONNECT_ENV': 'production',
+            'DJANGO_SECRET_KEY': 'static-transfer-benchmark',
+            'BLOODCONNECT_STATIC_ROOT': static_root,
+        })
+        setup_django()
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.test import Client
+        from django.test.utils import setup_test_environment
+
+        setup_test_environment()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+        with temporary_database():
+            client = Client()
+            totals = {}
+            for label, accept_encoding in ENCODINGS:
+                page, page_bytes = fetch(client, args.path, accept_encoding)
+                assets = local_assets(page.content.decode(), settings.STATIC_URL)
+                print(f'\n=== Accept-Encoding: {accept_encoding or "(none)"} ===')
+                print(f'{args.path:<40}{page_bytes:>10} B')
+                asset_bytes = 0
+                for path in assets:
+                    response, size = fetch(client, path, accept_encoding)
+                    asset_bytes += size
+                    print(
+                        f'{path:<40}{size:>10} B  {response.get("Content-Encoding", "identity"):<9}'
+                        f'{response.get("Cache-Control", "")}'
+                    )
+                totals[label] = (page_bytes + asset_bytes, page_bytes)
+
+    print('\n=== bytes per page load ===')
+    print(f'{"encoding":<12}{"cold":>10}{"warm":>10}')
+    for label, (cold, warm) in totals.items():
+        print(f'{label:<12}{cold:>10}{warm:>10}')
+    print('(warm: hashed assets are cached as immutable, so only the page itself is fetched)')
+
+
+if __name__ == '__main__':
+    main()
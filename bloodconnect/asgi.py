@@ -3,6 +3,11 @@ ASGI config for bloodconnect project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server to enable the live request feed at
+/requests/events/, which keeps one open stream per browser without a thread
+each, e.g. ``uvicorn bloodconnect.asgi:application``. Under WSGI the feed
+answers 204 and browsers stop reconnecting.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -1,17 +1,81 @@
-from django.contrib import admin
+from datetime import datetime, time, timedelta
+
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
-from .models import User, DonorProfile, BloodRequest
+from django.db import models
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from . import donations, operations, search
+from .models import (
+    User, Location, DonorProfile, BloodRequest, Pledge, Donation, BloodStock, StockForecast, Job, AuditLog, ApiToken,
+)
+from .pagination import EstimatedCountPaginator
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables that grow to millions of rows: estimated
+    counts instead of COUNT(*) scans, and no second count of the whole table
+    next to filtered results. With ``prefix_search_fields`` set, search matches
+    the start of those indexed columns (case-sensitive) or an exact id, instead
+    of LIKE '%term%' scans over every row.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    prefix_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not self.prefix_search_fields or not term:
+            return super().get_search_results(request, queryset, search_term)
+        # 'asha' matches the range ['asha', 'ashb') rather than LIKE 'asha%', so every backend can use its index.
+        after = term[:-1] + chr(ord(term[-1]) + 1)
+        matches = models.Q(pk=int(term)) if term.isdigit() else models.Q()
+        for field in self.prefix_search_fields:
+            matches |= models.Q(**{f'{field}__gte': term, f'{field}__lt': after})
+        return queryset.filter(matches), False
+
+class RecentFilter(admin.SimpleListFilter):
+    """
+    Filter on how recent ``field_name`` is, as one range over its index. Unlike
+    date_hierarchy it does not look up the distinct dates in the table first.
+    """
+    parameter_name = 'within'
+    field_name = None
+    PERIODS = (('1', 'Today'), ('7', 'Past 7 days'), ('30', 'Past 30 days'), ('365', 'Past year'))
+
+    def lookups(self, request, model_admin):
+        return self.PERIODS
+
+    def queryset(self, request, queryset):
+        if self.value() not in dict(self.PERIODS):
+            return queryset
+        since = timezone.localdate() - timedelta(days=int(self.value()) - 1)
+        if isinstance(queryset.model._meta.get_field(self.field_name), models.DateTimeField):
+            since = timezone.make_aware(datetime.combine(since, time.min))
+        return queryset.filter(**{f'{self.field_name}__gte': since})
+
+class CreatedFilter(RecentFilter):
+    title = 'created'
+    field_name = 'created_at'
+
+class DonatedFilter(RecentFilter):
+    title = 'donated'
+    field_name = 'donated_on'
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdmin, UserAdmin):
     list_display = ('email', 'username', 'user_type', 'is_staff', 'is_active')
     list_filter = ('user_type', 'is_staff', 'is_active')
     search_fields = ('email', 'username', 'first_name', 'last_name')
+    prefix_search_fields = ('email', 'username')
+    search_help_text = 'Start of an email or username, or a user id.'
     ordering = ('email',)
+    raw_id_fields = ('location',)
     
     fieldsets = (
         (None, {'fields': ('email', 'username', 'password')}),
-        ('Personal info', {'fields': ('first_name', 'last_name', 'phone_number', 'address', 'city', 'state', 'country')}),
+        ('Personal info', {'fields': ('first_name', 'last_name', 'phone_number', 'address', 'city', 'state', 'country', 'location')}),
         ('Permissions', {'fields': ('user_type', 'is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
     )
@@ -23,17 +87,195 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ('name', 'state', 'country', 'latitude', 'longitude')
+    list_filter = ('country',)
+    search_fields = ('name', 'state', 'country')
+    readonly_fields = ('key',)
+
 @admin.register(DonorProfile)
-class DonorProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'blood_group', 'gender', 'age', 'is_available', 'last_donation_date')
-    list_filter = ('blood_group', 'gender', 'is_available')
+class DonorProfileAdmin(LargeTableAdmin):
+    list_display = ('user', 'blood_group', 'gender', 'age', 'is_available', 'last_donation_date', 'eligible_from')
+    list_filter = ('blood_group', 'is_available', 'gender')
+    list_select_related = ('user',)
     search_fields = ('user__email', 'user__username', 'user__first_name', 'user__last_name')
+    prefix_search_fields = ('user__email', 'user__username')
+    search_help_text = 'Start of the donor\'s email or username, or a donor profile id.'
     raw_id_fields = ('user',)
+    actions = ('mark_unavailable', 'mark_available')
+
+    @admin.action(description='Mark selected donors unavailable', permissions=['change'])
+    def mark_unavailable(self, request, queryset):
+        changed = operations.set_availability(queryset, False, actor=request.user)
+        self.message_user(request, f'{changed} donors marked unavailable.', messages.SUCCESS)
+
+    @admin.action(description='Mark selected donors available', permissions=['change'])
+    def mark_available(self, request, queryset):
+        changed = operations.set_availability(queryset, True, actor=request.user)
+        self.message_user(
+            request, f'{changed} donors marked available; any inside their donation interval join when eligible.',
+            messages.SUCCESS,
+        )
+
+class PledgeInline(admin.TabularInline):
+    """Pledges are made through pledges.pledge(), which keeps units_pledged in step; shown read-only."""
+    model = Pledge
+    fields = ('donor', 'units', 'created_at')
+    readonly_fields = fields
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('donor__user')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 @admin.register(BloodRequest)
-class BloodRequestAdmin(admin.ModelAdmin):
-    list_display = ('requester', 'blood_group', 'units_needed', 'urgency', 'status', 'required_date', 'created_at')
-    list_filter = ('blood_group', 'urgency', 'status')
+class BloodRequestAdmin(LargeTableAdmin):
+    list_display = (
+        'requester', 'blood_group', 'units_needed', 'units_pledged', 'urgency', 'status', 'required_date', 'created_at',
+    )
+    list_filter = ('status', CreatedFilter, 'urgency', 'blood_group')
+    list_select_related = ('requester',)
     search_fields = ('requester__email', 'requester__username', 'hospital_name', 'reason')
-    raw_id_fields = ('requester', 'donor')
-    date_hierarchy = 'created_at'
+    raw_id_fields = ('requester', 'donor', 'hospital_location')
+    readonly_fields = ('units_pledged', 'units_from_stock')
+    inlines = [PledgeInline]
+    actions = ('cancel_pending', 'complete_accepted', 'fulfil_from_stock', 'expire_stale')
+
+    def _transition(self, request, queryset, from_status, to_status):
+        moved = operations.transition_requests(queryset, from_status, to_status, actor=request.user)
+        self.message_user(request, f'{len(moved)} {from_status} requests {to_status}.', messages.SUCCESS)
+
+    @admin.action(description='Cancel selected pending requests', permissions=['change'])
+    def cancel_pending(self, request, queryset):
+        self._transition(request, queryset, 'pending', 'cancelled')
+
+    @admin.action(description='Complete selected accepted requests', permissions=['change'])
+    def complete_accepted(self, request, queryset):
+        self._transition(request, queryset, 'accepted', 'completed')
+
+    @admin.action(description='Fulfil selected pending requests from blood bank stock', permissions=['change'])
+    def fulfil_from_stock(self, request, queryset):
+        # Units not yet pledged are issued from stock when the requests complete; see inventory.py.
+        self._transition(request, queryset, 'pending', 'completed')
+
+    @admin.action(description='Cancel selected pending requests whose required date has passed', permissions=['change'])
+    def expire_stale(self, request, queryset):
+        self._transition(request, queryset.filter(required_date__lt=timezone.localdate()), 'pending', 'cancelled')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE scans where the database has one.
+        if search.backend() is None:
+            return super().get_search_results(request, queryset, search_term)
+        # Emails are not in the public index; staff look requesters up by exact address.
+        if '@' in search_term:
+            return queryset.filter(requester__email=search_term.strip()), False
+        return search.matches(queryset, search_term), False
+
+@admin.register(Donation)
+class DonationAdmin(LargeTableAdmin):
+    """Read-only view of the donation ledger, plus the statistics page built from its rollups."""
+    list_display = ('donated_on', 'blood_group', 'units', 'location', 'donor', 'blood_request')
+    list_filter = (DonatedFilter, 'blood_group')
+    list_select_related = ('location', 'donor__user', 'blood_request__requester')
+    raw_id_fields = ('blood_request', 'donor', 'location')
+    change_list_template = 'admin/bloodconnectapp/donation/change_list.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        statistics = path(
+            'statistics/',
+            self.admin_site.admin_view(self.statistics_view),
+            name='bloodconnectapp_donation_statistics',
+        )
+        return [statistics] + super().get_urls()
+
+    def statistics_view(self, request):
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Donation statistics',
+            **donations.statistics(),
+        }
+        return TemplateResponse(request, 'admin/bloodconnectapp/donation/statistics.html', context)
+
+@admin.register(BloodStock)
+class BloodStockAdmin(admin.ModelAdmin):
+    """Stock received is entered here; units the bank supplies to completed requests are issued from it."""
+    list_display = ('location', 'blood_group', 'component', 'units', 'updated_at')
+    list_filter = ('blood_group', 'component')
+    list_select_related = ('location',)
+    raw_id_fields = ('location',)
+    search_fields = ('location__name',)
+
+@admin.register(StockForecast)
+class StockForecastAdmin(admin.ModelAdmin):
+    """Read-only output of manage.py forecast_shortages."""
+    list_display = (
+        'location', 'blood_group', 'stock_units', 'daily_units', 'recent_daily_units', 'peak_daily_units',
+        'days_of_cover', 'shortage', 'computed_on',
+    )
+    list_filter = ('shortage', 'blood_group')
+    list_select_related = ('location',)
+    ordering = ('days_of_cover',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    """Tokens are created with manage.py create_api_token, which shows them once; delete one here to revoke it."""
+    list_display = ('name', 'user', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('name',)
+    readonly_fields = ('user', 'name', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(AuditLog)
+class AuditLogAdmin(LargeTableAdmin):
+    """Read-only record of bulk operations; written by operations.py."""
+    list_display = ('created_at', 'action', 'rows', 'source', 'actor', 'details')
+    list_filter = ('action', 'source', CreatedFilter)
+    list_select_related = ('actor',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'available_at', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('claimed_by', 'created_at')
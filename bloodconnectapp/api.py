@@ -0,0 +1,346 @@
+"""
+Versioned JSON API (v1) for blood requests and donor search.
+
+Responses carry an ETag and Last-Modified derived from the rows' ``updated_at``,
+and conditional GETs whose validators still match get an empty 304. Clients
+pick the keys they need with ``?fields=a,b`` and page with the ``next`` and
+``previous`` cursors.
+
+Browsers use the regular session login, and their writes must carry the CSRF
+token as for any form. Apps and partner systems send ``Authorization: Bearer
+<token>`` instead, with a token from ``manage.py create_api_token``; token
+requests need no CSRF token since no browser sends the header on its own.
+"""
+import hashlib
+import json
+import secrets
+from functools import wraps
+
+from django.db.models import Exists, OuterRef, Q
+from django.http import Http404, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from . import eligibility, pledges
+from .forms import BloodRequestForm
+from .geo import location_ids_for_city
+from .matching import COMPATIBLE_DONORS, compatible_donors
+from .models import ApiToken, DonorProfile, BloodRequest, Pledge
+from .pagination import KeysetPaginator
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(user, name):
+    """Create an API token for ``user`` and return it; only its digest is kept, so it cannot be shown again."""
+    token = secrets.token_urlsafe(32)
+    ApiToken.objects.create(user=user, name=name, digest=_digest(token))
+    return token
+
+
+def authenticate(request):
+    """
+    Log in the bearer of an API token, or else check the CSRF token of a
+    session request that writes. Raise ApiError if either is rejected.
+    """
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token.strip():
+        api_token = ApiToken.objects.select_related('user').filter(digest=_digest(token.strip())).first()
+        if api_token is None or not api_token.user.is_active:
+            raise ApiError(401, 'Invalid API token.')
+        request.user = api_token.user
+    elif CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {}) is not None:
+        raise ApiError(403, 'CSRF check failed; send the csrftoken cookie as X-CSRFToken, or use an API token.')
+
+
+def api_view(*methods, login=False):
+    """
+    Restrict a view to ``methods``, authenticate it (see authenticate()),
+    optionally require a login, and turn ApiError into a JSON error.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                authenticate(request)
+                if login and not request.user.is_authenticated:
+                    raise ApiError(401, 'Authentication required.')
+                return view(request, *args, **kwargs)
+            except ApiError as exc:
+                return JsonResponse({'error': exc.message}, status=exc.status)
+        # CSRF is checked in authenticate(), after token requests are let through.
+        return csrf_exempt(require_http_methods(methods)(wrapper))
+    return decorator
+
+
+def _value(name):
+    return (name,), lambda obj: getattr(obj, name)
+
+
+def _person(user):
+    return {'id': user.id, 'name': user.get_full_name() or user.username, 'city': user.city}
+
+
+# API field -> (model columns to load, getter). Related columns are joined in with select_related.
+REQUEST_FIELDS = {
+    **{name: _value(name) for name in (
+        'id', 'blood_group', 'units_needed', 'units_pledged', 'hospital_name', 'hospital_address', 'reason',
+        'urgency', 'status', 'required_date', 'created_at', 'updated_at',
+    )},
+    'requester': (
+        ('requester__id', 'requester__username', 'requester__first_name', 'requester__last_name', 'requester__city'),
+        lambda blood_request: _person(blood_request.requester),
+    ),
+    'donor_id': (('donor',), lambda blood_request: blood_request.donor_id),
+}
+
+DONOR_FIELDS = {
+    **{name: _value(name) for name in (
+        'id', 'blood_group', 'gender', 'is_available', 'last_donation_date', 'eligible_from', 'updated_at',
+    )},
+    'donor': (
+        ('user__id', 'user__username', 'user__first_name', 'user__last_name', 'user__city'),
+        lambda donor: _person(donor.user),
+    ),
+}
+
+
+def requested_fields(request, available):
+    """The API fields named in ``?fields=``, or all of them."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(available)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(400, f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(available)}.')
+    return names
+
+
+def project(queryset, available, fields):
+    """Load only the columns ``fields`` need, plus id and updated_at for the validators."""
+    columns = {'id', 'updated_at'}
+    for name in fields:
+        columns.update(available[name][0])
+    related = {column.split('__')[0] for column in columns if '__' in column}
+    return queryset.select_related(*related).only(*columns, *related)
+
+
+def serialize(obj, available, fields):
+    return {name: available[name][1](obj) for name in fields}
+
+
+def conditional(request, rows, extra=''):
+    """ETag and Last-Modified for ``rows``, and the 304 response to return instead, if any."""
+    digest = hashlib.md5(usedforsecurity=False)
+    digest.update(extra.encode())
+    for row in rows:
+        digest.update(f'|{row.id}:{row.updated_at.timestamp()}'.encode())
+    etag = f'"{digest.hexdigest()}"'
+    last_modified = max((row.updated_at for row in rows), default=None)
+    # HTTP dates have whole seconds; compare If-Modified-Since at the same precision.
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    return etag, timestamp, not_modified
+
+
+def respond(request, rows, payload, extra=''):
+    etag, timestamp, not_modified = conditional(request, rows, extra)
+    response = not_modified or JsonResponse(payload)
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def paginated(request, queryset, ordering, available):
+    fields = requested_fields(request, available)
+    try:
+        per_page = min(int(request.GET.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ApiError(400, 'limit must be a number.')
+    paginator = KeysetPaginator(project(queryset, available, fields), ordering, max(per_page, 1))
+    page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+    payload = {
+        'results': [serialize(obj, available, fields) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+    # The cursors change when rows are added or removed off the page, so they are part of the ETag.
+    return respond(request, page.object_list, payload, extra=f'{fields}|{page.next_cursor}|{page.previous_cursor}')
+
+
+def request_detail_response(request, blood_request, status=200):
+    fields = requested_fields(request, REQUEST_FIELDS)
+    if status != 200:
+        return JsonResponse(serialize(blood_request, REQUEST_FIELDS, fields), status=status)
+    return respond(request, [blood_request], serialize(blood_request, REQUEST_FIELDS, fields), extra=str(fields))
+
+
+def visible(request, queryset):
+    """
+    ``queryset`` narrowed to the requests the caller may see: every pending
+    request, plus the ones they made, were the donor for or pledged to. Staff
+    see everything.
+    """
+    if request.user.is_staff:
+        return queryset
+    allowed = Q(status='pending')
+    if request.user.is_authenticated:
+        allowed |= (
+            Q(requester=request.user) | Q(donor__user=request.user) |
+            Q(Exists(Pledge.objects.filter(blood_request=OuterRef('pk'), donor__user=request.user)))
+        )
+    return queryset.filter(allowed)
+
+
+@api_view('GET', 'POST')
+def request_list(request):
+    """
+    GET: pending requests, newest first, filtered like the request list page.
+    Other ``status`` values list only the caller's own requests and donations,
+    or every request for staff. POST: create a request.
+    """
+    if request.method == 'POST':
+        return create_request(request)
+
+    status = request.GET.get('status', 'pending')
+    queryset = BloodRequest.objects.filter(status=status)
+    if status != 'pending':
+        if not request.user.is_authenticated:
+            raise ApiError(401, 'Authentication required to list requests that are not pending.')
+        queryset = visible(request, queryset)
+    for name in ('blood_group', 'urgency'):
+        if request.GET.get(name):
+            queryset = queryset.filter(**{name: request.GET[name]})
+    if request.GET.get('city'):
+        queryset = queryset.filter(hospital_location__in=location_ids_for_city(request.GET['city']))
+    return paginated(request, queryset, ('-created_at', '-id'), REQUEST_FIELDS)
+
+
+def create_request(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Authentication required.')
+    if request.user.user_type != 'receiver':
+        raise ApiError(403, 'Only users with receiver type can create blood requests.')
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        raise ApiError(400, 'The request body must be a JSON object.')
+    form = BloodRequestForm(data)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid blood request.', 'fields': form.errors}, status=400)
+    blood_request = form.save(commit=False)
+    blood_request.requester = request.user
+    blood_request.hospital_location_id = request.user.location_id
+    blood_request.save()
+    response = request_detail_response(request, blood_request, status=201)
+    response['Location'] = reverse('bloodconnectapp:api_request_detail', args=[blood_request.id])
+    return response
+
+
+@api_view('GET')
+def request_detail(request, request_id):
+    """A request; one that is no longer pending only for its requester, donors and staff."""
+    queryset = project(BloodRequest.objects.all(), REQUEST_FIELDS, requested_fields(request, REQUEST_FIELDS))
+    blood_request = visible(request, queryset).filter(id=request_id).first()
+    if blood_request is None:
+        if not request.user.is_authenticated and BloodRequest.objects.filter(id=request_id).exists():
+            raise ApiError(401, 'Authentication required to view requests that are not pending.')
+        raise Http404
+    return request_detail_response(request, blood_request)
+
+
+def transition(request_id, from_status, to_status, conflict, **changes):
+    if not BloodRequest.objects.filter(id=request_id).transition(from_status, to_status, **changes):
+        get_object_or_404(BloodRequest, id=request_id)
+        raise ApiError(409, conflict)
+    return BloodRequest.objects.select_related('requester').get(id=request_id)
+
+
+@api_view('POST', login=True)
+def accept_request(request, request_id):
+    """Pledge ``units`` (from an optional JSON body, default 1) of a pending request, as a donor."""
+    if request.user.user_type != 'donor':
+        raise ApiError(403, 'Only donors can accept blood requests.')
+    donor_profile = DonorProfile.objects.filter(user=request.user).first()
+    if donor_profile is None:
+        raise ApiError(409, 'You are currently marked as unavailable.')
+    error = eligibility.ineligible_reason(donor_profile)
+    if error:
+        raise ApiError(409, error)
+    data = {}
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            raise ApiError(400, 'The request body must be a JSON object.')
+    try:
+        pledges.pledge(request_id, donor_profile, pledges.requested_units(data.get('units')))
+    except pledges.PledgeError as exc:
+        get_object_or_404(BloodRequest, id=request_id)
+        raise ApiError(409, str(exc))
+    return request_detail_response(request, BloodRequest.objects.select_related('requester').get(id=request_id))
+
+
+@api_view('POST', login=True)
+def complete_request(request, request_id):
+    blood_request = get_object_or_404(BloodRequest.objects.select_related('donor'), id=request_id)
+    if not pledges.can_complete(blood_request, request.user):
+        raise ApiError(403, 'You are not authorized to complete this request.')
+    blood_request = transition(request_id, 'accepted', 'completed', 'This request cannot be marked as completed.')
+    return request_detail_response(request, blood_request)
+
+
+@api_view('POST', login=True)
+def cancel_request(request, request_id):
+    blood_request = get_object_or_404(BloodRequest.objects.only('requester'), id=request_id)
+    if request.user.id != blood_request.requester_id:
+        raise ApiError(403, 'You are not authorized to cancel this request.')
+    blood_request = transition(request_id, 'pending', 'cancelled', 'This request cannot be cancelled.')
+    return request_detail_response(request, blood_request)
+
+
+@api_view('GET', login=True)
+def donors(request):
+    """
+    Search available donors, for receivers and staff. ``blood_group`` is the
+    recipient's group and matches every compatible donor group; ``city``
+    (optionally with ``radius`` in km) limits donors to where they live.
+    """
+    if request.user.user_type != 'receiver' and not request.user.is_staff:
+        raise ApiError(403, 'Only receivers can search donors.')
+    blood_group = request.GET.get('blood_group')
+    if blood_group:
+        if blood_group not in COMPATIBLE_DONORS:
+            raise ApiError(400, f'Unknown blood group {blood_group!r}.')
+        queryset = compatible_donors(blood_group)
+    else:
+        queryset = DonorProfile.objects.filter(is_available=True)
+    if request.GET.get('city'):
+        radius = request.GET.get('radius', '')
+        radius_km = int(radius) if radius.isdigit() else None
+        queryset = queryset.filter(user__location__in=location_ids_for_city(request.GET['city'], radius_km))
+    return paginated(request, queryset, ('id',), DONOR_FIELDS)
@@ -0,0 +1,87 @@
+"""Streaming CSV / JSON Lines readers and writers for the bulk management commands."""
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date
+
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(path, fmt=None):
+    """The explicit ``fmt`` if given, else 'jsonl' for .jsonl/.ndjson paths and 'csv' otherwise."""
+    if fmt:
+        return fmt
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+@contextmanager
+def open_stream(path, mode='r'):
+    """Open ``path`` for text I/O, with '-' meaning stdin or stdout."""
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+    else:
+        with open(path, mode, newline='', encoding='utf-8') as handle:
+            yield handle
+
+
+def read_rows(handle, fmt):
+    """Yield (line_number, row dict) pairs one at a time, never holding more than one row in memory."""
+    if fmt == 'csv':
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f'line {line_number}: {exc}')
+        if not isinstance(row, dict):
+            raise ValueError(f'line {line_number}: expected a JSON object')
+        yield line_number, row
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+class RowWriter:
+    """Write row dicts with ``fieldnames`` keys as CSV (with a header) or JSON Lines."""
+
+    def __init__(self, handle, fmt, fieldnames):
+        self.handle = handle
+        self.fmt = fmt
+        self.fieldnames = fieldnames
+        if fmt == 'csv':
+            self.csv_writer = csv.DictWriter(handle, fieldnames=fieldnames)
+            self.csv_writer.writeheader()
+
+    def writerow(self, row):
+        row = {name: _plain(row[name]) for name in self.fieldnames}
+        if self.fmt == 'csv':
+            self.csv_writer.writerow(row)
+        else:
+            self.handle.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+class Throughput:
+    """Row counter and wall clock for progress and summary lines."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.rows = 0
+
+    def add(self, rows):
+        self.rows += rows
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return f'{self.rows} rows in {time.monotonic() - self.started:.1f}s ({self.rate:,.0f} rows/s)'
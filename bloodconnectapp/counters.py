@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.cache import caches
+
+DONORS_COUNT = 'bloodconnect:donors_count'
+PENDING_REQUESTS_COUNT = 'bloodconnect:pending_requests_count'
+RECENT_REQUESTS = 'bloodconnect:recent_requests'
+
+
+def counter_cache():
+    """The cache holding the home page counters (see BLOODCONNECT_COUNTER_CACHE)."""
+    return caches[settings.BLOODCONNECT_COUNTER_CACHE]
+
+
+def cached(key, loader):
+    """Return the cached value for ``key``, computing and storing it with ``loader`` on a miss."""
+    cache = counter_cache()
+    value = cache.get(key)
+    if value is None:
+        value = loader()
+        cache.add(key, value, settings.BLOODCONNECT_COUNTER_TIMEOUT)
+    return value
+
+
+def adjust(key, delta):
+    """Add ``delta`` to a cached counter; a cold counter is left to be recounted on next read."""
+    if not delta:
+        return
+    try:
+        counter_cache().incr(key, delta)
+    except ValueError:
+        pass
+
+
+def invalidate(*keys):
+    counter_cache().delete_many(keys)
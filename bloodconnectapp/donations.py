@@ -0,0 +1,121 @@
+"""
+Donation ledger and the rollups the statistics page reads.
+
+Completing a blood request appends a Donation row per donor who gave to it, in
+the same transaction as the status change, and adds their units to three
+running-total tables: by day, by blood group and by city. Units the hospital's
+blood bank supplied instead are issued from its stock (see inventory.py).
+Reading statistics is then a handful of indexed lookups over rollup rows,
+however long the ledger grows.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from . import eligibility, inventory
+from .models import BloodRequest, Donation, Pledge, DailyDonations, BloodGroupDonations, CityDonations
+
+ROLLUPS = (
+    (DailyDonations, 'day', lambda donation: donation.donated_on),
+    (BloodGroupDonations, 'blood_group', lambda donation: donation.blood_group),
+    (CityDonations, 'location_id', lambda donation: donation.location_id),
+)
+
+
+def record(request_ids):
+    """
+    Record where the blood came from for each completed request in
+    ``request_ids`` not yet recorded. Donors' units become Donations: one per
+    pledge, with the units that donor pledged, or one for the request's donor
+    if nobody pledged. They are added to the rollups and move each donor's
+    last donation date forward. Units no donor gave were supplied by the
+    hospital's blood bank: they are stored in units_from_stock and issued from
+    stock (see inventory.py). Call inside the transaction that completed the
+    requests; return the new Donations.
+    """
+    recorded = set(Donation.objects.filter(blood_request_id__in=request_ids).values_list('blood_request_id', flat=True))
+    rows = list(
+        BloodRequest.objects.filter(
+            id__in=[request_id for request_id in request_ids if request_id not in recorded],
+            status='completed', units_from_stock=0,
+        ).values('id', 'donor_id', 'donor__blood_group', 'blood_group', 'units_needed', 'hospital_location_id', 'updated_at')
+    )
+    pledges = defaultdict(list)
+    for pledge in Pledge.objects.filter(blood_request_id__in=[row['id'] for row in rows]).values(
+        'blood_request_id', 'donor_id', 'donor__blood_group', 'units',
+    ).order_by('id'):
+        pledges[pledge['blood_request_id']].append(pledge)
+
+    donations = []
+    from_stock = {}
+    for row in rows:
+        givers = pledges.get(row['id'])
+        if givers is None and row['donor_id'] is not None:
+            givers = [
+                {'donor_id': row['donor_id'], 'donor__blood_group': row['donor__blood_group'], 'units': row['units_needed']},
+            ]
+        donations.extend(
+            Donation(
+                blood_request_id=row['id'],
+                donor_id=giver['donor_id'],
+                blood_group=giver['donor__blood_group'],
+                units=giver['units'],
+                location_id=row['hospital_location_id'],
+                donated_on=timezone.localdate(row['updated_at']),
+            )
+            for giver in givers or ()
+        )
+        supplied = row['units_needed'] - sum(giver['units'] for giver in givers or ())
+        if supplied > 0:
+            from_stock[row['id']] = (row['hospital_location_id'], row['blood_group'], supplied)
+
+    if from_stock:
+        BloodRequest.objects.filter(id__in=from_stock).update(units_from_stock=Case(
+            *[When(id=request_id, then=Value(units)) for request_id, (_, _, units) in from_stock.items()],
+            output_field=PositiveIntegerField(),
+        ))
+        inventory.issue(from_stock.values())
+    if not donations:
+        return []
+    Donation.objects.bulk_create(donations)
+    add_to_rollups(donations)
+
+    donors_by_day = defaultdict(set)
+    for donation in donations:
+        donors_by_day[donation.donated_on].add(donation.donor_id)
+    for day, donor_ids in donors_by_day.items():
+        eligibility.record_donations(donor_ids, day)
+    return donations
+
+
+def add_to_rollups(donations):
+    for model, field, key in ROLLUPS:
+        totals = defaultdict(lambda: [0, 0])
+        for donation in donations:
+            if key(donation) is not None:
+                totals[key(donation)][0] += 1
+                totals[key(donation)][1] += donation.units
+        if not totals:
+            continue
+        # Create missing rows at zero, then add with UPDATE ... SET units = units + n so concurrent writers both count.
+        model.objects.bulk_create([model(**{field: value}) for value in totals], ignore_conflicts=True)
+        for value, (count, units) in totals.items():
+            model.objects.filter(**{field: value}).update(donations=F('donations') + count, units=F('units') + units)
+
+
+def statistics(days=30, cities=10):
+    """Totals, per blood group, the top ``cities`` and the last ``days`` days, read from the rollups only."""
+    today = timezone.localdate()
+    by_group = list(BloodGroupDonations.objects.order_by('blood_group'))
+    daily = dict(DailyDonations.objects.filter(day__gt=today - timedelta(days=days)).values_list('day', 'units'))
+    return {
+        'totals': {
+            'donations': sum(row.donations for row in by_group),
+            'units': sum(row.units for row in by_group),
+        },
+        'by_group': by_group,
+        'top_cities': list(CityDonations.objects.select_related('location').order_by('-units')[:cities]),
+        'daily': [(day, daily.get(day, 0)) for day in (today - timedelta(days=n) for n in range(days - 1, -1, -1))],
+    }
@@ -0,0 +1,106 @@
+"""
+Donation interval rules: when a donor may give blood again.
+
+A donor's ``eligible_from`` date is worked out from their last donation and
+gender whenever the profile is saved. Donors who are not yet eligible are taken
+out of the pool by clearing ``is_available`` and setting
+``held_until_eligible``. That way every query for available donors keeps using
+the one indexed flag. ``manage.py refresh_eligibility`` runs daily and puts
+donors whose interval has passed back in the pool. Donors who marked
+themselves unavailable are left alone.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DonorProfile
+
+
+def donation_interval(gender):
+    """Minimum time between whole blood donations for ``gender``; the longest interval if unknown."""
+    intervals = settings.BLOODCONNECT_DONATION_INTERVAL_DAYS
+    return timedelta(days=intervals.get(gender, max(intervals.values())))
+
+
+def next_eligible_date(last_donation_date, gender):
+    if last_donation_date is None:
+        return None
+    return last_donation_date + donation_interval(gender)
+
+
+def ineligible_reason(profile, today=None):
+    """Why ``profile`` cannot accept a request now, or None if it can."""
+    today = today or timezone.localdate()
+    if profile.eligible_from is not None and profile.eligible_from > today:
+        return f'You can donate again from {profile.eligible_from:%d %b %Y}.'
+    if not profile.is_available:
+        return 'You are currently marked as unavailable.'
+    return None
+
+
+def apply(profile, today=None):
+    """Set ``profile.eligible_from`` and hold or release its availability to match; does not save."""
+    today = today or timezone.localdate()
+    profile.eligible_from = next_eligible_date(profile.last_donation_date, profile.gender)
+    waiting = profile.eligible_from is not None and profile.eligible_from > today
+    if waiting and profile.is_available:
+        profile.is_available = False
+        profile.held_until_eligible = True
+    elif not waiting and profile.held_until_eligible:
+        profile.is_available = True
+        profile.held_until_eligible = False
+
+
+def record_donations(donor_ids, day, today=None):
+    """Move the last donation date of ``donor_ids`` forward to ``day`` and hold them as needed, set-based."""
+    today = today or timezone.localdate()
+    now = timezone.now()
+    donors = DonorProfile.objects.filter(
+        Q(last_donation_date__isnull=True) | Q(last_donation_date__lt=day), id__in=donor_ids,
+    )
+    for gender in set(donors.values_list('gender', flat=True)):
+        donors.filter(gender=gender).update(
+            last_donation_date=day, eligible_from=next_eligible_date(day, gender), updated_at=now,
+        )
+    DonorProfile.objects.filter(id__in=donor_ids, is_available=True, eligible_from__gt=today).update(
+        is_available=False, held_until_eligible=True, updated_at=now,
+    )
+
+
+def refresh(today=None, recompute=False):
+    """
+    Bring every profile in line with the donation interval using set-based
+    updates, and return how many donors were (computed, held, released).
+
+    ``eligible_from`` is filled in with one UPDATE per distinct (gender,
+    last donation date) pair that is missing it, or for every pair with
+    ``recompute`` (after BLOODCONNECT_DONATION_INTERVAL_DAYS changes); each
+    availability flip is then a single UPDATE over an indexed range.
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    with transaction.atomic():
+        if recompute:
+            DonorProfile.objects.filter(eligible_from__isnull=False).update(eligible_from=None)
+
+        computed = 0
+        missing = (
+            DonorProfile.objects.filter(eligible_from__isnull=True, last_donation_date__isnull=False)
+            .values_list('gender', 'last_donation_date').distinct()
+        )
+        # Materialized first: the updates below change which rows the query matches.
+        for gender, last_donation_date in list(missing):
+            computed += DonorProfile.objects.filter(
+                gender=gender, last_donation_date=last_donation_date, eligible_from__isnull=True,
+            ).update(eligible_from=next_eligible_date(last_donation_date, gender), updated_at=now)
+
+        held = DonorProfile.objects.filter(is_available=True, eligible_from__gt=today).update(
+            is_available=False, held_until_eligible=True, updated_at=now,
+        )
+        released = DonorProfile.objects.filter(
+            Q(eligible_from__lte=today) | Q(eligible_from__isnull=True), held_until_eligible=True,
+        ).update(is_available=True, held_until_eligible=False, updated_at=now)
+    return computed, held, released
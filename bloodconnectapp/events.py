@@ -0,0 +1,171 @@
+"""
+In-process publish/subscribe for blood request events, streamed to browsers as server-sent events.
+
+Signal receivers publish an event when a request is created, accepted,
+completed or cancelled, and pledges.py publishes one when a donor pledges part
+of a request. Each open /requests/events/ stream holds a Subscription: a
+bounded asyncio queue on the server's event loop, so an idle client costs a
+queue and a suspended coroutine, not a thread. Publishing is thread-safe and
+never blocks the publisher. Events only reach streams served
+by the same process, so run the feed on a single ASGI worker, or on every
+worker that also handles the writes.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import BloodRequest
+
+EVENT_FIELDS = (
+    'id', 'blood_group', 'units_needed', 'units_pledged', 'hospital_name', 'urgency', 'status', 'required_date',
+    'hospital_location_id',
+)
+
+
+class Event:
+    __slots__ = ('id', 'kind', 'data')
+
+    def __init__(self, id, kind, data):
+        self.id = id
+        self.kind = kind
+        self.data = data
+
+    def encode(self):
+        """The event in the text/event-stream wire format."""
+        return f'id: {self.id}\nevent: {self.kind}\ndata: {json.dumps(self.data, cls=DjangoJSONEncoder)}\n\n'
+
+
+class Subscription:
+    """One client's queue of matching events; closed (None is queued) if the client falls too far behind."""
+
+    def __init__(self, matches, loop, maxsize):
+        self.matches = matches
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def deliver(self, event):
+        """Queue ``event`` from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # the client's event loop has already shut down
+
+    def _put(self, event):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: end the stream so the client reconnects and replays from Last-Event-ID.
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broker:
+    """Fans published events out to the subscriptions they match and keeps a short history for replay."""
+
+    def __init__(self, history=1000, queue_size=100):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._history = deque(maxlen=history)
+        self._counter = itertools.count(1)
+        # Event ids carry a per-process prefix so a Last-Event-ID from another process or run replays nothing.
+        self._epoch = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, kind, data):
+        with self._lock:
+            event = Event(f'{self._epoch}-{next(self._counter)}', kind, data)
+            self._history.append(event)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.deliver(event)
+        return event
+
+    def subscribe(self, matches, last_event_id=None):
+        """Register a subscription on the running event loop; return it with the missed events to replay."""
+        subscription = Subscription(matches, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            backlog = [event for event in self._history if self._is_after(event.id, last_event_id) and matches(event)]
+        return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def _is_after(self, event_id, last_event_id):
+        if not last_event_id:
+            return False
+        epoch, _, number = last_event_id.partition('-')
+        if epoch != self._epoch or not number.isdigit():
+            return False
+        return int(event_id.partition('-')[2]) > int(number)
+
+
+BROKER = Broker()
+
+
+def request_data(values):
+    return {field: values[field] for field in EVENT_FIELDS}
+
+
+def publish_request(kind, blood_request):
+    BROKER.publish(kind, request_data({field: getattr(blood_request, field) for field in EVENT_FIELDS}))
+
+
+def publish_transitioned(kind, ids):
+    """Publish one ``kind`` event per request id; skipped without a query when nobody is listening."""
+    if not BROKER.has_subscribers():
+        return
+    for values in BloodRequest.objects.filter(id__in=ids).values(*EVENT_FIELDS):
+        BROKER.publish(kind, request_data(values))
+
+
+def event_filter(blood_group=None, urgency=None, location_ids=None):
+    """Predicate matching events for requests of ``blood_group`` and ``urgency`` at one of ``location_ids`` (None = any)."""
+    def matches(event):
+        if blood_group and event.data['blood_group'] != blood_group:
+            return False
+        if urgency and event.data['urgency'] != urgency:
+            return False
+        if location_ids is not None and event.data['hospital_location_id'] not in location_ids:
+            return False
+        return True
+    return matches
+
+
+async def stream(matches, last_event_id=None, heartbeat=15):
+    """
+    Yield missed events after ``last_event_id``, then matching events as they
+    arrive, with a comment line every ``heartbeat`` idle seconds. Subscribes on
+    first iteration, on the loop that consumes the stream.
+    """
+    subscription, backlog = BROKER.subscribe(matches, last_event_id)
+    try:
+        yield 'retry: 5000\n\n'
+        for event in backlog:
+            yield event.encode()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is None:
+                return
+            yield event.encode()
+    finally:
+        BROKER.unsubscribe(subscription)
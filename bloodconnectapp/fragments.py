@@ -0,0 +1,50 @@
+"""
+Cached HTML for the request cards on the home and request list pages.
+
+Each card fragment is cached under a key made of the card template, the
+request id and its ``updated_at``. Saving a request gives it a new key, so
+nothing is ever deleted: a changed request renders once more, and the old
+entry expires on its own. A page fetches all of its cards with one
+``get_many`` and stores the ones it had to render with one ``set_many``.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+HOME_CARD = 'bloodconnectapp/includes/home_request_card.html'
+LIST_CARD = 'bloodconnectapp/includes/request_card.html'
+
+
+def fragment_cache():
+    """The cache holding rendered fragments (see BLOODCONNECT_FRAGMENT_CACHE)."""
+    return caches[settings.BLOODCONNECT_FRAGMENT_CACHE]
+
+
+def card_key(template_name, blood_request):
+    version = blood_request.updated_at.timestamp()
+    return f'bloodconnect:card:{template_name}:{blood_request.id}:{version}'
+
+
+def render_cards(template_name, blood_requests):
+    """
+    Set ``card_html`` on each of ``blood_requests`` to its rendered
+    ``template_name`` fragment, from the cache where possible, and return them.
+    """
+    blood_requests = list(blood_requests)
+    if not blood_requests:
+        return blood_requests
+    cache = fragment_cache()
+    keys = [card_key(template_name, blood_request) for blood_request in blood_requests]
+    found = cache.get_many(keys)
+    rendered = {}
+    template = None
+    for key, blood_request in zip(keys, blood_requests):
+        html = found.get(key)
+        if html is None:
+            template = template or get_template(template_name)
+            html = rendered[key] = template.render({'request': blood_request})
+        blood_request.card_html = mark_safe(html)
+    if rendered:
+        cache.set_many(rendered, settings.BLOODCONNECT_FRAGMENT_TIMEOUT)
+    return blood_requests
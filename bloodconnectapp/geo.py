@@ -0,0 +1,92 @@
+import math
+
+from .models import Location, DonorProfile, location_key
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing a circle of ``radius_km``."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90 or max_lat >= 90:
+        # The circle covers a pole, so every longitude is in range.
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    lon_delta = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(latitude))))
+    return min_lat, max_lat, max(longitude - lon_delta, -180.0), min(longitude + lon_delta, 180.0)
+
+
+def locations_within(latitude, longitude, radius_km):
+    """
+    Return {location id: distance in km} for locations within ``radius_km``.
+
+    The bounding box is answered by the (latitude, longitude) index so only
+    nearby candidates are loaded; the exact haversine check runs on those.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    candidates = Location.objects.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).values_list('id', 'latitude', 'longitude')
+    distances = {}
+    for location_id, lat, lon in candidates:
+        distance = haversine_km(latitude, longitude, lat, lon)
+        if distance <= radius_km:
+            distances[location_id] = distance
+    return distances
+
+
+def locations_near(location, radius_km):
+    """Like locations_within() around ``location``; just ``location`` itself if it has no coordinates."""
+    if location.latitude is None or location.longitude is None:
+        return {location.id: 0.0}
+    return locations_within(location.latitude, location.longitude, radius_km)
+
+
+def find_locations(city):
+    """Locations whose normalized name matches a free-text city, in any state or country."""
+    return Location.objects.filter(key__startswith=location_key(city).split('|', 1)[0] + '|')
+
+
+def location_ids_for_city(city, radius_km=None):
+    """Ids of the locations named ``city``, widened to everything within ``radius_km`` when given."""
+    location_ids = set()
+    for location in find_locations(city):
+        if radius_km:
+            location_ids.update(locations_near(location, radius_km))
+        else:
+            location_ids.add(location.id)
+    return location_ids
+
+
+def donors_within(latitude, longitude, radius_km, blood_groups=None):
+    """
+    Available donors living within ``radius_km``, nearest first.
+
+    Each returned DonorProfile has a ``distance_km`` attribute.
+    ``blood_groups`` restricts the donor blood groups, e.g. ['O+'].
+    """
+    distances = locations_within(latitude, longitude, radius_km)
+    if not distances:
+        return []
+    donors = DonorProfile.objects.filter(
+        is_available=True,
+        user__location__in=distances,
+    ).select_related('user')
+    if blood_groups is not None:
+        donors = donors.filter(blood_group__in=blood_groups)
+    donors = list(donors)
+    for donor in donors:
+        donor.distance_km = distances[donor.user.location_id]
+    donors.sort(key=lambda donor: (donor.distance_km, donor.pk))
+    return donors
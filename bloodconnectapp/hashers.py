@@ -0,0 +1,30 @@
+"""
+Password hashers whose cost comes from BLOODCONNECT_PASSWORD_COST.
+
+They keep Django's algorithm names, so hashes made by the stock hashers still
+verify. When the cost setting changes, Django's must_update() notices the
+difference on the next successful login and rehashes the password with the
+new parameters. A parameter that is not configured keeps Django's default.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+def _cost(algorithm, parameter, default):
+    return property(lambda self: settings.BLOODCONNECT_PASSWORD_COST.get(algorithm, {}).get(parameter, default))
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = _cost('pbkdf2', 'iterations', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = _cost('argon2', 'time_cost', hashers.Argon2PasswordHasher.time_cost)
+    memory_cost = _cost('argon2', 'memory_cost', hashers.Argon2PasswordHasher.memory_cost)
+    parallelism = _cost('argon2', 'parallelism', hashers.Argon2PasswordHasher.parallelism)
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    work_factor = _cost('scrypt', 'work_factor', hashers.ScryptPasswordHasher.work_factor)
+    block_size = _cost('scrypt', 'block_size', hashers.ScryptPasswordHasher.block_size)
+    parallelism = _cost('scrypt', 'parallelism', hashers.ScryptPasswordHasher.parallelism)
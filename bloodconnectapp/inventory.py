@@ -0,0 +1,150 @@
+"""
+Blood bank stock and shortage forecasting.
+
+Hospitals record the units their blood bank holds, per blood group and
+component, in BloodStock, through the admin. Completing a request updates
+stock too, but only by the units the bank supplied. Units pledged by donors
+go to the donation ledger and do not touch stock, so no unit is counted
+twice. The rest of the request, all of it when no donor gave (e.g. staff
+fulfilled it from stock in the admin), is stored in
+BloodRequest.units_from_stock and issued from whole blood of the requested
+group at the hospital's location. This happens in the transaction that
+completes the request (see donations.record()).
+
+``forecast()`` runs nightly from ``manage.py forecast_shortages``. The database
+sums the units requested per location, blood group and day, and the sums are
+loaded into a NumPy matrix with one row per location and group and one column
+per day. Every windowed aggregate is then computed for all rows at once from
+cumulative sums: mean demand over the last ``window_days`` and ``recent_days``,
+and the 95th percentile of ``recent_days`` demand over the whole history as
+the peak. Stock divided by the higher of the two means gives the days of
+cover, and fewer than ``shortage_days`` of cover is a shortage. The results
+replace the StockForecast rows.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from .models import BloodRequest, BloodStock, StockForecast
+
+# Requests do not name a component, so they are met from, and forecast against, whole blood.
+REQUEST_COMPONENT = 'whole_blood'
+PEAK_PERCENTILE = 95
+
+
+def issue(supplied):
+    """
+    Take units out of the whole blood stock, never below zero. ``supplied``
+    is (location id, blood group, units) for each request the bank supplied.
+    """
+    totals = defaultdict(int)
+    for location_id, blood_group, units in supplied:
+        if location_id is not None and units:
+            totals[location_id, blood_group] += units
+    now = timezone.now()
+    for (location_id, blood_group), units in totals.items():
+        BloodStock.objects.filter(
+            location_id=location_id, blood_group=blood_group, component=REQUEST_COMPONENT,
+        ).update(units=Greatest(F('units') - units, 0), updated_at=now)
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def daily_demand(today, days):
+    """
+    Units requested per day at each location over the ``days`` days up to
+    ``today``, leaving out cancelled requests: a list of (location id, blood
+    group) keys and a matrix with a row per key and a column per day, oldest
+    first.
+    """
+    start = today - timedelta(days=days - 1)
+    totals = (
+        BloodRequest.objects.filter(
+            created_at__gte=_midnight(start), created_at__lt=_midnight(today + timedelta(days=1)),
+            hospital_location__isnull=False,
+        )
+        .exclude(status='cancelled')
+        .annotate(day=TruncDate('created_at'))
+        .values_list('hospital_location_id', 'blood_group', 'day')
+        .annotate(units=Sum('units_needed'))
+        .order_by()
+    )
+    keys = {}
+    rows, columns, units = [], [], []
+    for location_id, blood_group, day, total in totals:
+        rows.append(keys.setdefault((location_id, blood_group), len(keys)))
+        columns.append((day - start).days)
+        units.append(total)
+    matrix = np.zeros((len(keys), days))
+    np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), units)
+    return list(keys), matrix
+
+
+def rolling_means(matrix, window):
+    """Mean of each row over every run of ``window`` consecutive columns, one column per run."""
+    sums = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(matrix, axis=1)], axis=1)
+    return (sums[:, window:] - sums[:, :-window]) / window
+
+
+def stock_levels():
+    """Whole blood units in stock, by (location id, blood group)."""
+    return {
+        (location_id, blood_group): units
+        for location_id, blood_group, units in BloodStock.objects.filter(component=REQUEST_COMPONENT)
+        .values_list('location_id', 'blood_group', 'units')
+    }
+
+
+def forecast(today=None):
+    """Rewrite StockForecast from the request history and stock as of ``today``; return the new rows."""
+    config = settings.BLOODCONNECT_FORECAST
+    today = today or timezone.localdate()
+    window, recent = config['window_days'], config['recent_days']
+    keys, matrix = daily_demand(today, max(config['history_days'], window, recent))
+
+    daily = rolling_means(matrix, window)[:, -1]
+    recent_means = rolling_means(matrix, recent)
+    recent_daily = recent_means[:, -1]
+    peak = np.percentile(recent_means, PEAK_PERCENTILE, axis=1) if keys else np.zeros(0)
+    rate = np.maximum(daily, recent_daily)
+
+    stock = stock_levels()
+    # Locations that record no stock have no days of cover rather than an empty bank.
+    tracked = {location_id for location_id, _ in stock}
+    units = np.array(
+        [stock.get(key, 0 if key[0] in tracked else np.nan) for key in keys], dtype=float,
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cover = np.where(rate > 0, units / rate, np.nan)
+
+    forecasts = [
+        StockForecast(
+            location_id=location_id,
+            blood_group=blood_group,
+            daily_units=round(float(daily[i]), 3),
+            recent_daily_units=round(float(recent_daily[i]), 3),
+            peak_daily_units=round(float(peak[i]), 3),
+            stock_units=None if np.isnan(units[i]) else int(units[i]),
+            days_of_cover=None if np.isnan(cover[i]) else round(float(cover[i]), 2),
+            shortage=bool(cover[i] < config['shortage_days']),
+            computed_on=today,
+        )
+        for i, (location_id, blood_group) in enumerate(keys)
+    ]
+    with transaction.atomic():
+        StockForecast.objects.all().delete()
+        StockForecast.objects.bulk_create(forecasts, batch_size=1000)
+    return forecasts
+
+
+def shortages():
+    """Forecast shortages, least cover first."""
+    return StockForecast.objects.filter(shortage=True).select_related('location').order_by('days_of_cover')
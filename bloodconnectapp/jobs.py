@@ -0,0 +1,135 @@
+"""Database-backed job queue drained by ``manage.py run_workers``."""
+import logging
+import time
+import uuid
+from datetime import timedelta
+from itertools import islice
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> handler(payloads, worker) returning one error (or None) per payload.
+HANDLERS = {}
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)  # doubled after each failed attempt
+LEASE = timedelta(minutes=5)  # a running job whose worker died is retried after this
+
+
+def handler(kind):
+    """Register the decorated function as the handler for jobs of ``kind``."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, payloads, batch_size=1000):
+    """Queue one job of ``kind`` per payload dict, inserting ``batch_size`` at a time from any iterable."""
+    payloads = iter(payloads)
+    while batch := list(islice(payloads, batch_size)):
+        Job.objects.bulk_create([Job(kind=kind, payload=payload) for payload in batch])
+
+
+def claim(batch_size, lease=LEASE):
+    """
+    Take up to ``batch_size`` ready jobs for this worker and return them.
+
+    The claim is a conditional UPDATE on (status, available_at), so two
+    workers racing for the same jobs cannot both get them; on backends that
+    support it, rows locked by another worker are skipped instead of waited on.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    ready = Job.objects.filter(status__in=('queued', 'running'), available_at__lte=now)
+    with transaction.atomic():
+        candidates = ready.order_by('available_at', 'id')
+        if connections[candidates.db].features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:batch_size])
+        ready.filter(id__in=ids).update(
+            status='running', available_at=now + lease, claimed_by=token, attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(claimed_by=token, status='running').order_by('id'))
+
+
+def retry_delay(attempts):
+    return RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def finish(jobs, errors):
+    """Record the outcome of claimed jobs: done, queued again with backoff, or failed for good."""
+    now = timezone.now()
+    done = [job.id for job, error in zip(jobs, errors) if error is None]
+    if done:
+        # Jobs in one claim share its token; matching it skips any a newer claim has taken over.
+        Job.objects.filter(id__in=done, claimed_by=jobs[0].claimed_by).update(
+            status='done', finished_at=now, last_error='',
+        )
+    for job, error in zip(jobs, errors):
+        if error is None:
+            continue
+        logger.warning('%s failed (attempt %d): %s', job, job.attempts, error)
+        if job.attempts >= MAX_ATTEMPTS:
+            changes = {'status': 'failed', 'finished_at': now}
+        else:
+            changes = {'status': 'queued', 'available_at': now + retry_delay(job.attempts)}
+        Job.objects.filter(id=job.id, claimed_by=job.claimed_by).update(last_error=str(error), **changes)
+
+
+class RateLimiter:
+    """Spaces out operations so each key runs at most ``rates[key]`` times per second in this process."""
+
+    def __init__(self, rates, clock=time.monotonic, sleep=time.sleep):
+        self.rates = rates
+        self.clock = clock
+        self.sleep = sleep
+        self._next = {}
+
+    def wait(self, key, count=1):
+        """Block until ``count`` more operations for ``key`` fit within its rate."""
+        rate = self.rates.get(key)
+        if not rate:
+            return
+        now = self.clock()
+        start = max(self._next.get(key, now), now)
+        self._next[key] = start + count / rate
+        if start > now:
+            self.sleep(start - now)
+
+
+class Worker:
+    """Claims batches of jobs and runs them through their registered handlers."""
+
+    def __init__(self, batch_size=100, poll_interval=1.0, rates=None):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.limiter = RateLimiter(rates or {})
+
+    def run_batch(self):
+        """Run one batch of ready jobs and return how many were claimed."""
+        jobs = claim(self.batch_size)
+        by_kind = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(job)
+        for kind, group in by_kind.items():
+            try:
+                errors = HANDLERS[kind]([job.payload for job in group], self)
+            except Exception as exc:
+                logger.exception('%s handler failed on a batch of %d', kind, len(group))
+                errors = [exc] * len(group)
+            finish(group, errors)
+        return len(jobs)
+
+    def run(self, once=False):
+        """Drain the queue, polling for new jobs when it is empty unless ``once`` is set."""
+        while True:
+            if not self.run_batch():
+                if once:
+                    return
+                time.sleep(self.poll_interval)
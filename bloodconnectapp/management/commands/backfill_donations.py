@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bloodconnectapp import donations
+from bloodconnectapp.models import BloodRequest
+
+
+class Command(BaseCommand):
+    help = (
+        'Record the Donations, and their share of the daily, blood group and city rollups, for every completed '
+        'blood request that has none, e.g. requests completed before the donation ledger existed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        missing = BloodRequest.objects.filter(status='completed', donations__isnull=True, units_from_stock=0).order_by('id')
+        recorded = 0
+        last_id = 0
+        while True:
+            batch = list(missing.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                recorded += len(donations.record(batch))
+            last_id = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f'{recorded} donations recorded.'))
@@ -0,0 +1,99 @@
+import csv
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bloodconnectapp.models import User, Location, BloodRequest, location_key
+
+
+class Command(BaseCommand):
+    help = (
+        'Create normalized Location rows from the free-text User.city/state/country fields, '
+        'link users and their blood requests to them, and optionally load coordinates from a '
+        'gazetteer CSV with city,state,country,latitude,longitude columns.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gazetteer', help='CSV file with city,state,country,latitude,longitude columns')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        coordinates = self.load_gazetteer(options['gazetteer']) if options['gazetteer'] else {}
+
+        with transaction.atomic():
+            created = self.create_locations(batch_size)
+            located = self.apply_coordinates(coordinates)
+            users = self.link_users(batch_size)
+            requests = self.link_requests()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} locations created, {located} given coordinates, '
+            f'{users} users and {requests} blood requests linked.'
+        ))
+
+    def load_gazetteer(self, path):
+        coordinates = {}
+        try:
+            with open(path, newline='', encoding='utf-8') as handle:
+                for row in csv.DictReader(handle):
+                    key = location_key(row['city'], row.get('state', ''), row.get('country', ''))
+                    coordinates[key] = (float(row['latitude']), float(row['longitude']))
+        except (OSError, KeyError, ValueError) as exc:
+            raise CommandError(f'Could not read gazetteer {path}: {exc}')
+        return coordinates
+
+    def distinct_cities(self):
+        """Yield (key, city, state, country) once per distinct normalized user location."""
+        seen = set()
+        rows = User.objects.exclude(city='').values_list('city', 'state', 'country').distinct()
+        for city, state, country in rows.iterator():
+            key = location_key(city, state, country)
+            if key.split('|', 1)[0] and key not in seen:
+                seen.add(key)
+                yield key, city, state, country
+
+    def create_locations(self, batch_size):
+        existing = set(Location.objects.values_list('key', flat=True))
+        new_locations = [
+            Location(key=key, name=' '.join(city.split()), state=state.strip(), country=country.strip())
+            for key, city, state, country in self.distinct_cities()
+            if key not in existing
+        ]
+        Location.objects.bulk_create(new_locations, batch_size=batch_size, ignore_conflicts=True)
+        return len(new_locations)
+
+    def apply_coordinates(self, coordinates):
+        located = 0
+        for location in Location.objects.filter(key__in=list(coordinates)).only('id', 'key'):
+            latitude, longitude = coordinates[location.key]
+            located += Location.objects.filter(pk=location.pk).update(latitude=latitude, longitude=longitude)
+        return located
+
+    def link_users(self, batch_size):
+        """Point every unlinked user at its location with one UPDATE per location and batch."""
+        location_ids = dict(Location.objects.values_list('key', 'id'))
+        users_by_location = defaultdict(list)
+        rows = User.objects.filter(location__isnull=True).exclude(city='').values_list('id', 'city', 'state', 'country')
+        for user_id, city, state, country in rows.iterator(chunk_size=batch_size):
+            location_id = location_ids.get(location_key(city, state, country))
+            if location_id:
+                users_by_location[location_id].append(user_id)
+
+        linked = 0
+        for location_id, user_ids in users_by_location.items():
+            for start in range(0, len(user_ids), batch_size):
+                linked += User.objects.filter(id__in=user_ids[start:start + batch_size]).update(location_id=location_id)
+        return linked
+
+    def link_requests(self):
+        """Default each request's hospital location to its requester's location."""
+        linked = 0
+        location_ids = User.objects.filter(location__isnull=False).values_list('location_id', flat=True).distinct()
+        for location_id in location_ids:
+            linked += BloodRequest.objects.filter(
+                hospital_location__isnull=True,
+                requester__location_id=location_id,
+            ).update(hospital_location_id=location_id)
+        return linked
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bloodconnectapp import api
+from bloodconnectapp.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Create an API token for the user with this email, for an app or partner system that calls the JSON API '
+        'without a browser session. It sends the token as "Authorization: Bearer <token>". The token is printed '
+        'once; revoke it by deleting it in the admin.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the user the token acts as')
+        parser.add_argument('--name', required=True, help='Who or what uses the token, e.g. "Apollo Chennai"')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f"No user with email {options['email']!r}.")
+        self.stdout.write(api.issue_token(user, options['name']))
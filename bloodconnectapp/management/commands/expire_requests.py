@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bloodconnectapp import operations
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancel every pending blood request whose required date has passed, in set-based updates inside one '
+        'transaction, and record the run in the audit log. Schedule it daily, just after midnight.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Expire requests as of this YYYY-MM-DD date instead of today')
+        parser.add_argument(
+            '--grace-days', type=int, default=0,
+            help='Keep requests open for this many days past their required date',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Count the requests that would be cancelled')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid --date {options['date']!r}; expected YYYY-MM-DD.")
+        if options['grace_days'] < 0:
+            raise CommandError('--grace-days must not be negative.')
+
+        if options['dry_run']:
+            stale = operations.stale_requests(today, options['grace_days']).count()
+            self.stdout.write(f'{stale} pending requests would be cancelled.')
+            return
+        cancelled = operations.expire_requests(today, options['grace_days'])
+        self.stdout.write(self.style.SUCCESS(f'{len(cancelled)} stale pending requests cancelled.'))
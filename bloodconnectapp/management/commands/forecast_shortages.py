@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bloodconnectapp import inventory
+
+
+class Command(BaseCommand):
+    help = (
+        'Forecast daily blood demand per hospital location and blood group from the request history, '
+        'compare it with the recorded whole blood stock, and flag groups with fewer than '
+        'BLOODCONNECT_FORECAST["shortage_days"] days of cover. Schedule it nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Forecast as of this YYYY-MM-DD date instead of today')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid --date {options['date']!r}; expected YYYY-MM-DD.")
+
+        forecasts = inventory.forecast(today)
+        short = [forecast for forecast in forecasts if forecast.shortage]
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(forecasts)} demand forecasts written, {len(short)} shortages.'
+        ))
+        if options['verbosity'] >= 2:
+            for forecast in inventory.shortages():
+                self.stdout.write(
+                    f'{forecast.location}: {forecast.blood_group} {forecast.stock_units} units in stock, '
+                    f'{forecast.daily_units:.1f}/day, {forecast.days_of_cover:.1f} days of cover'
+                )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bloodconnectapp import search
+from bloodconnectapp.models import BloodRequest
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the full-text index of blood request hospitals, reasons and requesters '
+        '(SQLite FTS5 or PostgreSQL tsvector). Run once after migrating; signals keep it current afterwards.'
+    )
+
+    def handle(self, *args, **options):
+        if search.backend() is None:
+            self.stdout.write('This database has no full-text index; searches use icontains.')
+            return
+        with transaction.atomic():
+            search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {BloodRequest.objects.count()} blood requests.'))
@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bloodconnectapp import eligibility
+
+
+class Command(BaseCommand):
+    help = (
+        'Apply the donation interval to every donor with set-based updates: mark donors who donated too '
+        'recently unavailable and make them available again once their interval has passed. '
+        'Schedule it daily, e.g. from cron, and run it once after upgrading to fill in eligibility dates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Evaluate eligibility as of this YYYY-MM-DD date instead of today')
+        parser.add_argument(
+            '--recompute', action='store_true',
+            help='Recalculate every eligibility date, e.g. after BLOODCONNECT_DONATION_INTERVAL_DAYS changes',
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid --date {options['date']!r}; expected YYYY-MM-DD.")
+
+        computed, held, released = eligibility.refresh(today, recompute=options['recompute'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{computed} eligibility dates computed, {held} donors held until eligible, {released} released.'
+        ))
@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bloodconnectapp import priority
+
+
+class Command(BaseCommand):
+    help = (
+        'Rescore every pending blood request by urgency, required date and time waiting in one set-based '
+        'update, so the most critical requests are listed first. Schedule it at least daily, just after '
+        'midnight, and run it once after upgrading or changing BLOODCONNECT_PRIORITY.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Score requests as of this YYYY-MM-DD date instead of today')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid --date {options['date']!r}; expected YYYY-MM-DD.")
+
+        changed = priority.refresh(today)
+        self.stdout.write(self.style.SUCCESS(f'{changed} pending requests rescored.'))
@@ -0,0 +1,49 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bloodconnectapp.jobs import Worker
+
+
+def work(batch_size, poll_interval, once):
+    # Each process opens its own database connection rather than sharing the parent's.
+    connections.close_all()
+    Worker(batch_size, poll_interval, settings.BLOODCONNECT_NOTIFICATION_RATES).run(once=once)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run worker processes that drain the job queue (emergency broadcasts and donor notifications). '
+        'Each process claims --batch-size jobs at a time; failed jobs are retried with backoff.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once no jobs are ready instead of polling')
+
+    def handle(self, *args, **options):
+        worker_args = (options['batch_size'], options['poll_interval'], options['once'])
+        if options['processes'] <= 1:
+            work(*worker_args)
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=work, args=worker_args, name=f'bloodconnect-worker-{i}')
+            for i in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Started {len(processes)} workers.')
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
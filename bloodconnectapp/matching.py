@@ -0,0 +1,146 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import DonorProfile
+
+
+def _antigens(blood_group):
+    """Return the set of red cell antigens carried by a blood group, e.g. 'AB+' -> {'A', 'B', 'Rh'}."""
+    abo, rh = blood_group[:-1], blood_group[-1]
+    antigens = set(abo.replace('O', ''))
+    if rh == '+':
+        antigens.add('Rh')
+    return antigens
+
+
+BLOOD_GROUPS = tuple(code for code, _ in DonorProfile.BLOOD_GROUP_CHOICES)
+
+# Recipient blood group -> donor blood groups that can safely give to it.
+# A donor is compatible when it carries no antigen the recipient lacks.
+COMPATIBLE_DONORS = {
+    recipient: tuple(
+        donor for donor in BLOOD_GROUPS
+        if _antigens(donor) <= _antigens(recipient)
+    )
+    for recipient in BLOOD_GROUPS
+}
+
+
+def normalize_city(city):
+    """Normalize a free-text city so it can be used as an index key."""
+    return ' '.join((city or '').split()).casefold()
+
+
+def city_key(user):
+    """
+    Key deciding whether two users are in the same city: the city part of the
+    user's Location key, or their normalized free-text city if they have no
+    Location. Load ``user.location`` with select_related to avoid a query.
+    """
+    if user.location_id is None:
+        return normalize_city(user.city)
+    return user.location.key.split('|', 1)[0]
+
+
+def local_to(key):
+    """Q matching donors whose city_key() is ``key``, so match_donors() agrees with DonorIndex."""
+    return (
+        Q(user__location__key__startswith=key + '|')
+        | Q(user__location__isnull=True, user__city__iexact=key)
+    )
+
+
+def rank_key(donor, blood_group, key):
+    """Sort key ranking donors for a request: same city, exact group, then longest since last donation."""
+    return (
+        city_key(donor.user) != key,
+        donor.blood_group != blood_group,
+        donor.last_donation_date or date.min,
+        donor.pk,
+    )
+
+
+class DonorIndex:
+    """In-memory index of available donors keyed by blood group and city_key()."""
+
+    def __init__(self, donors):
+        self._buckets = defaultdict(list)
+        self._by_group = defaultdict(list)
+        for donor in donors:
+            if not donor.is_available:
+                continue
+            self._buckets[(donor.blood_group, city_key(donor.user))].append(donor)
+            self._by_group[donor.blood_group].append(donor)
+
+    @classmethod
+    def build(cls, blood_groups=None):
+        """Load available donors, optionally restricted to the given blood groups, in one query."""
+        donors = DonorProfile.objects.filter(is_available=True).select_related('user__location')
+        if blood_groups is not None:
+            donors = donors.filter(blood_group__in=set(blood_groups))
+        return cls(donors)
+
+    def __len__(self):
+        return sum(len(donors) for donors in self._by_group.values())
+
+    def lookup(self, blood_group, key='', same_city_only=False, limit=None):
+        """Return ranked donors compatible with a recipient blood group, local to city_key() ``key`` first."""
+        candidates = []
+        for donor_group in COMPATIBLE_DONORS[blood_group]:
+            if same_city_only:
+                candidates.extend(self._buckets.get((donor_group, key), ()))
+            else:
+                candidates.extend(self._by_group.get(donor_group, ()))
+        candidates.sort(key=lambda donor: rank_key(donor, blood_group, key))
+        return candidates[:limit] if limit is not None else candidates
+
+
+def compatible_donors(blood_group):
+    """Return a queryset of available donors whose blood can be given to ``blood_group``."""
+    return DonorProfile.objects.filter(
+        blood_group__in=COMPATIBLE_DONORS[blood_group],
+        is_available=True,
+    )
+
+
+def match_donors(blood_request, same_city_only=False, limit=None):
+    """
+    Return available donors for a single blood request, best matches first.
+
+    Ranked in the database as rank_key() ranks them, so only ``limit`` donors
+    are loaded rather than every compatible donor.
+    """
+    blood_group = blood_request.blood_group
+    local = local_to(city_key(blood_request.requester))
+    donors = compatible_donors(blood_group).select_related('user')
+    if same_city_only:
+        donors = donors.filter(local)
+    donors = donors.annotate(
+        remote=Case(When(local, then=Value(0)), default=Value(1), output_field=IntegerField()),
+        other_group=Case(When(blood_group=blood_group, then=Value(0)), default=Value(1), output_field=IntegerField()),
+    ).order_by('remote', 'other_group', F('last_donation_date').asc(nulls_first=True), 'pk')
+    return list(donors[:limit] if limit is not None else donors)
+
+
+def match_requests(blood_requests, same_city_only=False, limit=None):
+    """
+    Match many blood requests in one pass, returning a dict of request id ->
+    ranked donors. Load the requests with select_related('requester__location').
+    """
+    blood_requests = list(blood_requests)
+    needed_groups = set()
+    for blood_request in blood_requests:
+        needed_groups.update(COMPATIBLE_DONORS[blood_request.blood_group])
+
+    index = DonorIndex.build(needed_groups)
+    return {
+        blood_request.id: index.lookup(
+            blood_request.blood_group,
+            key=city_key(blood_request.requester),
+            same_city_only=same_city_only,
+            limit=limit,
+        )
+        for blood_request in blood_requests
+    }
@@ -0,0 +1,227 @@
+"""
+Per-view request metrics exposed in Prometheus text format at /metrics.
+
+MetricsMiddleware times every request and counts its database queries and
+template render time, keyed by URL name. Values are kept as plain counters
+in this process; set BLOODCONNECT_METRICS_SQLITE to a file path to have every
+worker process add its counters there, so /metrics on any gunicorn worker
+reports the totals for all of them.
+"""
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+DURATION = 'bloodconnect_request_duration_seconds'
+RESPONSES = 'bloodconnect_responses_total'
+DB_QUERIES = 'bloodconnect_db_queries_total'
+DB_SECONDS = 'bloodconnect_db_seconds_total'
+TEMPLATE_SECONDS = 'bloodconnect_template_seconds_total'
+
+HELP = {
+    DURATION: ('histogram', 'Time spent handling requests, by view.'),
+    RESPONSES: ('counter', 'Responses sent, by view and status class.'),
+    DB_QUERIES: ('counter', 'Database queries run while handling requests, by view.'),
+    DB_SECONDS: ('counter', 'Time spent in database queries, by view.'),
+    TEMPLATE_SECONDS: ('counter', 'Time spent rendering templates, by view.'),
+}
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKET_LABELS = tuple(repr(bound) for bound in BUCKETS) + ('+Inf',)
+
+
+class Sample:
+    """What one request spent on the database and templates."""
+
+    __slots__ = ('queries', 'db_seconds', 'template_seconds', 'template_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Database execute wrapper: time every query the request runs.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+_current_sample = ContextVar('bloodconnect_metrics_sample', default=None)
+
+
+class SQLiteSink:
+    """Counters shared by worker processes in one SQLite file; each flush adds a process's deltas."""
+
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS metrics '
+                '(name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (name, labels))'
+            )
+
+    @contextmanager
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=5)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def add(self, values):
+        with self.connect() as db:
+            db.executemany(
+                'INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                [(name, labels, value) for (name, labels), value in values.items()],
+            )
+
+    def read(self):
+        with self.connect() as db:
+            return {(name, labels): value for name, labels, value in db.execute('SELECT name, labels, value FROM metrics')}
+
+
+def _exposition_order(item):
+    """Sort by metric and view, with histogram buckets in increasing order."""
+    (name, labels), _ = item
+    view, _, bucket = labels.partition(',le="')
+    return name, view, BUCKET_LABELS.index(bucket[:-1]) if bucket else -1
+
+
+class Registry:
+    """Thread-safe counters keyed by (metric name, Prometheus label string)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._sinks = {}
+        self._flushed_at = time.monotonic()
+
+    def _inc(self, name, labels, amount):
+        key = (name, labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def record(self, view, status, seconds, sample):
+        view_label = 'view="%s"' % view.replace('\\', '\\\\').replace('"', '\\"')
+        with self._lock:
+            # Every bucket gets a sample, even at 0, so each view exposes a complete histogram.
+            first = bisect_left(BUCKETS, seconds)
+            for position, bucket in enumerate(BUCKET_LABELS):
+                self._inc(DURATION + '_bucket', f'{view_label},le="{bucket}"', int(position >= first))
+            self._inc(DURATION + '_sum', view_label, seconds)
+            self._inc(DURATION + '_count', view_label, 1)
+            self._inc(RESPONSES, f'{view_label},status="{status // 100}xx"', 1)
+            self._inc(DB_QUERIES, view_label, sample.queries)
+            self._inc(DB_SECONDS, view_label, sample.db_seconds)
+            self._inc(TEMPLATE_SECONDS, view_label, sample.template_seconds)
+        if self.sink() and time.monotonic() - self._flushed_at >= settings.BLOODCONNECT_METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def sink(self):
+        path = settings.BLOODCONNECT_METRICS_SQLITE
+        if not path:
+            return None
+        if path not in self._sinks:
+            self._sinks[path] = SQLiteSink(path)
+        return self._sinks[path]
+
+    def flush(self):
+        """Move this process's counters into the shared sink, if one is configured."""
+        sink = self.sink()
+        if sink is None:
+            return
+        with self._lock:
+            values, self._values = self._values, {}
+            self._flushed_at = time.monotonic()
+        if values:
+            sink.add(values)
+
+    def values(self):
+        sink = self.sink()
+        if sink is None:
+            with self._lock:
+                return dict(self._values)
+        self.flush()
+        return sink.read()
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+
+    def exposition(self):
+        """All counters in the Prometheus text exposition format."""
+        by_family = {}
+        for (name, labels), value in sorted(self.values().items(), key=_exposition_order):
+            family = name.rsplit('_', 1)[0] if name.startswith(DURATION) else name
+            by_family.setdefault(family, []).append(f'{name}{{{labels}}} {float(value)!r}')
+        lines = []
+        for family, samples in by_family.items():
+            kind, description = HELP[family]
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class MetricsMiddleware:
+    """Records latency, query count and time, and template time for every request, by URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample = Sample()
+        token = _current_sample.set(sample)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        REGISTRY.record(view, response.status_code, time.perf_counter() - started, sample)
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        sample = _current_sample.get()
+        if sample is None:
+            return super().render(context, request)
+        sample.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_depth -= 1
+            if not sample.template_depth:
+                # Only the outermost render counts, so templates rendered from tags are not counted twice.
+                sample.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render time added to the current request's metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
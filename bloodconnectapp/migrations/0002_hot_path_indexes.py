@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-17 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-created_at', '-id'], name='bloodreq_pending_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['blood_group', '-created_at'], name='bloodreq_pending_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['urgency', '-created_at'], name='bloodreq_pending_urgency_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['status', '-created_at'], name='bloodreq_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['blood_group', 'is_available'], name='donor_group_available_idx'),
+        ),
+    ]
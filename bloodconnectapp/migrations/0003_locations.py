@@ -0,0 +1,41 @@
+# Generated by Django 5.0.14 on 2026-10-17 16:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=310, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('state', models.CharField(blank=True, max_length=100)),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'location',
+                'verbose_name_plural': 'locations',
+                'indexes': [models.Index(fields=['latitude', 'longitude'], name='location_lat_lon_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='hospital_location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='blood_requests', to='bloodconnectapp.location'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='bloodconnectapp.location'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-17 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0004_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donorprofile',
+            name='eligible_from',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='donorprofile',
+            name='held_until_eligible',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['eligible_from'], name='donor_hold_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(condition=models.Q(('held_until_eligible', True)), fields=['eligible_from'], name='donor_release_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-17 18:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0005_donor_eligibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloodGroupDonations',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('donations', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=3, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'blood group donations',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyDonations',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('donations', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('day', models.DateField(unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'daily donations',
+            },
+        ),
+        migrations.CreateModel(
+            name='CityDonations',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('donations', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('location', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='donation_totals', to='bloodconnectapp.location')),
+            ],
+            options={
+                'verbose_name_plural': 'city donations',
+                'indexes': [models.Index(fields=['-units'], name='city_donations_units_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Donation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=3)),
+                ('units', models.PositiveIntegerField()),
+                ('donated_on', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blood_request', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donation', to='bloodconnectapp.bloodrequest')),
+                ('donor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donations', to='bloodconnectapp.donorprofile')),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donations', to='bloodconnectapp.location')),
+            ],
+            options={
+                'verbose_name': 'donation',
+                'verbose_name_plural': 'donations',
+                'ordering': ['-donated_on', '-id'],
+                'indexes': [models.Index(fields=['-donated_on', '-id'], name='donation_recent_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-17 18:40
+
+from django.db import migrations
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE bloodconnectapp_requestsearch USING fts5("
+    "hospital, reason, requester, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+]
+
+POSTGRESQL_CREATE = [
+    'CREATE TABLE bloodconnectapp_requestsearch ('
+    'request_id bigint PRIMARY KEY REFERENCES bloodconnectapp_bloodrequest (id) ON DELETE CASCADE, '
+    'document tsvector NOT NULL)',
+    'CREATE INDEX bloodconnectapp_requestsearch_document_idx ON bloodconnectapp_requestsearch USING GIN (document)',
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS bloodconnectapp_requestsearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0006_donation_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
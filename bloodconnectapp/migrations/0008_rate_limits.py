@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0007_request_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('window', models.BigIntegerField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'rate limit window',
+                'verbose_name_plural': 'rate limit windows',
+                'constraints': [models.UniqueConstraint(fields=('key', 'window'), name='ratelimit_window_unique')],
+            },
+        ),
+    ]
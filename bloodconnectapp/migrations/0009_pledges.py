@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-17 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_accepted_requests(apps, schema_editor):
+    # Requests accepted by a single donor before pledges existed were fully taken.
+    BloodRequest = apps.get_model('bloodconnectapp', 'BloodRequest')
+    BloodRequest.objects.filter(status__in=['accepted', 'completed']).update(units_pledged=models.F('units_needed'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0008_rate_limits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='units_pledged',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_accepted_requests, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='Pledge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blood_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pledges', to='bloodconnectapp.bloodrequest')),
+                ('donor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pledges', to='bloodconnectapp.donorprofile')),
+            ],
+            options={
+                'verbose_name': 'pledge',
+                'verbose_name_plural': 'pledges',
+                'ordering': ['created_at', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('blood_request', 'donor'), name='pledge_once_per_donor')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:15
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def score_pending_requests(apps, schema_editor):
+    # Score existing pending requests as priority.refresh() does as of this migration, so the
+    # priority ordering is right before the first scheduled refresh.
+    BloodRequest = apps.get_model('bloodconnectapp', 'BloodRequest')
+    weights = settings.BLOODCONNECT_PRIORITY
+    today = timezone.localdate()
+    horizon = weights['deadline_horizon_days']
+    urgency = models.Case(
+        *[models.When(urgency=level, then=models.Value(points)) for level, points in weights['urgency'].items()],
+        default=models.Value(0), output_field=models.IntegerField(),
+    )
+    deadline = models.Case(
+        *[
+            models.When(
+                required_date__lte=today + timedelta(days=days),
+                then=models.Value(weights['deadline_points_per_day'] * (horizon - days)),
+            )
+            for days in range(horizon)
+        ],
+        default=models.Value(0), output_field=models.IntegerField(),
+    )
+    waiting = models.Case(
+        *[
+            models.When(
+                created_at__lt=timezone.make_aware(datetime.combine(today - timedelta(days=days - 1), time.min)),
+                then=models.Value(weights['waiting_points_per_day'] * days),
+            )
+            for days in range(weights['waiting_cap_days'], 0, -1)
+        ],
+        default=models.Value(0), output_field=models.IntegerField(),
+    )
+    BloodRequest.objects.filter(status='pending').update(priority=urgency + deadline + waiting)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0009_pledges'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='priority',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(score_pending_requests, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-priority', '-id'], name='bloodreq_pending_priority_idx'),
+        ),
+    ]
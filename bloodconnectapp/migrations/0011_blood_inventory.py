@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0010_request_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloodStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=3)),
+                ('component', models.CharField(choices=[('whole_blood', 'Whole blood'), ('red_cells', 'Red cells'), ('platelets', 'Platelets'), ('plasma', 'Plasma')], default='whole_blood', max_length=15)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blood_stock', to='bloodconnectapp.location')),
+            ],
+            options={
+                'verbose_name': 'blood stock',
+                'verbose_name_plural': 'blood stock',
+                'constraints': [models.UniqueConstraint(fields=('location', 'blood_group', 'component'), name='blood_stock_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blood_group', models.CharField(choices=[('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'), ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-')], max_length=3)),
+                ('daily_units', models.FloatField()),
+                ('recent_daily_units', models.FloatField()),
+                ('peak_daily_units', models.FloatField()),
+                ('stock_units', models.PositiveIntegerField(null=True)),
+                ('days_of_cover', models.FloatField(null=True)),
+                ('shortage', models.BooleanField(default=False)),
+                ('computed_on', models.DateField()),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_forecasts', to='bloodconnectapp.location')),
+            ],
+            options={
+                'verbose_name': 'stock forecast',
+                'verbose_name_plural': 'stock forecasts',
+                'indexes': [models.Index(condition=models.Q(('shortage', True)), fields=['days_of_cover'], name='stock_forecast_shortage_idx')],
+                'constraints': [models.UniqueConstraint(fields=('location', 'blood_group'), name='stock_forecast_unique')],
+            },
+        ),
+    ]
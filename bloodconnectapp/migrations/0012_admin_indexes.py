@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0011_blood_inventory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='bloodreq_created_idx'),
+        ),
+    ]
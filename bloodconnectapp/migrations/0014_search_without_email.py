@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:40
+
+from django.db import migrations
+
+# The request search documents as of this migration, without the requester's email address.
+SOURCE = 'FROM bloodconnectapp_bloodrequest r JOIN bloodconnectapp_user u ON u.id = r.requester_id'
+
+SQLITE_REINDEX = [
+    'DELETE FROM bloodconnectapp_requestsearch',
+    "INSERT INTO bloodconnectapp_requestsearch (rowid, hospital, reason, requester) "
+    "SELECT r.id, r.hospital_name || ' ' || r.hospital_address, r.reason, "
+    "u.first_name || ' ' || u.last_name || ' ' || u.username " + SOURCE,
+]
+
+POSTGRESQL_REINDEX = [
+    'DELETE FROM bloodconnectapp_requestsearch',
+    "INSERT INTO bloodconnectapp_requestsearch (request_id, document) "
+    "SELECT r.id, "
+    "setweight(to_tsvector('simple', r.hospital_name || ' ' || r.hospital_address), 'A') || "
+    "setweight(to_tsvector('simple', concat_ws(' ', u.first_name, u.last_name, u.username)), 'B') || "
+    "setweight(to_tsvector('simple', r.reason), 'C') " + SOURCE,
+]
+
+
+def reindex_requests(apps, schema_editor):
+    statements = {'sqlite': SQLITE_REINDEX, 'postgresql': POSTGRESQL_REINDEX}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0013_audit_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_requests, migrations.RunPython.noop),
+    ]
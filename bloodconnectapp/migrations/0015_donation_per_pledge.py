@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0014_search_without_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='donation',
+            name='blood_request',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='donations', to='bloodconnectapp.bloodrequest'),
+        ),
+        migrations.AddConstraint(
+            model_name='donation',
+            constraint=models.UniqueConstraint(fields=('blood_request', 'donor'), name='donation_once_per_donor'),
+        ),
+    ]
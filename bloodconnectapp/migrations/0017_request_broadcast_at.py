@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0016_api_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='broadcast_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
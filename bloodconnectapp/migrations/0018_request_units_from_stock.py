@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloodconnectapp', '0017_request_broadcast_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloodrequest',
+            name='units_from_stock',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,7 +1,52 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import sql
 from django.contrib.auth.models import AbstractUser
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+# Sent after BloodRequestQuerySet.transition() moves rows between statuses with a
+# queryset update (no post_save is sent). Arguments: from_status, to_status, ids.
+request_status_changed = Signal()
+
+def location_key(city, state='', country=''):
+    """Normalized lookup key for a free-text city, e.g. ' New  Delhi ' -> 'new delhi||'."""
+    return '|'.join(' '.join((part or '').split()).casefold() for part in (city, state, country))
+
+
+class LocationManager(models.Manager):
+    def resolve(self, city, state='', country=''):
+        """Return the Location for a free-text city, creating it if needed, or None for a blank city."""
+        if not (city or '').strip():
+            return None
+        location, _ = self.get_or_create(
+            key=location_key(city, state, country),
+            defaults={'name': city.strip(), 'state': (state or '').strip(), 'country': (country or '').strip()},
+        )
+        return location
+
+
+class Location(models.Model):
+    """Normalized city with optional coordinates, shared by users and hospitals"""
+    key = models.CharField(max_length=310, unique=True)
+    name = models.CharField(max_length=100)
+    state = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=100, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    objects = LocationManager()
+
+    def __str__(self):
+        return ', '.join(part for part in (self.name, self.state, self.country) if part)
+
+    class Meta:
+        verbose_name = _('location')
+        verbose_name_plural = _('locations')
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='location_lat_lon_idx'),
+        ]
+
 class User(AbstractUser):
     """Custom user model for BloodConnect"""
     USER_TYPE_CHOICES = (
@@ -17,6 +62,7 @@ class User(AbstractUser):
     city = models.CharField(max_length=100, blank=True)
     state = models.CharField(max_length=100, blank=True)
     country = models.CharField(max_length=100, blank=True)
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -30,6 +76,16 @@ class User(AbstractUser):
         verbose_name = _('user')
         verbose_name_plural = _('users')
 
+class DonorProfileQuerySet(models.QuerySet):
+    def eligible(self, today=None):
+        """Available donors whose donation interval has passed."""
+        today = today or timezone.localdate()
+        return self.filter(
+            models.Q(eligible_from__isnull=True) | models.Q(eligible_from__lte=today),
+            is_available=True,
+        )
+
+
 class DonorProfile(models.Model):
     """Model for storing donor-specific information"""
     BLOOD_GROUP_CHOICES = (
@@ -55,9 +111,15 @@ class DonorProfile(models.Model):
     age = models.PositiveIntegerField()
     last_donation_date = models.DateField(null=True, blank=True)
     is_available = models.BooleanField(default=True)
+    # First day the donation interval allows another donation; see eligibility.py.
+    eligible_from = models.DateField(null=True, blank=True, editable=False)
+    # Set when is_available was cleared only because of the interval, so it is restored afterwards.
+    held_until_eligible = models.BooleanField(default=False, editable=False)
     medical_conditions = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DonorProfileQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.blood_group}"
@@ -65,6 +127,54 @@ class DonorProfile(models.Model):
     class Meta:
         verbose_name = _('donor profile')
         verbose_name_plural = _('donor profiles')
+        indexes = [
+            models.Index(fields=['blood_group', 'is_available'], name='donor_group_available_idx'),
+            # refresh_eligibility: donors to hold, and held donors to release, by date.
+            models.Index(fields=['eligible_from'], name='donor_hold_idx', condition=models.Q(is_available=True)),
+            models.Index(fields=['eligible_from'], name='donor_release_idx', condition=models.Q(held_until_eligible=True)),
+        ]
+
+class BloodRequestQuerySet(models.QuerySet):
+    def transition(self, from_status, to_status, **changes):
+        """
+        Move the requests in this queryset that are still in ``from_status`` to
+        ``to_status`` and return the ids that moved.
+
+        All rows move in one conditional ``UPDATE ... WHERE status = from_status``,
+        so concurrent callers racing for the same row cannot both win. The ids
+        come back from the UPDATE itself with RETURNING where the backend
+        supports it, and are otherwise read back by the update's timestamp.
+        """
+        changes.update(status=to_status, updated_at=timezone.now())
+        pending = self.filter(status=from_status)
+        with transaction.atomic(using=self.db):
+            if connections[self.db].features.can_return_columns_from_insert:
+                moved = pending._update_returning_ids(changes)
+            elif pending.update(**changes):
+                stamped = self.model._default_manager.using(self.db).filter(
+                    status=to_status, updated_at=changes['updated_at'],
+                )
+                moved = list(stamped.values_list('id', flat=True))
+            else:
+                moved = []
+            if moved:
+                request_status_changed.send(
+                    sender=self.model, from_status=from_status, to_status=to_status, ids=moved,
+                )
+        return moved
+
+    def _update_returning_ids(self, changes):
+        """``update(**changes)`` as ``UPDATE ... RETURNING id``; returns the ids updated."""
+        query = self.query.chain(sql.UpdateQuery)
+        query.add_update_values(changes)
+        query.clear_ordering(force=True)
+        query.clear_select_clause()
+        statement, params = query.get_compiler(self.db).as_sql()
+        connection = connections[self.db]
+        with connection.cursor() as cursor:
+            cursor.execute(f'{statement} RETURNING {connection.ops.quote_name(self.model._meta.pk.column)}', params)
+            return [row[0] for row in cursor.fetchall()]
+
 
 class BloodRequest(models.Model):
     """Model for storing blood donation requests"""
@@ -84,20 +194,283 @@ class BloodRequest(models.Model):
     requester = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blood_requests')
     blood_group = models.CharField(max_length=3, choices=DonorProfile.BLOOD_GROUP_CHOICES)
     units_needed = models.PositiveIntegerField(default=1)
+    # Units donors have pledged so far; only ever changed by pledges.pledge().
+    units_pledged = models.PositiveIntegerField(default=0, editable=False)
+    # Units of a completed request the hospital's blood bank supplied rather than donors; set by donations.record().
+    units_from_stock = models.PositiveIntegerField(default=0, editable=False)
     hospital_name = models.CharField(max_length=200)
     hospital_address = models.TextField()
+    hospital_location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='blood_requests')
     reason = models.TextField()
     urgency = models.CharField(max_length=10, choices=URGENCY_CHOICES, default='normal')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     required_date = models.DateField()
+    # Higher is more critical; set on save and rescored daily by priority.refresh().
+    priority = models.IntegerField(default=0, editable=False)
+    # When donors were queued notifications for an emergency request; set once, by notifications.fan_out().
+    broadcast_at = models.DateTimeField(null=True, blank=True, editable=False)
     donor = models.ForeignKey(DonorProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='donation_requests')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = BloodRequestQuerySet.as_manager()
+    
     def __str__(self):
         return f"Request from {self.requester.get_full_name()} - {self.blood_group}"
+
+    @property
+    def units_remaining(self):
+        return max(self.units_needed - self.units_pledged, 0)
     
     class Meta:
         verbose_name = _('blood request')
         verbose_name_plural = _('blood requests')
         ordering = ['-created_at']
+        indexes = [
+            # Home page and request list: most critical pending requests first.
+            models.Index(
+                fields=['-priority', '-id'],
+                name='bloodreq_pending_priority_idx',
+                condition=models.Q(status='pending'),
+            ),
+            # Request list sorted by newest: pending requests, optionally by group or urgency.
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='bloodreq_pending_recent_idx',
+                condition=models.Q(status='pending'),
+            ),
+            models.Index(
+                fields=['blood_group', '-created_at'],
+                name='bloodreq_pending_group_idx',
+                condition=models.Q(status='pending'),
+            ),
+            models.Index(
+                fields=['urgency', '-created_at'],
+                name='bloodreq_pending_urgency_idx',
+                condition=models.Q(status='pending'),
+            ),
+            models.Index(fields=['status', '-created_at'], name='bloodreq_status_created_idx'),
+            # Admin changelist: newest requests of any status, optionally created since a date.
+            models.Index(fields=['-created_at', '-id'], name='bloodreq_created_idx'),
+        ]
+
+
+class Pledge(models.Model):
+    """Units of a blood request one donor has committed to give; see pledges.py"""
+    blood_request = models.ForeignKey(BloodRequest, on_delete=models.CASCADE, related_name='pledges')
+    donor = models.ForeignKey(DonorProfile, on_delete=models.CASCADE, related_name='pledges')
+    units = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.units} unit(s) from {self.donor_id} for request {self.blood_request_id}"
+
+    class Meta:
+        verbose_name = _('pledge')
+        verbose_name_plural = _('pledges')
+        ordering = ['created_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['blood_request', 'donor'], name='pledge_once_per_donor'),
+        ]
+
+
+class Donation(models.Model):
+    """Append-only ledger entry: units one donor gave for a completed blood request"""
+    blood_request = models.ForeignKey(BloodRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name='donations')
+    donor = models.ForeignKey(DonorProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='donations')
+    blood_group = models.CharField(max_length=3, choices=DonorProfile.BLOOD_GROUP_CHOICES)
+    units = models.PositiveIntegerField()
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='donations')
+    donated_on = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.units} unit(s) of {self.blood_group} on {self.donated_on}"
+
+    class Meta:
+        verbose_name = _('donation')
+        verbose_name_plural = _('donations')
+        ordering = ['-donated_on', '-id']
+        indexes = [
+            models.Index(fields=['-donated_on', '-id'], name='donation_recent_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['blood_request', 'donor'], name='donation_once_per_donor'),
+        ]
+
+
+class DonationTotals(models.Model):
+    """Running totals kept up to date by donations.record(); one row per key, never rescanned"""
+    donations = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyDonations(DonationTotals):
+    day = models.DateField(unique=True)
+
+    class Meta:
+        verbose_name_plural = _('daily donations')
+
+
+class BloodGroupDonations(DonationTotals):
+    blood_group = models.CharField(max_length=3, choices=DonorProfile.BLOOD_GROUP_CHOICES, unique=True)
+
+    class Meta:
+        verbose_name_plural = _('blood group donations')
+
+
+class CityDonations(DonationTotals):
+    location = models.OneToOneField(Location, on_delete=models.CASCADE, related_name='donation_totals')
+
+    class Meta:
+        verbose_name_plural = _('city donations')
+        indexes = [
+            models.Index(fields=['-units'], name='city_donations_units_idx'),
+        ]
+
+
+class BloodStock(models.Model):
+    """Units a hospital blood bank holds of one blood group and component; see inventory.py"""
+    COMPONENT_CHOICES = (
+        ('whole_blood', 'Whole blood'),
+        ('red_cells', 'Red cells'),
+        ('platelets', 'Platelets'),
+        ('plasma', 'Plasma'),
+    )
+
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='blood_stock')
+    blood_group = models.CharField(max_length=3, choices=DonorProfile.BLOOD_GROUP_CHOICES)
+    component = models.CharField(max_length=15, choices=COMPONENT_CHOICES, default='whole_blood')
+    units = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.units} unit(s) of {self.blood_group} {self.get_component_display().lower()}"
+
+    class Meta:
+        verbose_name = _('blood stock')
+        verbose_name_plural = _('blood stock')
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'blood_group', 'component'], name='blood_stock_unique'),
+        ]
+
+
+class StockForecast(models.Model):
+    """Demand forecast for one location and blood group, rewritten nightly by inventory.forecast()"""
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='stock_forecasts')
+    blood_group = models.CharField(max_length=3, choices=DonorProfile.BLOOD_GROUP_CHOICES)
+    daily_units = models.FloatField()
+    recent_daily_units = models.FloatField()
+    peak_daily_units = models.FloatField()
+    # Whole blood in stock, or None where the location records no stock at all.
+    stock_units = models.PositiveIntegerField(null=True)
+    days_of_cover = models.FloatField(null=True)
+    shortage = models.BooleanField(default=False)
+    computed_on = models.DateField()
+
+    def __str__(self):
+        return f"{self.blood_group} at {self.location_id}: {self.daily_units:.2f} units/day"
+
+    class Meta:
+        verbose_name = _('stock forecast')
+        verbose_name_plural = _('stock forecasts')
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'blood_group'], name='stock_forecast_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['days_of_cover'], name='stock_forecast_shortage_idx', condition=models.Q(shortage=True)),
+        ]
+
+
+class ApiToken(models.Model):
+    """Bearer token for API clients without a browser session; only a digest of the token is stored"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, help_text=_('Who or what uses the token, e.g. an app or a hospital'))
+    digest = models.CharField(max_length=64, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.user})"
+
+    class Meta:
+        verbose_name = _('API token')
+        verbose_name_plural = _('API tokens')
+
+
+class AuditLog(models.Model):
+    """Summary of one bulk operation run from the admin or a management command; see operations.py"""
+    action = models.CharField(max_length=50)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='audit_logs')
+    source = models.CharField(max_length=20)
+    rows = models.PositiveIntegerField()
+    details = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.action}: {self.rows} row(s) on {self.created_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        verbose_name = _('audit log entry')
+        verbose_name_plural = _('audit log')
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='auditlog_recent_idx'),
+        ]
+
+
+class Job(models.Model):
+    """Unit of background work in the database-backed queue drained by manage.py run_workers"""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=30)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    # When a queued job may next run; for a running job, when its worker's lease expires.
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} job #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = _('job')
+        verbose_name_plural = _('jobs')
+        indexes = [
+            # Workers claim ready jobs oldest first; finished jobs stay out of the index.
+            models.Index(
+                fields=['available_at', 'id'],
+                name='job_ready_idx',
+                condition=models.Q(status__in=['queued', 'running']),
+            ),
+        ]
+
+
+class RateLimitWindow(models.Model):
+    """Attempts counted against one rate limit key in one fixed window, for ratelimit.DatabaseBackend"""
+    key = models.CharField(max_length=255)
+    # Start of the window, in whole windows since the epoch.
+    window = models.BigIntegerField()
+    hits = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key} @ {self.window}: {self.hits}"
+
+    class Meta:
+        verbose_name = _('rate limit window')
+        verbose_name_plural = _('rate limit windows')
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'window'], name='ratelimit_window_unique'),
+        ]
@@ -0,0 +1,137 @@
+"""Emergency broadcast fan-out and donor notification delivery, run by the job queue workers."""
+import sys
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import jobs
+from .matching import compatible_donors
+from .models import DonorProfile, BloodRequest
+
+FAN_OUT_BATCH_SIZE = 1000
+
+Message = namedtuple('Message', 'channel recipient subject body')
+
+
+class BaseBackend:
+    """Sends donor notifications; subclasses implement send() or override send_messages() to batch."""
+
+    def send(self, message):
+        raise NotImplementedError
+
+    def send_messages(self, messages):
+        """Send each message and return one error (or None) per message."""
+        errors = []
+        for message in messages:
+            try:
+                self.send(message)
+            except Exception as exc:
+                errors.append(exc)
+            else:
+                errors.append(None)
+        return errors
+
+
+class ConsoleBackend(BaseBackend):
+    """Writes notifications to stdout instead of sending them."""
+
+    def send(self, message):
+        sys.stdout.write(f'[{message.channel} to {message.recipient}] {message.subject}: {message.body}\n')
+
+
+class LocmemBackend(BaseBackend):
+    """Keeps sent notifications in LocmemBackend.outbox, for tests."""
+
+    outbox = []
+
+    def send(self, message):
+        self.outbox.append(message)
+
+
+def get_backend():
+    return import_string(settings.BLOODCONNECT_NOTIFICATION_BACKEND)()
+
+
+def broadcast(blood_request):
+    """Queue the fan-out for an emergency request; the web request only pays for one INSERT."""
+    transaction.on_commit(lambda: jobs.enqueue('broadcast', [{'request_id': blood_request.pk}]))
+
+
+def recipients(blood_request):
+    """Available compatible donors near an emergency request: its hospital's location, else the requester's city."""
+    donors = compatible_donors(blood_request.blood_group)
+    if blood_request.hospital_location_id:
+        return donors.filter(user__location_id=blood_request.hospital_location_id)
+    return donors.filter(user__city__iexact=blood_request.requester.city.strip())
+
+
+@jobs.handler('broadcast')
+def fan_out(payloads, worker):
+    """
+    Queue one 'notify' job per recipient of each still-pending emergency
+    request. Each request is marked broadcast in the transaction that queues
+    its jobs, so a retried batch skips the requests already fanned out
+    instead of notifying their donors twice.
+    """
+    requests = BloodRequest.objects.select_related('requester').in_bulk([p['request_id'] for p in payloads])
+    errors = [None] * len(payloads)
+    for position, payload in enumerate(payloads):
+        blood_request = requests.get(payload['request_id'])
+        if blood_request is None or blood_request.status != 'pending':
+            continue
+        donor_ids = recipients(blood_request).values_list('id', flat=True)
+        try:
+            with transaction.atomic():
+                if not BloodRequest.objects.filter(pk=blood_request.pk, broadcast_at__isnull=True).update(
+                    broadcast_at=timezone.now(),
+                ):
+                    continue
+                jobs.enqueue(
+                    'notify',
+                    ({'request_id': blood_request.pk, 'donor_id': donor_id} for donor_id in donor_ids.iterator(FAN_OUT_BATCH_SIZE)),
+                    batch_size=FAN_OUT_BATCH_SIZE,
+                )
+        except Exception as exc:
+            # Only this request's broadcast is retried; the others are done.
+            errors[position] = exc
+    return errors
+
+
+def compose(blood_request, donor):
+    """The notification for one donor: SMS when they have a phone number, email otherwise."""
+    subject = f'Emergency: {blood_request.blood_group} blood needed'
+    body = (
+        f'{blood_request.units_needed} unit(s) of {blood_request.blood_group} blood are needed at '
+        f'{blood_request.hospital_name} by {blood_request.required_date:%d %b %Y}. '
+        f'Open request #{blood_request.pk} on BloodConnect to respond.'
+    )
+    if donor.user.phone_number:
+        return Message('sms', donor.user.phone_number, subject, body)
+    return Message('email', donor.user.email, subject, body)
+
+
+@jobs.handler('notify')
+def notify(payloads, worker):
+    """Send a batch of donor notifications, rate limited per channel, skipping requests no longer pending."""
+    requests = BloodRequest.objects.in_bulk({p['request_id'] for p in payloads})
+    donors = DonorProfile.objects.select_related('user').in_bulk({p['donor_id'] for p in payloads})
+
+    errors = [None] * len(payloads)
+    by_channel = {}
+    for position, payload in enumerate(payloads):
+        blood_request = requests.get(payload['request_id'])
+        donor = donors.get(payload['donor_id'])
+        if blood_request is None or donor is None or blood_request.status != 'pending':
+            continue
+        message = compose(blood_request, donor)
+        by_channel.setdefault(message.channel, []).append((position, message))
+
+    backend = get_backend()
+    for channel, batch in by_channel.items():
+        worker.limiter.wait(channel, len(batch))
+        for (position, _), error in zip(batch, backend.send_messages([message for _, message in batch])):
+            errors[position] = error
+    return errors
@@ -0,0 +1,76 @@
+"""
+Bulk operations for operations staff: closing out blood requests and taking
+donors in or out of the pool, thousands of rows at a time.
+
+Requests move with BloodRequestQuerySet.transition(), one conditional UPDATE
+over the whole selection, so counters, events and the donation ledger follow
+as for a single request. Donor availability is one UPDATE over the whole selection.
+Nothing calls save() per row. Each operation runs in one transaction together
+with the AuditLog row that records who ran it, from where, on which criteria
+and how many rows it changed. The admin actions and ``manage.py
+expire_requests`` are thin wrappers around these functions.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AuditLog, BloodRequest, DonorProfile
+
+
+def audit(action, rows, actor=None, source='admin', **details):
+    return AuditLog.objects.create(action=action, actor=actor, source=source, rows=rows, details=details)
+
+
+def stale_requests(today=None, grace_days=0):
+    """Pending requests whose required date is more than ``grace_days`` days before ``today``."""
+    today = today or timezone.localdate()
+    return BloodRequest.objects.filter(status='pending', required_date__lt=today - timedelta(days=grace_days))
+
+
+def expire_requests(today=None, grace_days=0, actor=None, source='command'):
+    """Cancel every stale request (see stale_requests()) and return the ids cancelled."""
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        cancelled = stale_requests(today, grace_days).transition('pending', 'cancelled')
+        audit(
+            'expire_requests', len(cancelled), actor, source,
+            required_before=(today - timedelta(days=grace_days)).isoformat(),
+        )
+    return cancelled
+
+
+def transition_requests(queryset, from_status, to_status, actor=None, source='admin'):
+    """Move the requests in ``queryset`` that are in ``from_status`` to ``to_status``; return the ids moved."""
+    # Filter by id so the UPDATE does not carry the changelist's joins and ordering.
+    requests = BloodRequest.objects.filter(id__in=queryset.values('id'))
+    with transaction.atomic():
+        moved = requests.transition(from_status, to_status)
+        audit(f'{to_status}_requests', len(moved), actor, source, from_status=from_status)
+    return moved
+
+
+def set_availability(queryset, available, actor=None, source='admin', today=None):
+    """
+    Mark the donors in ``queryset`` available or unavailable and return how
+    many changed. Donors still inside their donation interval are held until
+    eligible rather than made available at once (see eligibility.py).
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    # As in transition_requests(), by id.
+    donors = DonorProfile.objects.filter(id__in=queryset.values('id'))
+    with transaction.atomic():
+        if available:
+            eligible = donors.filter(is_available=False).exclude(eligible_from__gt=today)
+            changed = eligible.update(is_available=True, held_until_eligible=False, updated_at=now)
+            changed += donors.filter(is_available=False, held_until_eligible=False, eligible_from__gt=today).update(
+                held_until_eligible=True, updated_at=now,
+            )
+        else:
+            changed = (
+                donors.filter(is_available=True).update(is_available=False, updated_at=now)
+                + donors.filter(held_until_eligible=True).update(held_until_eligible=False, updated_at=now)
+            )
+        audit('donors_available' if available else 'donors_unavailable', changed, actor, source)
+    return changed
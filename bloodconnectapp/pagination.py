@@ -0,0 +1,148 @@
+import base64
+import binascii
+import json
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a queryset ordered by a unique tuple of fields.
+
+    Each page is fetched with a ``WHERE (ordering) < (cursor) ... LIMIT n``
+    query, so deep pages cost the same as the first one and rows inserted
+    while a client is paging never shift or duplicate what it has seen.
+    The last ordering field must be unique (normally ``id``).
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj):
+        values = [field.value_to_string(obj) for field in self.fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Return the ordering values stored in ``cursor``, or None if it is malformed."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                return None
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+
+    def _seek(self, values, forward):
+        """Filter selecting rows strictly after (or before) the row with ``values``."""
+        clauses = []
+        for position, name in enumerate(self.ordering):
+            descending = name.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            equal = {self.ordering[i].lstrip('-'): values[i] for i in range(position)}
+            clauses.append(Q(**equal, **{f'{name.lstrip("-")}__{lookup}': values[position]}))
+        return reduce(lambda left, right: left | right, clauses)
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def page(self, after=None, before=None):
+        """Return the page following cursor ``after``, preceding cursor ``before``, or the first page."""
+        after_values = self.decode_cursor(after) if after else None
+        before_values = self.decode_cursor(before) if before and after_values is None else None
+
+        if before_values is not None:
+            queryset = self.queryset.filter(self._seek(before_values, forward=False))
+            rows = list(queryset.order_by(*self._reversed_ordering())[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            queryset = self.queryset
+            if after_values is not None:
+                queryset = queryset.filter(self._seek(after_values, forward=True))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = after_values is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(rows[0]) if has_previous and rows else None,
+        )
+
+
+def estimated_rows(model, using='default'):
+    """A cheap estimate of the rows in ``model``'s table, or None where the database offers none."""
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # The planner's row count, kept current by autovacuum; -1 until the table is first analyzed.
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            # Ids are handed out in order, so their range bounds the row count: two primary key lookups.
+            cursor.execute(f'SELECT (SELECT MAX({pk}) FROM {table}) - (SELECT MIN({pk}) FROM {table}) + 1')
+            return cursor.fetchone()[0] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists over tables with millions of rows.
+
+    An unfiltered list larger than BLOODCONNECT_ADMIN_COUNT_LIMIT reports the
+    database's estimate of the table size instead of running COUNT(*) over it.
+    A filtered or searched list counts at most that many matching rows, so
+    its pages stop there; narrow the filter to reach older rows.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.BLOODCONNECT_ADMIN_COUNT_LIMIT
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
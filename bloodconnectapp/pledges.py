@@ -0,0 +1,79 @@
+"""
+Multi-unit fulfilment: several donors pledge units against one blood request.
+
+BloodRequest.units_pledged counts the units promised so far. A pledge claims
+its units with one conditional UPDATE that only matches while they still fit
+(``units_pledged + units <= units_needed``), so concurrent pledges neither
+over-allocate nor lose an increment. A donor who offers more than is still
+needed is given what remains. The pledge that fills the request moves it from
+pending to accepted with BloodRequestQuerySet.transition(), so counters,
+events and the ledger follow as for any other status change.
+"""
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import counters, events
+from .models import BloodRequest, Pledge
+
+UNAVAILABLE = 'This request is no longer available.'
+ALREADY_PLEDGED = 'You have already pledged to this request.'
+
+
+class PledgeError(Exception):
+    pass
+
+
+def pledge(request_id, donor, units=1):
+    """
+    Pledge up to ``units`` units of pending request ``request_id`` from
+    ``donor``. Return ``(pledge, accepted)``: the Pledge, whose ``units`` may
+    be fewer than asked for, and whether it filled and so accepted the request.
+    Raise PledgeError if the request is not open or the donor has already
+    pledged to it.
+    """
+    pending = BloodRequest.objects.filter(id=request_id, status='pending')
+    try:
+        with transaction.atomic():
+            if Pledge.objects.filter(blood_request_id=request_id, donor=donor).exists():
+                raise PledgeError(ALREADY_PLEDGED)
+            while True:
+                counts = pending.values_list('units_needed', 'units_pledged').first()
+                if counts is None or counts[1] >= counts[0]:
+                    raise PledgeError(UNAVAILABLE)
+                granted = min(units, counts[0] - counts[1])
+                # Lost the race if another pledge took units since the read: read again and retry.
+                if pending.filter(units_pledged__lte=F('units_needed') - granted).update(
+                    units_pledged=F('units_pledged') + granted, updated_at=timezone.now(),
+                ):
+                    break
+            created = Pledge.objects.create(blood_request_id=request_id, donor=donor, units=granted)
+            filled = pending.filter(units_pledged=F('units_needed')).transition('pending', 'accepted', donor=donor)
+            if not filled:
+                # No post_save or status change to do it: drop the cached home page cards showing the old count.
+                transaction.on_commit(partial(counters.invalidate, counters.RECENT_REQUESTS))
+                transaction.on_commit(partial(events.publish_transitioned, 'pledged', [request_id]))
+    except IntegrityError:
+        # A concurrent pledge from the same donor got in first.
+        raise PledgeError(ALREADY_PLEDGED)
+    return created, bool(filled)
+
+
+def can_complete(blood_request, user):
+    """Whether ``user`` may mark ``blood_request`` completed: its requester, its donor or any donor who pledged to it."""
+    return (
+        user.id == blood_request.requester_id
+        or (blood_request.donor is not None and user.id == blood_request.donor.user_id)
+        or Pledge.objects.filter(blood_request_id=blood_request.id, donor__user=user).exists()
+    )
+
+
+def requested_units(value):
+    """Units asked for in a form or JSON value: a positive integer, or 1 when missing or invalid."""
+    try:
+        units = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return max(units, 1)
@@ -0,0 +1,95 @@
+"""
+Priority of pending blood requests: how urgently each one needs a donor.
+
+A request's score adds points for its urgency, for each day its required date
+is closer than BLOODCONNECT_PRIORITY['deadline_horizon_days'] (overdue
+requests count as due today), and for each day it has been waiting, up to a
+cap. The score is stored in BloodRequest.priority, which a partial index over
+pending requests keeps in order, so the home page and request list read the
+most critical requests first without sorting the table.
+
+``apply()`` scores a request as it is saved. The deadline and waiting points
+grow as days pass, so ``manage.py refresh_priorities`` rescores every pending
+request in one set-based UPDATE; schedule it at least daily, just after
+midnight.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from . import counters
+from .models import BloodRequest
+
+
+def _weights():
+    return settings.BLOODCONNECT_PRIORITY
+
+
+def score(urgency, required_date, created_at, today=None):
+    """The priority of a request with these values on ``today``; higher is more critical."""
+    weights = _weights()
+    today = today or timezone.localdate()
+    horizon = weights['deadline_horizon_days']
+    days_left = min(max((required_date - today).days, 0), horizon)
+    days_waiting = min(max((today - timezone.localdate(created_at)).days, 0), weights['waiting_cap_days'])
+    return (
+        weights['urgency'].get(urgency, 0)
+        + weights['deadline_points_per_day'] * (horizon - days_left)
+        + weights['waiting_points_per_day'] * days_waiting
+    )
+
+
+def apply(blood_request, today=None):
+    """Set ``blood_request.priority`` from its current values; does not save."""
+    blood_request.priority = score(
+        blood_request.urgency, blood_request.required_date, blood_request.created_at or timezone.now(), today,
+    )
+
+
+def score_expression(today=None):
+    """score() as a database expression, so every pending request is rescored by one UPDATE."""
+    weights = _weights()
+    today = today or timezone.localdate()
+    horizon = weights['deadline_horizon_days']
+    urgency = Case(
+        *[When(urgency=level, then=Value(points)) for level, points in weights['urgency'].items()],
+        default=Value(0), output_field=IntegerField(),
+    )
+    # First match wins: the nearer the required date, the more points.
+    deadline = Case(
+        *[
+            When(
+                required_date__lte=today + timedelta(days=days),
+                then=Value(weights['deadline_points_per_day'] * (horizon - days)),
+            )
+            for days in range(horizon)
+        ],
+        default=Value(0), output_field=IntegerField(),
+    )
+    # Created before the start of day ``today - days + 1``: waited at least ``days`` days.
+    waiting = Case(
+        *[
+            When(
+                created_at__lt=_midnight(today - timedelta(days=days - 1)),
+                then=Value(weights['waiting_points_per_day'] * days),
+            )
+            for days in range(weights['waiting_cap_days'], 0, -1)
+        ],
+        default=Value(0), output_field=IntegerField(),
+    )
+    return urgency + deadline + waiting
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def refresh(today=None):
+    """Rescore every pending request as of ``today`` and return how many changed."""
+    expression = score_expression(today)
+    changed = BloodRequest.objects.filter(status='pending').exclude(priority=expression).update(priority=expression)
+    if changed:
+        counters.invalidate(counters.RECENT_REQUESTS)
+    return changed
@@ -0,0 +1,124 @@
+"""
+Sliding-window rate limits for login and registration, checked before any password is hashed.
+
+Each rule in BLOODCONNECT_RATE_LIMITS allows ``limit`` attempts per ``period``
+seconds for one key, such as a client IP or an email address. Attempts are
+counted in fixed windows, and the previous window is weighted by how much of it
+still overlaps the sliding window. A key therefore costs two counters, not a
+timestamp per attempt. The counters live in the backend named by
+BLOODCONNECT_RATE_LIMIT_BACKEND: MemoryBackend counts per process, and
+DatabaseBackend shares the counts between all workers.
+"""
+import functools
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .models import RateLimitWindow
+
+# Seconds between sweeps of expired counters, per process.
+PURGE_INTERVAL = 60
+
+
+class BaseBackend:
+    """Counts attempts per key and window; subclasses implement increment() and purge()."""
+
+    def __init__(self):
+        self._next_purge = 0
+
+    def increment(self, key, window, expires):
+        """Count one attempt for ``key`` in ``window``; return the (previous window, this window) counts."""
+        raise NotImplementedError
+
+    def purge(self, now):
+        """Drop counters that expired before ``now``."""
+        raise NotImplementedError
+
+    def hit(self, key, window, expires, now):
+        if now >= self._next_purge:
+            self._next_purge = now + PURGE_INTERVAL
+            self.purge(now)
+        return self.increment(key, window, expires)
+
+
+class MemoryBackend(BaseBackend):
+    """Counters in this process only: each worker enforces the limits on its own share of the traffic."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def increment(self, key, window, expires):
+        with self._lock:
+            entry = self._counts.setdefault((key, window), [0, expires])
+            entry[0] += 1
+            previous = self._counts.get((key, window - 1))
+            return (previous[0] if previous else 0), entry[0]
+
+    def purge(self, now):
+        with self._lock:
+            self._counts = {slot: entry for slot, entry in self._counts.items() if entry[1] > now}
+
+
+class DatabaseBackend(BaseBackend):
+    """Counters in the RateLimitWindow table, shared by every worker: three small queries per attempt."""
+
+    def increment(self, key, window, expires):
+        with transaction.atomic():
+            RateLimitWindow.objects.bulk_create(
+                [RateLimitWindow(key=key, window=window, expires_at=_datetime(expires))], ignore_conflicts=True,
+            )
+            RateLimitWindow.objects.filter(key=key, window=window).update(hits=F('hits') + 1)
+            counts = dict(
+                RateLimitWindow.objects.filter(key=key, window__in=[window - 1, window]).values_list('window', 'hits')
+            )
+        return counts.get(window - 1, 0), counts[window]
+
+    def purge(self, now):
+        RateLimitWindow.objects.filter(expires_at__lte=_datetime(now)).delete()
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+@functools.lru_cache
+def _backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _backend(settings.BLOODCONNECT_RATE_LIMIT_BACKEND)
+
+
+def client_ip(request):
+    """
+    The client's address. Behind a proxy, BLOODCONNECT_CLIENT_IP_HEADER names
+    the META key it sets; the last address in it is the one the proxy added.
+    """
+    header = settings.BLOODCONNECT_CLIENT_IP_HEADER
+    if header and request.META.get(header):
+        return request.META[header].split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def attempt(rule, value, now=None):
+    """
+    Count an attempt under ``rule`` for ``value``. Return the seconds to wait
+    if the attempt is over the rule's limit, or 0 if it may go ahead.
+    """
+    limit, period = settings.BLOODCONNECT_RATE_LIMITS[rule]
+    now = time.time() if now is None else now
+    window, elapsed = divmod(now, period)
+    window = int(window)
+    previous, current = get_backend().hit(f'{rule}:{value}'[:255], window, (window + 2) * period, now)
+    if previous * (1 - elapsed / period) + current <= limit:
+        return 0
+    return max(1, math.ceil(period - elapsed))
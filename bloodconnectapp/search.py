@@ -0,0 +1,150 @@
+"""
+Full-text search over blood requests: hospital, reason and requester name.
+
+The index lives in its own table, created by migration 0007_request_search.
+On SQLite it is an FTS5 table keyed by the request id. On PostgreSQL it is a table of weighted
+``tsvector`` documents with a GIN index. Signal receivers re-index a request
+when it or its requester is saved, with one INSERT ... SELECT, and
+``manage.py rebuild_search_index`` fills the index for existing rows. On other
+databases searches fall back to ``icontains``. Requester email addresses are
+left out of the index, since anyone can search the public request list.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLE = 'bloodconnectapp_requestsearch'
+
+_DOCUMENT_SOURCE = (
+    'FROM bloodconnectapp_bloodrequest r JOIN bloodconnectapp_user u ON u.id = r.requester_id WHERE {where}'
+)
+
+SQLITE = {
+    'delete': f'DELETE FROM {TABLE} WHERE rowid IN (SELECT r.id FROM bloodconnectapp_bloodrequest r WHERE {{where}})',
+    'insert': (
+        f"INSERT INTO {TABLE} (rowid, hospital, reason, requester) "
+        "SELECT r.id, r.hospital_name || ' ' || r.hospital_address, r.reason, "
+        "u.first_name || ' ' || u.last_name || ' ' || u.username " + _DOCUMENT_SOURCE
+    ),
+    'remove': f'DELETE FROM {TABLE} WHERE rowid IN ({{ids}})',
+    'match': f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+    # bm25 weights per column: a hospital hit outranks a requester hit, which outranks a reason hit.
+    'ranked': (
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid IN ({{ids}}) '
+        f'ORDER BY bm25({TABLE}, 4.0, 1.0, 2.0) LIMIT %s'
+    ),
+}
+
+POSTGRESQL = {
+    'delete': None,
+    'insert': (
+        f"INSERT INTO {TABLE} (request_id, document) "
+        "SELECT r.id, "
+        "setweight(to_tsvector('simple', r.hospital_name || ' ' || r.hospital_address), 'A') || "
+        "setweight(to_tsvector('simple', concat_ws(' ', u.first_name, u.last_name, u.username)), 'B') || "
+        "setweight(to_tsvector('simple', r.reason), 'C') " + _DOCUMENT_SOURCE +
+        ' ON CONFLICT (request_id) DO UPDATE SET document = excluded.document'
+    ),
+    'remove': f'DELETE FROM {TABLE} WHERE request_id IN ({{ids}})',
+    'match': f"SELECT request_id FROM {TABLE} WHERE document @@ websearch_to_tsquery('simple', %s)",
+    'ranked': (
+        f"SELECT request_id FROM {TABLE}, websearch_to_tsquery('simple', %s) query "
+        'WHERE document @@ query AND request_id IN ({ids}) ORDER BY ts_rank(document, query) DESC LIMIT %s'
+    ),
+}
+
+BACKENDS = {'sqlite': SQLITE, 'postgresql': POSTGRESQL}
+
+
+def backend():
+    """The SQL for the current database, or None if it has no full-text index."""
+    return BACKENDS.get(connection.vendor)
+
+
+def prepare(query):
+    """Turn free text into the backend's query syntax, or None if it has no words."""
+    words = re.findall(r'\w+', query or '')
+    if not words:
+        return None
+    if connection.vendor == 'sqlite':
+        # Quote every word so FTS5 operators in user input are taken literally; the last may be a prefix.
+        return ' '.join(f'"{word}"' for word in words) + '*'
+    return ' '.join(words)
+
+
+def _execute(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def index(request_ids=None, requester_id=None):
+    """(Re-)index the given requests, a requester's requests, or every request if neither is given."""
+    sql = backend()
+    if sql is None:
+        return
+    if request_ids is not None:
+        if not request_ids:
+            return
+        where, params = f'r.id IN ({", ".join(["%s"] * len(request_ids))})', list(request_ids)
+    elif requester_id is not None:
+        where, params = 'r.requester_id = %s', [requester_id]
+    else:
+        where, params = '1 = 1', []
+    if sql['delete']:
+        _execute(sql['delete'].format(where=where), params)
+    _execute(sql['insert'].format(where=where), params)
+
+
+def remove(request_ids):
+    sql = backend()
+    if sql is not None and request_ids:
+        _execute(sql['remove'].format(ids=', '.join(['%s'] * len(request_ids))), list(request_ids))
+
+
+def rebuild():
+    """Empty the index and index every request again in one statement."""
+    if backend() is None:
+        return
+    _execute(f'DELETE FROM {TABLE}')
+    index()
+
+
+def _fallback(queryset, query):
+    words = re.findall(r'\w+', query or '')
+    condition = Q()
+    for word in words:
+        condition &= (
+            Q(hospital_name__icontains=word) | Q(reason__icontains=word) |
+            Q(requester__username__icontains=word) | Q(requester__first_name__icontains=word) |
+            Q(requester__last_name__icontains=word)
+        )
+    return queryset.filter(condition)
+
+
+def matches(queryset, query):
+    """``queryset`` narrowed to requests matching ``query``, in its own order."""
+    sql, prepared = backend(), prepare(query)
+    if prepared is None:
+        return queryset
+    if sql is None:
+        return _fallback(queryset, query)
+    return queryset.filter(id__in=RawSQL(sql['match'], [prepared]))
+
+
+def ranked(queryset, query, limit):
+    """
+    Up to ``limit`` requests from ``queryset`` matching ``query``, best match
+    first. The index match is restricted to ``queryset``'s rows in the same
+    statement, so the caller's filters apply before the limit.
+    """
+    sql, prepared = backend(), prepare(query)
+    if prepared is None or sql is None:
+        return list(matches(queryset, query).order_by('-created_at', '-id')[:limit])
+    ids, params = queryset.order_by().values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql['ranked'].format(ids=ids), [prepared, *params, limit])
+        best = [row[0] for row in cursor.fetchall()]
+    position = {request_id: n for n, request_id in enumerate(best)}
+    return sorted(queryset.filter(id__in=best), key=lambda blood_request: position[blood_request.id])
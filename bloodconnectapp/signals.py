@@ -0,0 +1,142 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, donations, eligibility, events, notifications, priority, search
+from .models import User, Location, DonorProfile, BloodRequest, location_key, request_status_changed
+
+
+@receiver(pre_save, sender=DonorProfile)
+def apply_donation_interval(sender, instance, update_fields, **kwargs):
+    if update_fields is None:
+        eligibility.apply(instance)
+
+
+@receiver(post_save, sender=DonorProfile)
+def donor_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(counters.adjust, counters.DONORS_COUNT, 1))
+
+
+@receiver(post_delete, sender=DonorProfile)
+def donor_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(counters.adjust, counters.DONORS_COUNT, -1))
+
+
+@receiver(pre_save, sender=BloodRequest)
+def apply_priority(sender, instance, update_fields, **kwargs):
+    if update_fields is None:
+        priority.apply(instance)
+
+
+@receiver(post_init, sender=BloodRequest)
+def remember_request_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status is not fetched just to be remembered.
+    instance._counted_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=BloodRequest)
+def request_saved(sender, instance, created, **kwargs):
+    old_status = None if created else instance._counted_status
+    new_status = instance.__dict__.get('status')
+    instance._counted_status = new_status
+
+    if not created and (old_status is None or new_status is None):
+        # Status was deferred when loaded, so the delta is unknown: recount on next read.
+        transaction.on_commit(partial(counters.invalidate, counters.PENDING_REQUESTS_COUNT))
+    else:
+        delta = (new_status == 'pending') - (old_status == 'pending')
+        transaction.on_commit(partial(counters.adjust, counters.PENDING_REQUESTS_COUNT, delta))
+    transaction.on_commit(partial(counters.invalidate, counters.RECENT_REQUESTS))
+    if created:
+        transaction.on_commit(partial(events.publish_request, 'created', instance))
+    elif old_status and new_status and old_status != new_status:
+        transaction.on_commit(partial(events.publish_request, new_status, instance))
+    if new_status == 'completed' and old_status != 'completed':
+        donations.record([instance.id])
+    search.index([instance.id])
+    if created and new_status == 'pending' and instance.urgency == 'emergency':
+        notifications.broadcast(instance)
+
+
+@receiver(request_status_changed, sender=BloodRequest)
+def request_transitioned(sender, from_status, to_status, ids, **kwargs):
+    delta = ((to_status == 'pending') - (from_status == 'pending')) * len(ids)
+    transaction.on_commit(partial(counters.adjust, counters.PENDING_REQUESTS_COUNT, delta))
+    transaction.on_commit(partial(counters.invalidate, counters.RECENT_REQUESTS))
+    transaction.on_commit(partial(events.publish_transitioned, to_status, ids))
+    if to_status == 'completed':
+        donations.record(ids)
+
+
+@receiver(post_delete, sender=BloodRequest)
+def request_deleted(sender, instance, **kwargs):
+    status = instance.__dict__.get('status')
+    if status is None:
+        transaction.on_commit(partial(counters.invalidate, counters.PENDING_REQUESTS_COUNT))
+    elif status == 'pending':
+        transaction.on_commit(partial(counters.adjust, counters.PENDING_REQUESTS_COUNT, -1))
+    transaction.on_commit(partial(counters.invalidate, counters.RECENT_REQUESTS))
+    search.remove([instance.id])
+
+
+# User fields shown on request cards and held in the search index.
+CARD_FIELDS = ('username', 'first_name', 'last_name', 'city')
+
+
+def _user_card_values(user):
+    """The user's CARD_FIELDS values, or None if any of them was not loaded."""
+    fields = user.__dict__
+    if any(name not in fields for name in CARD_FIELDS):
+        return None
+    return tuple(fields[name] for name in CARD_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_user_card_values(sender, instance, **kwargs):
+    instance._card_values = _user_card_values(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    # Login only touches last_login, and most profile edits leave the name and city as they were.
+    values = _user_card_values(instance)
+    unchanged = values is not None and values == instance._card_values
+    instance._card_values = values
+    if created or unchanged or (update_fields and not update_fields & set(CARD_FIELDS)):
+        return
+    transaction.on_commit(partial(counters.invalidate, counters.RECENT_REQUESTS))
+    if instance.user_type == 'receiver':
+        # The search index holds the requester's name on each of their requests.
+        search.index(requester_id=instance.id)
+        # Cached cards are keyed on updated_at: touch the pending ones so they render the new name.
+        BloodRequest.objects.filter(requester_id=instance.id, status='pending').update(updated_at=timezone.now())
+
+
+def _user_location_key(user):
+    fields = user.__dict__
+    if 'city' not in fields:
+        return None
+    return location_key(fields['city'], fields.get('state', ''), fields.get('country', ''))
+
+
+@receiver(post_init, sender=User)
+def remember_user_location_key(sender, instance, **kwargs):
+    instance._location_key = _user_location_key(instance)
+
+
+@receiver(pre_save, sender=User)
+def sync_user_location(sender, instance, update_fields, **kwargs):
+    """Point User.location at the normalized Location for the user's free-text city."""
+    if update_fields is not None:
+        # Partial saves (e.g. last_login) cannot add the location column.
+        return
+    key = _user_location_key(instance)
+    if key is None:
+        return
+    if key != instance._location_key or (instance.location_id is None and instance.city.strip()):
+        instance.location = Location.objects.resolve(instance.city, instance.state, instance.country)
+        instance._location_key = key
@@ -0,0 +1,261 @@
+"""
+Realistic synthetic data for load tests and benchmarks, written with bulk_create.
+
+``generate()`` creates receivers, donors with profiles, and blood requests in
+Indian cities. Blood groups, genders, urgencies, units and statuses follow
+plausible proportions, and requests are spread over the past ``days`` in id
+order, like rows inserted over time. Rows are written in batches, and only
+ids are kept between batches, so memory stays flat from 10k to 10M rows. The
+same seed always produces the same data.
+
+bulk_create sends no signals. So completed requests are recorded in the
+donation ledger batch by batch, and at the end donor eligibility, request
+priorities, the search index and the home page counters are brought up to date.
+"""
+import random
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters, donations, eligibility, priority, search
+from .matching import COMPATIBLE_DONORS
+from .models import User, Location, DonorProfile, BloodRequest, location_key
+
+# (city, state, latitude, longitude, relative population)
+CITIES = (
+    ('Mumbai', 'Maharashtra', 19.0760, 72.8777, 20),
+    ('Delhi', 'Delhi', 28.6139, 77.2090, 19),
+    ('Bengaluru', 'Karnataka', 12.9716, 77.5946, 12),
+    ('Hyderabad', 'Telangana', 17.3850, 78.4867, 10),
+    ('Chennai', 'Tamil Nadu', 13.0827, 80.2707, 10),
+    ('Kolkata', 'West Bengal', 22.5726, 88.3639, 10),
+    ('Pune', 'Maharashtra', 18.5204, 73.8567, 7),
+    ('Ahmedabad', 'Gujarat', 23.0225, 72.5714, 7),
+    ('Jaipur', 'Rajasthan', 26.9124, 75.7873, 4),
+    ('Lucknow', 'Uttar Pradesh', 26.8467, 80.9462, 4),
+    ('Kochi', 'Kerala', 9.9312, 76.2673, 2),
+    ('Coimbatore', 'Tamil Nadu', 11.0168, 76.9558, 2),
+    ('Madurai', 'Tamil Nadu', 9.9252, 78.1198, 2),
+    ('Vellore', 'Tamil Nadu', 12.9165, 79.1325, 1),
+)
+
+# Share of each blood group in the Indian population, in percent.
+BLOOD_GROUPS = {'O+': 32.5, 'B+': 32.1, 'A+': 21.8, 'AB+': 7.7, 'O-': 2.0, 'B-': 2.0, 'A-': 1.4, 'AB-': 0.5}
+GENDERS = {'M': 55, 'F': 44, 'O': 1}
+URGENCIES = {'normal': 70, 'urgent': 22, 'emergency': 8}
+UNITS = {1: 40, 2: 25, 3: 13, 4: 8, 5: 5, 6: 4, 7: 2, 8: 1.5, 9: 0.8, 10: 0.7}
+# Recent requests are mostly still open; older ones have mostly been completed or cancelled.
+RECENT_DAYS = 14
+RECENT_STATUSES = {'pending': 60, 'accepted': 20, 'completed': 15, 'cancelled': 5}
+OLDER_STATUSES = {'pending': 4, 'accepted': 1, 'completed': 75, 'cancelled': 20}
+
+FIRST_NAMES = (
+    'Aarav', 'Aditi', 'Anjali', 'Arjun', 'Deepa', 'Divya', 'Ganesh', 'Harini', 'Imran', 'Kavya', 'Karthik',
+    'Lakshmi', 'Manoj', 'Meena', 'Nikhil', 'Pooja', 'Priya', 'Rahul', 'Ramesh', 'Sanjay', 'Sneha', 'Suresh',
+    'Tanvi', 'Vijay', 'Zara',
+)
+LAST_NAMES = (
+    'Sharma', 'Iyer', 'Reddy', 'Nair', 'Patel', 'Gupta', 'Singh', 'Khan', 'Das', 'Menon', 'Rao', 'Joshi',
+    'Mukherjee', 'Pillai', 'Verma', 'Kumar', 'Fernandes', 'Chatterjee',
+)
+HOSPITALS = (
+    'Government General Hospital', 'Apollo Hospital', 'Fortis Hospital', 'Manipal Hospital', 'KIMS Hospital',
+    'Max Super Speciality Hospital', 'Narayana Health', 'Rainbow Children\'s Hospital', 'City Medical Centre',
+    'Medical College Hospital', 'ESI Hospital', 'Aster Hospital',
+)
+REASONS = (
+    'Surgery', 'Road accident trauma', 'Dengue with low platelets', 'Thalassemia transfusion',
+    'Childbirth complications', 'Cancer treatment', 'Kidney dialysis', 'Cardiac surgery', 'Severe anaemia',
+    'Burns treatment',
+)
+
+Summary = namedtuple('Summary', 'receivers donors requests donations')
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values set on the objects instead of now()."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Generator:
+    def __init__(self, prefix, password, days, batch_size, seed, progress):
+        self.prefix = prefix
+        self.password = make_password(password)
+        self.days = days
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.progress = progress or (lambda label, rows: None)
+        self.now = timezone.now()
+        self.today = timezone.localdate(self.now)
+
+    def choice(self, weights):
+        return self.random.choices(list(weights), weights=list(weights.values()))[0]
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def locations(self):
+        """Location ids for CITIES, creating the missing ones with their coordinates."""
+        keys = {location_key(city, state, 'India'): (city, state, lat, lon) for city, state, lat, lon, _ in CITIES}
+        Location.objects.bulk_create(
+            [
+                Location(key=key, name=city, state=state, country='India', latitude=lat, longitude=lon)
+                for key, (city, state, lat, lon) in keys.items()
+            ],
+            ignore_conflicts=True,
+        )
+        ids = dict(Location.objects.filter(key__in=keys).values_list('key', 'id'))
+        self.location_ids = [ids[key] for key in keys]
+        self.city_weights = [weight for *_, weight in CITIES]
+
+    def users(self, kind, numbers):
+        """Unsaved users of ``kind``, each paired with the index of its city in CITIES."""
+        users = []
+        for n in numbers:
+            city = self.random.choices(range(len(CITIES)), weights=self.city_weights)[0]
+            name, state = CITIES[city][:2]
+            joined = self.now - timedelta(days=self.random.uniform(0, self.days * 2))
+            users.append((city, User(
+                username=f'{self.prefix}_{kind}{n}',
+                email=f'{self.prefix}.{kind}{n}@example.com',
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                user_type=kind,
+                phone_number=f'9{self.random.randrange(10 ** 9):09d}',
+                city=name,
+                state=state,
+                country='India',
+                location_id=self.location_ids[city],
+                password=self.password,
+                date_joined=joined,
+                created_at=joined,
+                updated_at=joined,
+            )))
+        User.objects.bulk_create([user for _, user in users])
+        if users and users[0][1].pk is None:
+            # Backends that cannot return ids from a bulk insert: read them back by email.
+            ids = dict(User.objects.filter(email__in=[user.email for _, user in users]).values_list('email', 'id'))
+            for _, user in users:
+                user.pk = ids[user.email]
+        return users
+
+    def receivers(self, total):
+        self.receiver_ids, self.receiver_cities = array('q'), array('b')
+        for numbers in self.batches(total):
+            with transaction.atomic():
+                for city, user in self.users('receiver', numbers):
+                    self.receiver_ids.append(user.pk)
+                    self.receiver_cities.append(city)
+            self.progress('receivers', len(numbers))
+
+    def donors(self, total):
+        self.donor_ids = {blood_group: array('q') for blood_group in BLOOD_GROUPS}
+        for numbers in self.batches(total):
+            profiles = []
+            with transaction.atomic():
+                for _, user in self.users('donor', numbers):
+                    profile = DonorProfile(
+                        user_id=user.pk,
+                        blood_group=self.choice(BLOOD_GROUPS),
+                        gender=self.choice(GENDERS),
+                        age=self.random.randint(18, 65),
+                        is_available=self.random.random() < 0.85,
+                        created_at=user.created_at,
+                        updated_at=user.created_at,
+                    )
+                    if self.random.random() < 0.6:
+                        profile.last_donation_date = self.today - timedelta(days=self.random.randint(1, 720))
+                    eligibility.apply(profile, self.today)
+                    profiles.append(profile)
+                DonorProfile.objects.bulk_create(profiles)
+            for profile in profiles:
+                self.donor_ids[profile.blood_group].append(profile.pk)
+            self.progress('donors', len(numbers))
+
+    def donor_for(self, blood_group):
+        """A random donor whose blood group can be given to ``blood_group``, or None if there is none."""
+        candidates = [self.donor_ids[group] for group in COMPATIBLE_DONORS[blood_group] if self.donor_ids[group]]
+        if not candidates:
+            return None
+        ids = self.random.choices(candidates, weights=[len(ids) for ids in candidates])[0]
+        return ids[self.random.randrange(len(ids))]
+
+    def requests(self, total):
+        start = self.now - timedelta(days=self.days)
+        span = self.now - start
+        recorded = 0
+        for numbers in self.batches(total):
+            rows = []
+            for n in numbers:
+                created = start + span * ((n + self.random.random()) / total)
+                age = self.now - created
+                status = self.choice(RECENT_STATUSES if age.days < RECENT_DAYS else OLDER_STATUSES)
+                blood_group = self.choice(BLOOD_GROUPS)
+                donor_id = self.donor_for(blood_group) if status in ('accepted', 'completed') else None
+                if donor_id is None and status in ('accepted', 'completed'):
+                    status = 'pending'
+                requester = self.random.randrange(len(self.receiver_ids))
+                city = self.receiver_cities[requester]
+                updated = created if status == 'pending' else min(
+                    self.now, created + timedelta(hours=self.random.uniform(1, 72)),
+                )
+                units = self.choice(UNITS)
+                rows.append(BloodRequest(
+                    requester_id=self.receiver_ids[requester],
+                    blood_group=blood_group,
+                    units_needed=units,
+                    units_pledged=units if donor_id else 0,
+                    hospital_name=self.random.choice(HOSPITALS),
+                    hospital_address=f'{self.random.randint(1, 300)} Hospital Road, {CITIES[city][0]}',
+                    hospital_location_id=self.location_ids[city],
+                    reason=self.random.choice(REASONS),
+                    urgency=self.choice(URGENCIES),
+                    status=status,
+                    required_date=timezone.localdate(created) + timedelta(days=self.random.randint(0, 14)),
+                    donor_id=donor_id,
+                    created_at=created,
+                    updated_at=updated,
+                ))
+            with transaction.atomic():
+                BloodRequest.objects.bulk_create(rows)
+                recorded += len(donations.record([row.pk for row in rows if row.status == 'completed']))
+            self.progress('requests', len(numbers))
+        return recorded
+
+
+def generate(requests, donors, receivers, prefix='seed', password='bloodconnect', days=365,
+             batch_size=10000, seed=0, progress=None):
+    """
+    Write ``receivers`` receivers, ``donors`` donors and ``requests`` blood
+    requests, and return a Summary of the rows created. Every account gets the
+    password ``password``. ``progress(label, rows)`` is called after each batch.
+    """
+    generator = Generator(prefix, password, days, batch_size, seed, progress)
+    generator.locations()
+    with explicit_timestamps(User, DonorProfile, BloodRequest):
+        generator.receivers(receivers)
+        generator.donors(donors)
+        recorded = generator.requests(requests) if receivers else 0
+    eligibility.refresh(generator.today)
+    priority.refresh(generator.today)
+    search.rebuild()
+    counters.invalidate(counters.DONORS_COUNT, counters.PENDING_REQUESTS_COUNT, counters.RECENT_REQUESTS)
+    return Summary(receivers, donors, requests if receivers else 0, recorded)
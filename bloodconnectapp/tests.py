@@ -1,3 +1,1542 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    counters, donations, eligibility, events, fragments, inventory, jobs, metrics, operations, pledges, priority, ratelimit,
+)
+from .geo import donors_within, haversine_km
+from .jobs import Worker
+from .matching import COMPATIBLE_DONORS, DonorIndex, match_donors, match_requests
+from .metrics import REGISTRY
+from .models import (
+    User, Location, DonorProfile, BloodRequest, Pledge, Donation, DailyDonations, BloodGroupDonations, CityDonations,
+    BloodStock, StockForecast, Job, RateLimitWindow, AuditLog, ApiToken,
+)
+from .notifications import LocmemBackend
+from .pagination import KeysetPaginator
+
+
+def make_user(username, user_type='donor', city='Chennai', **kwargs):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='pass12345',
+        user_type=user_type,
+        city=city,
+        **kwargs
+    )
+
+
+def make_donor(username, blood_group, city='Chennai', **kwargs):
+    user = make_user(username, city=city)
+    kwargs.setdefault('gender', 'M')
+    kwargs.setdefault('age', 30)
+    return DonorProfile.objects.create(user=user, blood_group=blood_group, **kwargs)
+
+
+def make_request(requester, blood_group='A+', **kwargs):
+    kwargs.setdefault('hospital_name', 'General Hospital')
+    kwargs.setdefault('hospital_address', '1 Main Road')
+    kwargs.setdefault('reason', 'Surgery')
+    kwargs.setdefault('required_date', date.today() + timedelta(days=1))
+    return BloodRequest.objects.create(requester=requester, blood_group=blood_group, **kwargs)
+
+
+class CompatibilityTableTests(TestCase):
+    def test_universal_donor_and_recipient(self):
+        for recipient, donors in COMPATIBLE_DONORS.items():
+            self.assertIn('O-', donors, recipient)
+        self.assertEqual(set(COMPATIBLE_DONORS['AB+']), {code for code, _ in DonorProfile.BLOOD_GROUP_CHOICES})
+
+    def test_rh_negative_recipients_only_receive_negative_blood(self):
+        self.assertEqual(set(COMPATIBLE_DONORS['O-']), {'O-'})
+        self.assertEqual(set(COMPATIBLE_DONORS['A-']), {'A-', 'O-'})
+        self.assertEqual(set(COMPATIBLE_DONORS['AB-']), {'AB-', 'A-', 'B-', 'O-'})
+        self.assertEqual(set(COMPATIBLE_DONORS['B+']), {'B+', 'B-', 'O+', 'O-'})
+
+
+class DonorMatchingTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver', city='Chennai')
+        self.exact_local = make_donor('exact_local', 'A+')
+        self.universal_local = make_donor('universal_local', 'O-')
+        self.exact_remote = make_donor('exact_remote', 'A+', city='Madurai')
+        self.b_positive = make_donor('b_positive', 'B+')
+        self.unavailable = make_donor('unavailable', 'A+', is_available=False)
+
+    def test_match_donors_ranks_local_exact_matches_first(self):
+        blood_request = make_request(self.receiver, 'A+')
+        self.assertEqual(
+            match_donors(blood_request),
+            [self.exact_local, self.universal_local, self.exact_remote],
+        )
+
+    def test_match_donors_same_city_only(self):
+        blood_request = make_request(self.receiver, 'A+')
+        self.assertEqual(match_donors(blood_request, same_city_only=True), [self.exact_local, self.universal_local])
+
+    def test_longest_since_last_donation_ranks_first(self):
+        self.exact_local.last_donation_date = date.today() - timedelta(days=200)
+        self.exact_local.save()
+        recent = make_donor('recent', 'A+', last_donation_date=date.today() - timedelta(days=100))
+        blood_request = make_request(self.receiver, 'A+')
+        self.assertEqual(match_donors(blood_request, same_city_only=True, limit=2), [self.exact_local, recent])
+
+    def test_match_donors_ranks_in_the_database_and_loads_only_the_limit(self):
+        for i in range(20):
+            make_donor(f'extra{i}', 'O+', city='Madurai')
+        blood_request = BloodRequest.objects.select_related('requester__location').get(id=make_request(self.receiver, 'A+').id)
+        with CaptureQueriesContext(connection) as captured:
+            matches = match_donors(blood_request, limit=2)
+        self.assertEqual(matches, [self.exact_local, self.universal_local])
+        donor_query = captured.captured_queries[-1]['sql']
+        self.assertIn('ORDER BY', donor_query)
+        self.assertIn('LIMIT 2', donor_query)
+
+    def test_match_requests_loads_donors_in_one_query(self):
+        requests = [make_request(self.receiver, group) for group in ('A+', 'O-', 'B+')]
+        requests = BloodRequest.objects.select_related('requester__location').filter(id__in=[r.id for r in requests])
+        with self.assertNumQueries(2):
+            matches = match_requests(requests)
+        by_group = {r.blood_group: r.id for r in requests}
+        self.assertEqual(matches[by_group['O-']], [self.universal_local])
+        self.assertEqual(matches[by_group['B+']], [self.b_positive, self.universal_local])
+
+    def test_match_donors_and_match_requests_agree_on_the_same_city(self):
+        no_location = make_donor('no_location', 'A+')
+        User.objects.filter(id=no_location.user_id).update(location=None, city='CHENNAI')
+        # The Location decides, even where the free-text city has drifted from it.
+        drifted = make_donor('drifted', 'A+')
+        User.objects.filter(id=drifted.user_id).update(city='Madras')
+        blood_request = BloodRequest.objects.select_related('requester__location').get(
+            id=make_request(self.receiver, 'A+').id,
+        )
+        local = match_donors(blood_request, same_city_only=True)
+        self.assertEqual(local, [self.exact_local, no_location, drifted, self.universal_local])
+        self.assertEqual(match_requests([blood_request], same_city_only=True)[blood_request.id], local)
+        self.assertEqual(match_requests([blood_request])[blood_request.id], match_donors(blood_request))
+
+    def test_donor_index_skips_unavailable_donors(self):
+        index = DonorIndex(DonorProfile.objects.select_related('user'))
+        self.assertEqual(len(index), 4)
+        self.assertNotIn(self.unavailable, index.lookup('AB+'))
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver', city='Chennai')
+        self.requests = [make_request(self.receiver, 'O+' if i % 2 else 'A+') for i in range(7)]
+        # Force ties on created_at so the id tie-breaker matters.
+        BloodRequest.objects.update(created_at=self.requests[0].created_at)
+        self.ordering = ('-created_at', '-id')
+
+    def walk(self, queryset, per_page):
+        paginator = KeysetPaginator(queryset, self.ordering, per_page)
+        page = paginator.page()
+        seen = [r.id for r in page]
+        while page.has_next():
+            page = paginator.page(after=page.next_cursor)
+            seen.extend(r.id for r in page)
+        return seen
+
+    def test_walks_every_row_once_in_order(self):
+        expected = list(BloodRequest.objects.order_by(*self.ordering).values_list('id', flat=True))
+        self.assertEqual(self.walk(BloodRequest.objects.all(), per_page=3), expected)
+
+    def test_pages_are_stable_when_rows_arrive(self):
+        paginator = KeysetPaginator(BloodRequest.objects.all(), self.ordering, 3)
+        first = paginator.page()
+        make_request(self.receiver)
+        second = paginator.page(after=first.next_cursor)
+        self.assertEqual([r.id for r in second], [r.id for r in self.requests[3:0:-1]])
+
+    def test_previous_cursor_returns_to_the_earlier_page(self):
+        paginator = KeysetPaginator(BloodRequest.objects.all(), self.ordering, 3)
+        first = paginator.page()
+        second = paginator.page(after=first.next_cursor)
+        back = paginator.page(before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(BloodRequest.objects.all(), self.ordering, 3)
+        self.assertEqual(list(paginator.page(after='not-a-cursor')), list(paginator.page()))
+
+    def test_request_list_keeps_filters_across_pages(self):
+        url = reverse('bloodconnectapp:request_list')
+        seen = []
+        with mock.patch('bloodconnectapp.views.REQUESTS_PER_PAGE', 3):
+            response = self.client.get(url, {'blood_group': 'A+'})
+            seen.extend(response.context['requests'])
+            self.assertContains(response, 'blood_group=A%2B&amp;after=')
+            response = self.client.get(url, {'blood_group': 'A+', 'after': response.context['page'].next_cursor})
+            seen.extend(response.context['requests'])
+        self.assertFalse(response.context['page'].has_next())
+        self.assertEqual(seen, [r for r in reversed(self.requests) if r.blood_group == 'A+'])
+
+
+class CounterCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.addCleanup(cache.clear)
+
+    def assertCountersMatchDatabase(self):
+        self.assertEqual(
+            counters.cached(counters.DONORS_COUNT, lambda: None),
+            DonorProfile.objects.count(),
+        )
+        self.assertEqual(
+            counters.cached(counters.PENDING_REQUESTS_COUNT, lambda: None),
+            BloodRequest.objects.filter(status='pending').count(),
+        )
+
+    def test_warm_home_page_runs_no_queries(self):
+        make_request(self.receiver)
+        url = reverse('bloodconnectapp:home')
+        with self.assertNumQueries(3):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.context['pending_requests'], 1)
+        self.assertEqual(len(response.context['recent_requests']), 1)
+
+    def test_counters_follow_saves_and_deletes(self):
+        self.client.get(reverse('bloodconnectapp:home'))
+        with self.captureOnCommitCallbacks(execute=True):
+            donor = make_donor('donor', 'O+')
+            make_donor('other_donor', 'A+')
+            first = make_request(self.receiver)
+            second = make_request(self.receiver)
+        self.assertCountersMatchDatabase()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.status = 'cancelled'
+            first.save()
+            second.delete()
+            donor.delete()
+        self.assertCountersMatchDatabase()
+
+    def test_request_changes_refresh_recent_requests(self):
+        url = reverse('bloodconnectapp:home')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            blood_request = make_request(self.receiver)
+        self.assertEqual(list(self.client.get(url).context['recent_requests']), [blood_request])
+        with self.captureOnCommitCallbacks(execute=True):
+            blood_request.status = 'accepted'
+            blood_request.save()
+        self.assertEqual(list(self.client.get(url).context['recent_requests']), [])
+
+
+COORDINATES = {
+    'Chennai': (13.0827, 80.2707),
+    'Kanchipuram': (12.8342, 79.7036),
+    'Vellore': (12.9165, 79.1325),
+    'Madurai': (9.9252, 78.1198),
+}
+
+
+class LocationTests(TestCase):
+    def setUp(self):
+        for city, (latitude, longitude) in COORDINATES.items():
+            Location.objects.filter(pk=Location.objects.resolve(city).pk).update(latitude=latitude, longitude=longitude)
+
+    def test_users_share_a_normalized_location(self):
+        first = make_user('first', city='Chennai')
+        second = make_user('second', city='  chennai ')
+        self.assertIsNotNone(first.location)
+        self.assertEqual(first.location, second.location)
+
+        second.city = 'Vellore'
+        second.save()
+        self.assertEqual(second.location.name, 'Vellore')
+
+    def test_haversine_distance(self):
+        self.assertAlmostEqual(haversine_km(*COORDINATES['Chennai'], *COORDINATES['Kanchipuram']), 67, delta=2)
+
+    def test_donors_within_radius_nearest_first(self):
+        local = make_donor('local', 'O+', city='Chennai')
+        nearby = make_donor('nearby', 'O+', city='Kanchipuram')
+        make_donor('farther', 'O+', city='Vellore')
+        make_donor('wrong_group', 'A+', city='Chennai')
+        make_donor('unavailable', 'O+', city='Chennai', is_available=False)
+
+        self.assertEqual(donors_within(*COORDINATES['Chennai'], 25, blood_groups=['O+']), [local])
+        donors = donors_within(*COORDINATES['Chennai'], 100, blood_groups=['O+'])
+        self.assertEqual(donors, [local, nearby])
+        self.assertAlmostEqual(donors[1].distance_km, 67, delta=2)
+
+    def test_request_list_filters_by_city_and_radius(self):
+        chennai = make_request(make_user('chennai_receiver', 'receiver', city='Chennai'))
+        kanchipuram = make_request(make_user('kanchi_receiver', 'receiver', city='Kanchipuram'))
+        make_request(make_user('madurai_receiver', 'receiver', city='Madurai'))
+        call_command('backfill_locations', stdout=open(os.devnull, 'w'))
+
+        url = reverse('bloodconnectapp:request_list')
+        response = self.client.get(url, {'city': 'chennai'})
+        self.assertEqual(list(response.context['requests']), [chennai])
+        response = self.client.get(url, {'city': 'Chennai', 'radius': '100'})
+        self.assertEqual(set(response.context['requests']), {chennai, kanchipuram})
+
+    def test_backfill_links_users_requests_and_coordinates(self):
+        receiver = make_user('receiver', 'receiver', city='Coimbatore', state='TN')
+        blood_request = make_request(receiver)
+        User.objects.filter(pk=receiver.pk).update(location=None)
+        Location.objects.filter(key__startswith='coimbatore').delete()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as gazetteer:
+            gazetteer.write('city,state,country,latitude,longitude\nCoimbatore,TN,,11.0168,76.9558\n')
+        self.addCleanup(os.unlink, gazetteer.name)
+        call_command('backfill_locations', gazetteer=gazetteer.name, stdout=open(os.devnull, 'w'))
+
+        receiver.refresh_from_db()
+        blood_request.refresh_from_db()
+        self.assertEqual(str(receiver.location), 'Coimbatore, TN')
+        self.assertEqual(receiver.location.latitude, 11.0168)
+        self.assertEqual(blood_request.hospital_location, receiver.location)
+
+
+class BulkImportExportTests(TestCase):
+    def write_temp(self, suffix, content):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8') as handle:
+            handle.write(content)
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+
+    def test_import_donors_validates_and_skips_bad_rows(self):
+        make_user('taken')
+        roster = self.write_temp('.csv', (
+            'email,first_name,city,blood_group,gender,age,last_donation_date\n'
+            'asha@example.com,Asha,Chennai,O-,F,34,2026-01-05\n'
+            'ravi@example.com,Ravi, chennai ,B+,M,41,\n'
+            'teen@example.com,Teen,Chennai,A+,M,17,\n'
+            'taken@example.com,Taken,Chennai,A+,M,30,\n'
+            'asha@example.com,Again,Chennai,A+,F,30,\n'
+        ))
+        stderr = mock.Mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_donors', roster, batch_size=2, stdout=open(os.devnull, 'w'), stderr=stderr)
+
+        self.assertEqual(
+            sorted(DonorProfile.objects.values_list('user__email', 'blood_group')),
+            [('asha@example.com', 'O-'), ('ravi@example.com', 'B+')],
+        )
+        asha = DonorProfile.objects.select_related('user').get(user__email='asha@example.com')
+        self.assertEqual(asha.last_donation_date, date(2026, 1, 5))
+        self.assertFalse(asha.user.has_usable_password())
+        self.assertEqual(asha.user.location, User.objects.get(email='ravi@example.com').location)
+        errors = ' '.join(str(call.args[0]) for call in stderr.write.call_args_list)
+        self.assertIn('at least 18 years old', errors)
+        self.assertEqual(errors.count('already exists'), 2)
+
+    def test_import_jsonl_and_export_round_trip(self):
+        roster = self.write_temp('.jsonl', '{"email": "meera@example.com", "blood_group": "A+", "gender": "F", "age": 29}\n')
+        call_command('import_donors', roster, stdout=open(os.devnull, 'w'))
+        donor = DonorProfile.objects.get()
+        receiver = make_user('receiver', user_type='receiver')
+        accepted = make_request(receiver, status='accepted', donor=donor)
+        make_request(receiver, status='cancelled')
+
+        export = self.write_temp('.jsonl', '')
+        call_command('export_requests', export, status=['accepted'], stdout=open(os.devnull, 'w'))
+        with open(export, encoding='utf-8') as handle:
+            rows = [json.loads(line) for line in handle]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], accepted.id)
+        self.assertEqual((rows[0]['requester_email'], rows[0]['donor_email']), ('receiver@example.com', 'meera@example.com'))
+        self.assertEqual(rows[0]['required_date'], accepted.required_date.isoformat())
+
+        export = self.write_temp('.csv', '')
+        call_command('export_requests', export, stdout=open(os.devnull, 'w'))
+        with open(export, newline='', encoding='utf-8') as handle:
+            self.assertEqual([row['status'] for row in csv.DictReader(handle)], ['accepted', 'cancelled'])
+
+
+@override_settings(BLOODCONNECT_NOTIFICATION_BACKEND='bloodconnectapp.notifications.LocmemBackend')
+class EmergencyBroadcastTests(TestCase):
+    def setUp(self):
+        LocmemBackend.outbox.clear()
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.sms_donor = make_donor('sms_donor', 'O-')
+        User.objects.filter(pk=self.sms_donor.user_id).update(phone_number='9000000001')
+        self.email_donor = make_donor('email_donor', 'A+')
+        make_donor('incompatible', 'B+')
+        make_donor('remote', 'A+', city='Madurai')
+        make_donor('unavailable', 'A+', is_available=False)
+
+    def create_emergency(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_request(self.receiver, 'A+', urgency='emergency', hospital_location=self.receiver.location)
+
+    def test_only_emergency_requests_queue_a_broadcast(self):
+        self.client.force_login(self.receiver)
+        data = {
+            'blood_group': 'A+', 'units_needed': 2, 'hospital_name': 'City Hospital', 'hospital_address': '2 Main Road',
+            'reason': 'Accident', 'urgency': 'emergency', 'required_date': date.today().isoformat(),
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('bloodconnectapp:create_request'), data)
+            self.client.post(reverse('bloodconnectapp:create_request'), dict(data, urgency='urgent'))
+        emergency = BloodRequest.objects.get(urgency='emergency')
+        self.assertEqual(list(Job.objects.values_list('kind', 'payload')), [('broadcast', {'request_id': emergency.id})])
+
+    def test_workers_notify_compatible_local_donors(self):
+        blood_request = self.create_emergency()
+        Worker(batch_size=10).run(once=True)
+
+        self.assertEqual(
+            sorted((message.channel, message.recipient) for message in LocmemBackend.outbox),
+            [('email', 'email_donor@example.com'), ('sms', '9000000001')],
+        )
+        self.assertIn(f'#{blood_request.id}', LocmemBackend.outbox[0].body)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'done'})
+
+    def test_retried_broadcast_does_not_notify_donors_twice(self):
+        blood_request = self.create_emergency()
+        Worker(batch_size=10).run(once=True)
+        # As if the worker died before recording the broadcast as done.
+        Job.objects.filter(kind='broadcast').update(status='queued', finished_at=None)
+        Worker(batch_size=10).run(once=True)
+        self.assertEqual(Job.objects.filter(kind='notify').count(), 2)
+        self.assertEqual(len(LocmemBackend.outbox), 2)
+        self.assertIsNotNone(BloodRequest.objects.get(pk=blood_request.pk).broadcast_at)
+
+    def test_no_notifications_once_the_request_is_accepted(self):
+        blood_request = self.create_emergency()
+        worker = Worker()
+        worker.run_batch()
+        BloodRequest.objects.filter(pk=blood_request.pk).transition('pending', 'accepted', donor=self.sms_donor)
+        worker.run(once=True)
+        self.assertEqual(LocmemBackend.outbox, [])
+
+    def test_failed_notifications_are_retried_then_given_up(self):
+        self.create_emergency()
+        worker = Worker()
+        worker.run_batch()
+        with mock.patch.object(LocmemBackend, 'send', side_effect=ConnectionError('gateway down')), \
+                self.assertLogs('bloodconnectapp.jobs', 'WARNING'):
+            for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+                self.assertEqual(worker.run_batch(), 2)
+                self.assertEqual(worker.run_batch(), 0)  # backing off
+                Job.objects.filter(status='queued').update(available_at=timezone.now())
+        notify = Job.objects.filter(kind='notify')
+        self.assertEqual(set(notify.values_list('status', 'attempts', 'last_error')), {('failed', jobs.MAX_ATTEMPTS, 'gateway down')})
+
+    def test_expired_lease_is_claimed_again(self):
+        jobs.enqueue('broadcast', [{'request_id': 0}])
+        first = jobs.claim(10)
+        self.assertEqual(jobs.claim(10), [])
+        Job.objects.update(available_at=timezone.now())
+        self.assertEqual([job.id for job in jobs.claim(10)], [first[0].id])
+
+    def test_rate_limiter_spaces_out_sends(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = jobs.RateLimiter({'sms': 10}, clock=lambda: now[0], sleep=sleep)
+        limiter.wait('sms', 5)
+        limiter.wait('sms', 5)
+        limiter.wait('sms')
+        limiter.wait('email', 100)
+        self.assertEqual(sleeps, [0.5, 0.5])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        REGISTRY.clear()
+        self.addCleanup(REGISTRY.clear)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_views_are_timed_with_queries_and_templates(self):
+        make_request(make_user('receiver', user_type='receiver'))
+        self.client.get(reverse('bloodconnectapp:request_list'))
+        self.client.get(reverse('bloodconnectapp:request_list'))
+        self.client.get('/no-such-page/')
+
+        values = REGISTRY.values()
+        view = 'view="bloodconnectapp:request_list"'
+        self.assertEqual(values[(metrics.DURATION + '_count', view)], 2)
+        self.assertEqual(values[(metrics.DURATION + '_bucket', view + ',le="+Inf"')], 2)
+        self.assertEqual(values[(metrics.RESPONSES, view + ',status="2xx"')], 2)
+        self.assertEqual(values[(metrics.DB_QUERIES, view)], 2)
+        self.assertGreater(values[(metrics.TEMPLATE_SECONDS, view)], 0)
+        self.assertEqual(values[(metrics.RESPONSES, 'view="unresolved",status="4xx"')], 1)
+
+        body = self.client.get(reverse('bloodconnectapp:metrics')).content.decode()
+        self.assertIn('# TYPE bloodconnect_request_duration_seconds histogram', body)
+        self.assertIn('bloodconnect_db_queries_total{view="bloodconnectapp:request_list"} 2.0', body)
+        buckets = [line for line in body.splitlines() if line.startswith(f'{metrics.DURATION}_bucket{{{view}')]
+        self.assertEqual(len(buckets), len(metrics.BUCKETS) + 1)
+        self.assertTrue(buckets[-1].endswith('le="+Inf"} 2.0'))
+
+    @override_settings(BLOODCONNECT_METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        url = reverse('bloodconnectapp:metrics')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    def test_sqlite_sink_sums_worker_processes(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(BLOODCONNECT_METRICS_SQLITE=os.path.join(directory, 'metrics.sqlite3')):
+            workers = [metrics.Registry(), metrics.Registry()]
+            for worker in workers:
+                worker.record('bloodconnectapp:home', 200, 0.02, metrics.Sample())
+            workers[0].flush()
+            self.assertEqual(workers[1].values()[(metrics.DURATION + '_count', 'view="bloodconnectapp:home"')], 2)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver', first_name='Ravi')
+        self.donor = make_donor('donor', 'O-')
+        self.blood_request = make_request(self.receiver, 'A+', hospital_location=self.receiver.location)
+        self.detail_url = reverse('bloodconnectapp:api_request_detail', args=[self.blood_request.id])
+
+    def test_list_projects_fields_and_pages(self):
+        make_request(self.receiver, 'B+')
+        url = reverse('bloodconnectapp:api_request_list')
+        response = self.client.get(url, {'fields': 'id,blood_group,requester', 'limit': 1})
+        body = response.json()
+        self.assertEqual(list(body['results'][0]), ['id', 'blood_group', 'requester'])
+        self.assertEqual(body['results'][0]['requester'], {'id': self.receiver.id, 'name': 'Ravi', 'city': 'Chennai'})
+        response = self.client.get(url, {'fields': 'id', 'limit': 1, 'after': body['next']})
+        body = response.json()
+        self.assertEqual((body['results'], body['next']), ([{'id': self.blood_request.id}], None))
+        self.assertIsNotNone(body['previous'])
+        self.assertEqual(self.client.get(url, {'fields': 'id,phone'}).status_code, 400)
+
+    def test_conditional_get_answers_304_until_the_request_changes(self):
+        url = reverse('bloodconnectapp:api_request_list')
+        first = self.client.get(url)
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        detail = self.client.get(self.detail_url)
+        self.assertEqual(detail.json()['status'], 'pending')
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=detail['Last-Modified']).status_code, 304)
+
+        BloodRequest.objects.filter(pk=self.blood_request.pk).transition('pending', 'cancelled')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).json()['results'], [])
+        # Cancelled requests are only shown to their parties.
+        self.client.force_login(self.receiver)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail['ETag']).status_code, 200)
+
+    def test_create_and_transition(self):
+        url = reverse('bloodconnectapp:api_request_list')
+        data = {
+            'blood_group': 'O-', 'units_needed': 1, 'hospital_name': 'City Hospital', 'hospital_address': '2 Main Road',
+            'reason': 'Surgery', 'urgency': 'normal', 'required_date': date.today().isoformat(),
+        }
+        self.assertEqual(self.client.post(url, data, content_type='application/json').status_code, 401)
+        self.client.force_login(self.receiver)
+        self.assertIn('units_needed', self.client.post(url, dict(data, units_needed=50), content_type='application/json').json()['fields'])
+        response = self.client.post(url, data, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        created = BloodRequest.objects.get(pk=response.json()['id'])
+        self.assertEqual(response['Location'], reverse('bloodconnectapp:api_request_detail', args=[created.id]))
+
+        accept_url = reverse('bloodconnectapp:api_accept_request', args=[created.id])
+        self.assertEqual(self.client.post(accept_url).status_code, 403)
+        self.client.force_login(self.donor.user)
+        self.assertEqual(self.client.post(accept_url).json()['donor_id'], self.donor.id)
+        self.assertEqual(self.client.post(accept_url).status_code, 409)
+        cancel_url = reverse('bloodconnectapp:api_cancel_request', args=[created.id])
+        self.assertEqual(self.client.post(cancel_url).status_code, 403)
+        complete_url = reverse('bloodconnectapp:api_complete_request', args=[created.id])
+        self.assertEqual(self.client.post(complete_url, QUERY_STRING='fields=status').json(), {'status': 'completed'})
+        self.assertEqual(self.client.get(complete_url).status_code, 405)
+
+    def test_donor_search_by_recipient_group(self):
+        make_donor('b_positive', 'B+')
+        make_donor('remote', 'O+', city='Madurai')
+        url = reverse('bloodconnectapp:api_donors')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.receiver)
+        response = self.client.get(url, {'blood_group': 'A+', 'city': 'chennai', 'fields': 'blood_group,donor'})
+        self.assertEqual(response.json()['results'], [
+            {'blood_group': 'O-', 'donor': {'id': self.donor.user_id, 'name': 'donor', 'city': 'Chennai'}},
+        ])
+        self.assertEqual(self.client.get(url, {'blood_group': 'Z'}).status_code, 400)
+        self.client.force_login(self.donor.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_requests_that_are_not_pending_are_listed_only_to_their_parties(self):
+        completed = make_request(self.receiver, status='completed', donor=self.donor)
+        url = reverse('bloodconnectapp:api_request_list')
+        self.assertEqual(self.client.get(url, {'status': 'completed'}).status_code, 401)
+        self.client.force_login(make_user('stranger', user_type='receiver'))
+        self.assertEqual(self.client.get(url, {'status': 'completed'}).json()['results'], [])
+        for user in (self.receiver, self.donor.user):
+            self.client.force_login(user)
+            self.assertEqual([r['id'] for r in self.client.get(url, {'status': 'completed'}).json()['results']], [completed.id])
+
+    def test_closed_request_detail_is_private(self):
+        cancelled = make_request(self.receiver, status='cancelled', donor=self.donor)
+        url = reverse('bloodconnectapp:api_request_detail', args=[cancelled.id])
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(make_user('stranger', user_type='receiver'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        for user in (self.receiver, self.donor.user):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get(url).json()['donor_id'], self.donor.id)
+
+    def test_token_clients_write_without_a_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.receiver)
+        url = reverse('bloodconnectapp:api_request_list')
+        data = {
+            'blood_group': 'O-', 'units_needed': 1, 'hospital_name': 'City Hospital', 'hospital_address': '2 Main Road',
+            'reason': 'Surgery', 'urgency': 'normal', 'required_date': date.today().isoformat(),
+        }
+        self.assertEqual(client.post(url, data, content_type='application/json').status_code, 403)
+
+        out = StringIO()
+        call_command('create_api_token', self.receiver.email, '--name', 'Mobile app', stdout=out)
+        token = out.getvalue().strip()
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(url, data, content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(BloodRequest.objects.get(id=response.json()['id']).requester, self.receiver)
+        self.assertEqual(client.post(url, data, content_type='application/json', HTTP_AUTHORIZATION='Bearer nope').status_code, 401)
+        self.assertNotIn(token, str(list(ApiToken.objects.values_list('digest', flat=True))))
+
+
+def parse_event(chunk):
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+class RequestEventsTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.donor = make_donor('donor', 'A+')
+        self.url = reverse('bloodconnectapp:request_events')
+
+    def create_request(self, blood_group):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_request(self.receiver, blood_group, hospital_location=self.receiver.location)
+
+    def accept(self, blood_request):
+        with self.captureOnCommitCallbacks(execute=True):
+            BloodRequest.objects.filter(id=blood_request.id).transition('pending', 'accepted', donor=self.donor)
+
+    def test_feed_needs_an_asgi_server(self):
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    async def test_feed_streams_matching_events(self):
+        response = await self.async_client.get(self.url, {'blood_group': 'A+', 'city': 'Chennai'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+        self.assertEqual(await anext(content), b'retry: 5000\n\n')
+
+        await sync_to_async(self.create_request)('B+')
+        blood_request = await sync_to_async(self.create_request)('A+')
+        kind, data = parse_event(await anext(content))
+        self.assertEqual((kind, data['id'], data['status']), ('created', blood_request.id, 'pending'))
+
+        await sync_to_async(self.accept)(blood_request)
+        kind, data = parse_event(await anext(content))
+        self.assertEqual((kind, data['id'], data['status']), ('accepted', blood_request.id, 'accepted'))
+        await content.aclose()
+
+    async def test_reconnecting_client_replays_missed_events(self):
+        broker = events.Broker()
+        first = broker.publish('created', {'blood_group': 'A+'})
+        broker.publish('created', {'blood_group': 'B+'})
+        missed = broker.publish('created', {'blood_group': 'A+'})
+        _, backlog = broker.subscribe(events.event_filter('A+'), last_event_id=first.id)
+        self.assertEqual(backlog, [missed])
+        _, backlog = broker.subscribe(events.event_filter('A+'), last_event_id='unknown-1')
+        self.assertEqual(backlog, [])
+
+    async def test_slow_subscriber_is_disconnected_instead_of_buffering(self):
+        broker = events.Broker(queue_size=2)
+        subscription, _ = broker.subscribe(events.event_filter())
+        for _ in range(3):
+            broker.publish('created', {})
+        await asyncio.sleep(0)
+        self.assertIsNone(subscription.queue.get_nowait())
+        self.assertTrue(subscription.queue.empty())
+
+
+class EligibilityTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+
+    def test_recent_donors_are_held_until_their_interval_passes(self):
+        male = make_donor('male', 'A+', last_donation_date=self.today - timedelta(days=10))
+        female = make_donor('female', 'A+', gender='F', last_donation_date=self.today - timedelta(days=100))
+        eligible = make_donor('eligible', 'A+', last_donation_date=self.today - timedelta(days=90))
+
+        self.assertEqual(male.eligible_from, self.today + timedelta(days=80))
+        self.assertEqual(female.eligible_from, self.today + timedelta(days=20))
+        self.assertEqual([(d.is_available, d.held_until_eligible) for d in (male, female, eligible)],
+                         [(False, True), (False, True), (True, False)])
+
+        eligibility.refresh(today=self.today + timedelta(days=20))
+        self.assertEqual(
+            dict(DonorProfile.objects.values_list('user__username', 'is_available')),
+            {'male': False, 'female': True, 'eligible': True},
+        )
+
+    def test_refresh_leaves_donors_who_opted_out_unavailable(self):
+        make_donor('opted_out', 'A+', is_available=False, last_donation_date=self.today - timedelta(days=10))
+        eligibility.refresh(today=self.today + timedelta(days=365))
+        self.assertFalse(DonorProfile.objects.get().is_available)
+
+    def test_refresh_fills_in_missing_dates_with_set_based_updates(self):
+        for i in range(6):
+            make_donor(f'donor{i}', 'O+', gender='MF'[i % 2])
+        DonorProfile.objects.update(last_donation_date=self.today - timedelta(days=30), eligible_from=None)
+
+        # A savepoint pair, one SELECT for the distinct (gender, date) pairs, one UPDATE per pair and one per flip.
+        with self.assertNumQueries(7):
+            computed, held, released = eligibility.refresh(today=self.today)
+        self.assertEqual((computed, held, released), (6, 6, 0))
+        self.assertEqual(DonorProfile.objects.eligible().count(), 0)
+
+        stdout = StringIO()
+        call_command('refresh_eligibility', date=str(self.today + timedelta(days=70)), stdout=stdout)
+        self.assertIn('3 released', stdout.getvalue())
+
+    def test_held_donor_cannot_accept(self):
+        receiver = make_user('receiver', user_type='receiver')
+        blood_request = make_request(receiver)
+        donor = make_donor('donor', 'A+', last_donation_date=self.today - timedelta(days=10))
+        self.client.force_login(donor.user)
+        url = reverse('bloodconnectapp:request_detail', args=[blood_request.id])
+
+        self.assertFalse(self.client.get(url).context['can_accept'])
+        response = self.client.post(reverse('bloodconnectapp:accept_request', args=[blood_request.id]), follow=True)
+        self.assertContains(response, 'You can donate again from')
+        self.assertEqual(BloodRequest.objects.get().status, 'pending')
+
+
+class DonationLedgerTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.donor = make_donor('donor', 'O-', gender='F')
+        self.today = timezone.localdate()
+
+    def complete(self, blood_request):
+        BloodRequest.objects.filter(id=blood_request.id).transition('pending', 'accepted', donor=self.donor)
+        self.client.force_login(self.receiver)
+        self.client.get(reverse('bloodconnectapp:complete_request', args=[blood_request.id]))
+
+    def test_completion_appends_a_donation_and_updates_rollups(self):
+        first = make_request(self.receiver, 'A+', units_needed=2, hospital_location=self.receiver.location)
+        self.complete(first)
+        self.complete(make_request(self.receiver, 'AB+', units_needed=1, hospital_location=self.receiver.location))
+
+        donation = Donation.objects.get(blood_request=first)
+        self.assertEqual((donation.blood_group, donation.units, donation.donated_on), ('O-', 2, self.today))
+        self.assertEqual(DailyDonations.objects.values_list('day', 'donations', 'units').get(), (self.today, 2, 3))
+        self.assertEqual(BloodGroupDonations.objects.values_list('blood_group', 'units').get(), ('O-', 3))
+        self.assertEqual(CityDonations.objects.get().location, self.receiver.location)
+
+        self.donor.refresh_from_db()
+        self.assertEqual(self.donor.last_donation_date, self.today)
+        self.assertEqual((self.donor.is_available, self.donor.eligible_from), (False, self.today + timedelta(days=120)))
+
+    def test_statistics_read_a_fixed_number_of_rollup_rows(self):
+        for group in ('A+', 'B+', 'O+'):
+            self.complete(make_request(self.receiver, group, hospital_location=self.receiver.location))
+        with self.assertNumQueries(3):
+            stats = donations.statistics(days=7)
+        self.assertEqual(stats['totals'], {'donations': 3, 'units': 3})
+        self.assertEqual(stats['daily'][-1], (self.today, 3))
+        self.assertEqual(len(stats['daily']), 7)
+
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345', user_type='admin')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:bloodconnectapp_donation_statistics'))
+        self.assertContains(response, '3 donations, 3 units in total.')
+
+    def test_backfill_records_completed_requests_once(self):
+        requests = [make_request(self.receiver, 'A+', donor=self.donor) for _ in range(3)]
+        BloodRequest.objects.filter(id__in=[r.id for r in requests[:2]]).update(status='completed')
+        for _ in range(2):
+            call_command('backfill_donations', batch_size=1, stdout=StringIO())
+        self.assertEqual(sorted(Donation.objects.values_list('blood_request_id', flat=True)), [r.id for r in requests[:2]])
+        self.assertEqual(BloodGroupDonations.objects.get().donations, 2)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver', first_name='Priya')
+        self.apollo = make_request(self.receiver, hospital_name='Apollo Hospital', reason='Knee surgery')
+        self.mention = make_request(self.receiver, hospital_name='City Clinic', reason='Transfer from Apollo')
+        self.other = make_request(self.receiver, hospital_name='General Hospital', reason='Dengue')
+
+    def search(self, query):
+        response = self.client.get(reverse('bloodconnectapp:request_list'), {'q': query})
+        return list(response.context['requests'])
+
+    def test_request_list_ranks_hospital_matches_first(self):
+        self.assertEqual(self.search('apollo'), [self.apollo, self.mention])
+        self.assertEqual(self.search('apol'), [self.apollo, self.mention])
+        self.assertEqual(self.search('dengue hospital'), [self.other])
+        self.assertEqual(self.search('(apollo" -'), [self.apollo, self.mention])
+
+    def test_index_follows_edits_renames_and_deletes(self):
+        self.other.reason = 'Thalassemia'
+        self.other.save()
+        self.assertEqual(self.search('thalassemia'), [self.other])
+
+        self.receiver.first_name = 'Lakshmi'
+        self.receiver.save()
+        self.assertEqual(len(self.search('lakshmi')), 3)
+        self.assertEqual(self.search('priya'), [])
+
+        self.apollo.delete()
+        self.assertEqual(self.search('apollo'), [self.mention])
+
+    def test_filters_apply_before_the_result_limit(self):
+        for _ in range(5):
+            make_request(self.receiver, hospital_name='Apollo Hospital', status='completed')
+        with mock.patch('bloodconnectapp.views.SEARCH_RESULTS', 2):
+            self.assertEqual(self.search('apollo'), [self.apollo, self.mention])
+
+    def test_requester_email_is_not_searchable(self):
+        self.assertEqual(self.search(self.receiver.email), [])
+        self.assertEqual(self.search('example'), [])
+
+    def test_admin_search_and_rebuild(self):
+        BloodRequest.objects.filter(id=self.other.id).update(hospital_name='Fortis')
+        call_command('rebuild_search_index', stdout=StringIO())
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345', user_type='admin')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:bloodconnectapp_bloodrequest_changelist'), {'q': 'fortis'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.other])
+        response = self.client.get(
+            reverse('admin:bloodconnectapp_bloodrequest_changelist'), {'q': self.receiver.email},
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 3)
+
+
+class StaticFilesTests(TestCase):
+    def test_page_stylesheet_is_a_static_asset(self):
+        response = self.client.get(reverse('bloodconnectapp:home'))
+        self.assertContains(response, 'href="/static/css/base.css"')
+        self.assertNotContains(response, '<style>')
+        stylesheet = self.client.get('/static/css/base.css')
+        self.assertEqual(stylesheet.status_code, 200)
+        self.assertIn(b'--primary-color', b''.join(stylesheet.streaming_content))
+
+
+class RequestCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.receiver = make_user('receiver', user_type='receiver', first_name='Asha')
+        self.requests = [make_request(self.receiver, hospital_name=f'Hospital {i}') for i in range(3)]
+
+    def card_keys(self):
+        return [fragments.card_key(fragments.LIST_CARD, blood_request) for blood_request in self.requests]
+
+    def test_cards_are_fetched_and_stored_in_one_round_trip(self):
+        url = reverse('bloodconnectapp:request_list')
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            self.client.get(url)
+            self.assertEqual((get_many.call_count, set_many.call_count), (1, 1))
+            self.assertEqual(len(cache.get_many(self.card_keys())), 3)
+            response = self.client.get(url)
+            self.assertEqual((get_many.call_count, set_many.call_count), (3, 1))
+        self.assertContains(response, 'Hospital 2')
+        self.assertContains(response, 'Posted by Asha<')
+
+    def test_changed_request_renders_again(self):
+        url = reverse('bloodconnectapp:request_list')
+        self.client.get(url)
+        blood_request = self.requests[0]
+        blood_request.hospital_name = 'Apollo'
+        blood_request.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Apollo')
+        self.assertNotContains(response, 'Hospital 0')
+
+    def test_requester_rename_renders_their_cards_again(self):
+        url = reverse('bloodconnectapp:request_list')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.receiver.first_name = 'Meena'
+            self.receiver.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Posted by Meena<', count=3)
+
+    def test_profile_save_without_a_rename_touches_no_requests(self):
+        before = list(BloodRequest.objects.order_by('id').values_list('updated_at', flat=True))
+        receiver = User.objects.get(pk=self.receiver.pk)
+        receiver.phone_number = '9000000001'
+        with CaptureQueriesContext(connection) as captured:
+            receiver.save()
+        self.assertFalse([query for query in captured.captured_queries if 'bloodconnectapp_bloodrequest' in query['sql']])
+        self.assertEqual(list(BloodRequest.objects.order_by('id').values_list('updated_at', flat=True)), before)
+
+
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        # A fresh backend per test: no counts, and no purge scheduled.
+        ratelimit._backend.cache_clear()
+        self.addCleanup(ratelimit._backend.cache_clear)
+        self.user = make_user('receiver', user_type='receiver')
+        self.url = reverse('bloodconnectapp:login_view')
+
+    def test_attempts_over_the_limit_are_rejected_before_hashing(self):
+        limit, _ = settings.BLOODCONNECT_RATE_LIMITS['login_email']
+        with mock.patch('bloodconnectapp.views.authenticate', return_value=None) as authenticate:
+            for _ in range(limit):
+                self.assertEqual(self.client.post(self.url, {'email': 'receiver@example.com', 'password': 'x'}).status_code, 200)
+            response = self.client.post(self.url, {'email': ' Receiver@Example.com', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(authenticate.call_count, limit)
+
+    @override_settings(BLOODCONNECT_RATE_LIMITS={'register_ip': (1, 3600)})
+    def test_registrations_are_limited_per_client(self):
+        url = reverse('bloodconnectapp:register')
+        self.client.post(url, {}, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(self.client.post(url, {}, REMOTE_ADDR='10.0.0.1').status_code, 429)
+        self.assertEqual(self.client.post(url, {}, REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    @override_settings(
+        BLOODCONNECT_RATE_LIMIT_BACKEND='bloodconnectapp.ratelimit.DatabaseBackend',
+        BLOODCONNECT_RATE_LIMITS={'login_email': (2, 60)},
+    )
+    def test_database_backend_weights_the_previous_window(self):
+        attempts = [ratelimit.attempt('login_email', 'a@example.com', now=120) for _ in range(3)]
+        self.assertEqual(attempts, [0, 0, 60])
+        # Half of the previous window still counts: 3 * 0.5 + 1 > 2.
+        self.assertEqual(ratelimit.attempt('login_email', 'a@example.com', now=210), 30)
+        self.assertEqual(ratelimit.attempt('login_email', 'b@example.com', now=210), 0)
+        # Expired windows are swept at most once a minute, as a side effect of an attempt.
+        self.assertEqual(RateLimitWindow.objects.count(), 3)
+        self.assertEqual(ratelimit.attempt('login_email', 'a@example.com', now=330), 0)
+        self.assertEqual(list(RateLimitWindow.objects.values_list('key', 'window', 'hits')), [('login_email:a@example.com', 5, 1)])
+
+    def test_password_is_rehashed_when_hasher_or_cost_changes(self):
+        hashers = ['bloodconnectapp.hashers.ScryptPasswordHasher', 'bloodconnectapp.hashers.PBKDF2PasswordHasher']
+        credentials = {'email': 'receiver@example.com', 'password': 'pass12345'}
+        with override_settings(PASSWORD_HASHERS=hashers, BLOODCONNECT_PASSWORD_COST={'scrypt': {'work_factor': 2 ** 10}}):
+            self.client.post(self.url, credentials)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('scrypt$1024$'))
+            with override_settings(BLOODCONNECT_PASSWORD_COST={'scrypt': {'work_factor': 2 ** 11}}):
+                self.client.post(self.url, credentials)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$2048$'))
+
+
+class SeedCommandTests(TestCase):
+    def test_seed_writes_a_consistent_dataset(self):
+        out = StringIO()
+        call_command('seed', requests=300, donors=80, receivers=10, batch_size=100, stdout=out)
+        self.assertIn('Created 10 receivers, 80 donors and 300 blood requests', out.getvalue())
+        self.assertEqual(User.objects.filter(user_type='receiver').count(), 10)
+        self.assertEqual(DonorProfile.objects.count(), 80)
+        self.assertEqual(BloodRequest.objects.count(), 300)
+
+        requests = BloodRequest.objects.all()
+        self.assertFalse(requests.filter(hospital_location__isnull=True).exists())
+        self.assertFalse(requests.filter(status__in=['accepted', 'completed'], donor__isnull=True).exists())
+        self.assertEqual(Donation.objects.count(), requests.filter(status='completed').count())
+        # Rows are spread over the past year in id order, like real inserts.
+        created = list(requests.order_by('id').values_list('created_at', flat=True))
+        self.assertEqual(created, sorted(created))
+        self.assertGreater(created[-1] - created[0], timedelta(days=300))
+        self.assertFalse(DonorProfile.objects.filter(is_available=True, eligible_from__gt=date.today()).exists())
+        self.assertTrue(self.client.login(email='seed.receiver0@example.com', password='bloodconnect'))
+
+        with self.assertRaises(CommandError):
+            call_command('seed', requests=10, stdout=StringIO())
+
+
+class PledgeTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.blood_request = make_request(self.receiver, 'A+', units_needed=6, urgency='emergency')
+        self.donors = [make_donor(f'donor{i}', 'O+') for i in range(4)]
+
+    def pledge(self, donor, units):
+        self.client.force_login(donor.user)
+        return self.client.post(
+            reverse('bloodconnectapp:accept_request', args=[self.blood_request.id]), {'units': units}, follow=True,
+        )
+
+    def test_donors_fill_a_multi_unit_request_together(self):
+        self.assertContains(self.pledge(self.donors[0], 2), 'You have pledged 2 unit(s)')
+        self.pledge(self.donors[1], 1)
+        self.blood_request.refresh_from_db()
+        self.assertEqual((self.blood_request.status, self.blood_request.units_remaining), ('pending', 3))
+
+        # Asking for more than is left gets what remains, and closes the request.
+        self.assertContains(self.pledge(self.donors[2], 5), 'You have accepted the blood request.')
+        self.blood_request.refresh_from_db()
+        self.assertEqual((self.blood_request.status, self.blood_request.units_pledged), ('accepted', 6))
+        self.assertEqual(self.blood_request.donor, self.donors[2])
+        self.assertEqual(
+            list(self.blood_request.pledges.values_list('donor', 'units')),
+            [(self.donors[0].id, 2), (self.donors[1].id, 1), (self.donors[2].id, 3)],
+        )
+        self.assertContains(self.pledge(self.donors[3], 1), 'This request is no longer available.')
+        self.assertEqual(Pledge.objects.count(), 3)
+
+    def test_a_donor_pledges_once(self):
+        self.pledge(self.donors[0], 1)
+        self.assertFalse(self.client.get(
+            reverse('bloodconnectapp:request_detail', args=[self.blood_request.id])
+        ).context['can_accept'])
+        with self.assertRaisesMessage(pledges.PledgeError, pledges.ALREADY_PLEDGED):
+            pledges.pledge(self.blood_request.id, self.donors[0], 2)
+        self.assertEqual(BloodRequest.objects.get().units_pledged, 1)
+
+    def test_requester_sees_pledges_and_completion_holds_every_pledger(self):
+        pledges.pledge(self.blood_request.id, self.donors[0], 4)
+        self.client.force_login(self.receiver)
+        detail = self.client.get(reverse('bloodconnectapp:request_detail', args=[self.blood_request.id]))
+        self.assertContains(detail, '4 units')
+        pledges.pledge(self.blood_request.id, self.donors[1], 2)
+
+        self.client.post(reverse('bloodconnectapp:complete_request', args=[self.blood_request.id]))
+        # The ledger credits each pledger with the units they gave.
+        self.assertEqual(
+            sorted(Donation.objects.values_list('donor', 'units', 'blood_group')),
+            [(self.donors[0].id, 4, 'O+'), (self.donors[1].id, 2, 'O+')],
+        )
+        today = timezone.localdate()
+        for donor in self.donors[:2]:
+            donor.refresh_from_db()
+            self.assertEqual((donor.last_donation_date, donor.is_available), (today, False))
+
+    def test_any_pledger_can_complete_the_request(self):
+        pledges.pledge(self.blood_request.id, self.donors[0], 4)
+        pledges.pledge(self.blood_request.id, self.donors[1], 2)
+        self.client.force_login(self.donors[3].user)
+        complete_url = reverse('bloodconnectapp:api_complete_request', args=[self.blood_request.id])
+        self.assertEqual(self.client.post(complete_url).status_code, 403)
+
+        # donors[0] pledged but is not the request's donor (the filling pledger is).
+        self.client.force_login(self.donors[0].user)
+        self.client.post(reverse('bloodconnectapp:complete_request', args=[self.blood_request.id]))
+        self.assertEqual(BloodRequest.objects.get().status, 'completed')
+
+    def test_a_pledger_can_complete_through_the_api(self):
+        pledges.pledge(self.blood_request.id, self.donors[0], 4)
+        pledges.pledge(self.blood_request.id, self.donors[1], 2)
+        self.client.force_login(self.donors[0].user)
+        response = self.client.post(reverse('bloodconnectapp:api_complete_request', args=[self.blood_request.id]))
+        self.assertEqual((response.status_code, response.json()['status']), (200, 'completed'))
+
+    def test_partial_pledge_refreshes_cached_home_cards(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.assertNotContains(self.client.get(reverse('bloodconnectapp:home')), 'still open')
+        with self.captureOnCommitCallbacks(execute=True):
+            pledges.pledge(self.blood_request.id, self.donors[0], 2)
+        self.assertContains(self.client.get(reverse('bloodconnectapp:home')), '4 still open')
+
+    def test_api_pledges_units_from_the_body(self):
+        self.client.force_login(self.donors[0].user)
+        url = reverse('bloodconnectapp:api_accept_request', args=[self.blood_request.id])
+        response = self.client.post(url, {'units': 4}, content_type='application/json')
+        self.assertEqual(
+            (response.json()['status'], response.json()['units_pledged'], response.json()['donor_id']), ('pending', 4, None),
+        )
+        self.assertEqual(self.client.post(url, {'units': 1}, content_type='application/json').status_code, 409)
+
+
+class PriorityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.today = timezone.localdate()
+
+    def test_emergency_due_today_outranks_newer_normal_request(self):
+        emergency = make_request(self.receiver, urgency='emergency', required_date=self.today)
+        make_request(self.receiver, urgency='normal', required_date=self.today + timedelta(days=10))
+        make_request(self.receiver, urgency='urgent', required_date=self.today + timedelta(days=30))
+
+        response = self.client.get(reverse('bloodconnectapp:request_list'))
+        self.assertEqual(response.context['requests'][0], emergency)
+        newest = self.client.get(reverse('bloodconnectapp:request_list'), {'sort': 'newest'})
+        self.assertEqual(newest.context['requests'][-1], emergency)
+        self.assertEqual(self.client.get(reverse('bloodconnectapp:home')).context['recent_requests'][0], emergency)
+
+    def test_refresh_matches_the_python_score(self):
+        now = timezone.now()
+        for i, urgency in enumerate(['normal', 'urgent', 'emergency'] * 6):
+            blood_request = make_request(
+                self.receiver, urgency=urgency, required_date=self.today + timedelta(days=i * 2 - 6),
+            )
+            BloodRequest.objects.filter(id=blood_request.id).update(created_at=now - timedelta(days=i * 3, hours=i))
+        BloodRequest.objects.update(priority=0)
+
+        later = self.today + timedelta(days=5)
+        with self.assertNumQueries(1):
+            self.assertEqual(priority.refresh(later), 18)
+        for blood_request in BloodRequest.objects.all():
+            self.assertEqual(
+                blood_request.priority,
+                priority.score(blood_request.urgency, blood_request.required_date, blood_request.created_at, later),
+            )
+        self.assertEqual(priority.refresh(later), 0)
+
+        stdout = StringIO()
+        call_command('refresh_priorities', date=str(later + timedelta(days=1)), stdout=stdout)
+        self.assertIn('pending requests rescored', stdout.getvalue())
+
+    def test_migration_scores_existing_pending_requests(self):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        now = timezone.now()
+        for i, urgency in enumerate(['normal', 'urgent', 'emergency'] * 4):
+            blood_request = make_request(self.receiver, urgency=urgency, required_date=self.today + timedelta(days=i - 4))
+            BloodRequest.objects.filter(id=blood_request.id).update(created_at=now - timedelta(days=i * 4))
+        BloodRequest.objects.update(priority=0)
+        import_module('bloodconnectapp.migrations.0010_request_priority').score_pending_requests(apps, None)
+        for blood_request in BloodRequest.objects.all():
+            self.assertEqual(
+                blood_request.priority,
+                priority.score(blood_request.urgency, blood_request.required_date, blood_request.created_at),
+            )
+
+
+@override_settings(BLOODCONNECT_FORECAST={'history_days': 60, 'window_days': 28, 'recent_days': 7, 'shortage_days': 3})
+class InventoryTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.location = self.receiver.location
+        self.today = timezone.localdate()
+
+    def request_on(self, day, blood_group='A+', units=1, location=None, status='pending'):
+        blood_request = make_request(
+            self.receiver, blood_group, units_needed=units, hospital_location=location or self.location, status=status,
+        )
+        created = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+        BloodRequest.objects.filter(id=blood_request.id).update(created_at=created)
+
+    def test_completed_requests_are_issued_from_stock_for_units_no_donor_gave(self):
+        donor = make_donor('donor', 'O-')
+        BloodStock.objects.create(location=self.location, blood_group='A+', units=10)
+        BloodStock.objects.create(location=self.location, blood_group='A+', component='plasma', units=10)
+        stock = lambda: BloodStock.objects.get(component='whole_blood').units
+
+        # Donor-supplied: the ledger has the units, the bank is not drawn on.
+        donated = make_request(self.receiver, 'A+', units_needed=2, hospital_location=self.location)
+        BloodRequest.objects.filter(id=donated.id).transition('pending', 'accepted', donor=donor)
+        BloodRequest.objects.filter(id=donated.id).transition('accepted', 'completed')
+        self.assertEqual((Donation.objects.get().units, stock()), (2, 10))
+
+        # Fulfilled from stock by staff: all of it comes from the bank.
+        supplied = make_request(self.receiver, 'A+', units_needed=3, hospital_location=self.location)
+        operations.transition_requests(BloodRequest.objects.filter(id=supplied.id), 'pending', 'completed')
+        self.assertEqual((BloodRequest.objects.get(id=supplied.id).units_from_stock, stock()), (3, 7))
+
+        # Partly pledged, the rest from stock; recording again issues nothing more.
+        mixed = make_request(self.receiver, 'A+', units_needed=4, hospital_location=self.location)
+        pledges.pledge(mixed.id, donor, 1)
+        BloodRequest.objects.filter(id=mixed.id).transition('pending', 'completed')
+        donations.record([mixed.id, supplied.id])
+        self.assertEqual(list(Donation.objects.filter(blood_request=mixed).values_list('donor', 'units')), [(donor.id, 1)])
+        self.assertEqual((BloodRequest.objects.get(id=mixed.id).units_from_stock, stock()), (3, 4))
+        self.assertEqual(BloodStock.objects.get(component='plasma').units, 10)
+
+    def test_forecast_flags_groups_with_little_cover(self):
+        # A+: one unit a day for 60 days, then three a day this week. B+: one unit every other day.
+        for n in range(60):
+            day = self.today - timedelta(days=n)
+            self.request_on(day, units=3 if n < 7 else 1)
+            if n % 2 == 0:
+                self.request_on(day, 'B+')
+        self.request_on(self.today, 'A+', units=5, status='cancelled')
+        self.request_on(self.today - timedelta(days=90), 'A+', units=50)
+        elsewhere = Location.objects.resolve('Madurai')
+        self.request_on(self.today, 'O+', location=elsewhere)
+        BloodStock.objects.create(location=self.location, blood_group='A+', units=6)
+        BloodStock.objects.create(location=self.location, blood_group='B+', units=6)
+
+        forecasts = {(f.location_id, f.blood_group): f for f in inventory.forecast(self.today)}
+        a_pos = forecasts[self.location.id, 'A+']
+        self.assertAlmostEqual(a_pos.daily_units, (7 * 3 + 21) / 28, places=3)
+        self.assertEqual((a_pos.recent_daily_units, a_pos.stock_units, a_pos.days_of_cover), (3, 6, 2))
+        self.assertTrue(a_pos.shortage)
+        b_pos = forecasts[self.location.id, 'B+']
+        self.assertEqual((b_pos.daily_units, b_pos.shortage), (0.5, False))
+        self.assertAlmostEqual(b_pos.days_of_cover, 6 / (4 / 7), places=2)
+        untracked = forecasts[elsewhere.id, 'O+']
+        self.assertEqual((untracked.stock_units, untracked.days_of_cover, untracked.shortage), (None, None, False))
+
+        self.assertEqual([f.blood_group for f in inventory.shortages()], ['A+'])
+        stdout = StringIO()
+        call_command('forecast_shortages', date=str(self.today), stdout=stdout)
+        self.assertIn('3 demand forecasts written, 1 shortages.', stdout.getvalue())
+        self.assertEqual(StockForecast.objects.count(), 3)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345', user_type='admin')
+        self.client.force_login(self.admin_user)
+        self.receiver = make_user('receiver', user_type='receiver')
+
+    def changelist(self, model, params=None):
+        url = reverse(f'admin:bloodconnectapp_{model}_changelist')
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in captured.captured_queries]
+
+    @override_settings(BLOODCONNECT_ADMIN_COUNT_LIMIT=5)
+    def test_large_tables_are_estimated_not_counted(self):
+        for i in range(12):
+            make_request(self.receiver, status='completed' if i % 3 else 'pending')
+        response, queries = self.changelist('bloodrequest')
+        self.assertEqual(response.context['cl'].result_count, 12)
+        self.assertFalse([sql for sql in queries if 'COUNT(' in sql and 'bloodconnectapp_bloodrequest' in sql])
+
+        # Filtered lists count up to the limit, and never recount the whole table.
+        response, queries = self.changelist('bloodrequest', {'status__exact': 'completed', 'within': '7'})
+        self.assertEqual(response.context['cl'].result_count, 5)
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        counts = []
+        for total in (3, 30):
+            while DonorProfile.objects.count() < total:
+                make_donor(f'donor{DonorProfile.objects.count()}', 'A+')
+                donor = DonorProfile.objects.latest('id')
+                blood_request = make_request(self.receiver, hospital_location=self.receiver.location)
+                BloodRequest.objects.filter(id=blood_request.id).transition('pending', 'accepted', donor=donor)
+                BloodRequest.objects.filter(id=blood_request.id).transition('accepted', 'completed')
+            counts.append([len(self.changelist(model)[1]) for model in ('donorprofile', 'bloodrequest', 'donation')])
+        self.assertEqual(counts[0], counts[1])
+
+    def test_prefix_search_uses_indexed_ranges(self):
+        donor = make_donor('asha', 'O+')
+        make_donor('ravi', 'O+')
+        response, queries = self.changelist('donorprofile', {'q': 'ash'})
+        self.assertEqual(list(response.context['cl'].result_list), [donor])
+        self.assertFalse([sql for sql in queries if 'LIKE' in sql])
+        response, _ = self.changelist('donorprofile', {'q': str(donor.id)})
+        self.assertIn(donor, response.context['cl'].result_list)
+
+
+class BulkOperationTests(TestCase):
+    def setUp(self):
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.today = date.today()
+
+    def test_expire_requests_cancels_stale_pending_requests_in_one_update(self):
+        stale = [make_request(self.receiver, required_date=self.today - timedelta(days=2)) for _ in range(3)]
+        current = make_request(self.receiver, required_date=self.today)
+        accepted = make_request(self.receiver, status='accepted', required_date=self.today - timedelta(days=2))
+
+        out = StringIO()
+        call_command('expire_requests', '--dry-run', stdout=out)
+        self.assertIn('3 pending requests would be cancelled', out.getvalue())
+        self.assertFalse(AuditLog.objects.exists())
+
+        with CaptureQueriesContext(connection) as captured:
+            call_command('expire_requests', stdout=out)
+        updates = [
+            query['sql'] for query in captured.captured_queries
+            if query['sql'].startswith('UPDATE "bloodconnectapp_bloodrequest"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            set(BloodRequest.objects.filter(status='cancelled').values_list('id', flat=True)), {r.id for r in stale},
+        )
+        self.assertEqual(BloodRequest.objects.get(id=current.id).status, 'pending')
+        self.assertEqual(BloodRequest.objects.get(id=accepted.id).status, 'accepted')
+        entry = AuditLog.objects.get()
+        self.assertEqual((entry.action, entry.source, entry.rows, entry.actor), ('expire_requests', 'command', 3, None))
+        self.assertEqual(entry.details, {'required_before': self.today.isoformat()})
+
+    def test_expire_requests_grace_days_and_date(self):
+        make_request(self.receiver, required_date=self.today - timedelta(days=2))
+        self.assertEqual(operations.expire_requests(grace_days=2), [])
+        with self.assertRaises(CommandError):
+            call_command('expire_requests', '--date', 'yesterday')
+        call_command('expire_requests', '--date', (self.today + timedelta(days=5)).isoformat(), stdout=StringIO())
+        self.assertFalse(BloodRequest.objects.filter(status='pending').exists())
+
+    def test_admin_actions_transition_selected_requests(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345', user_type='admin')
+        self.client.force_login(admin_user)
+        pending = make_request(self.receiver)
+        accepted = make_request(self.receiver, status='accepted', donor=make_donor('donor', 'A+'))
+        url = reverse('admin:bloodconnectapp_bloodrequest_changelist')
+        response = self.client.post(
+            url, {'action': 'cancel_pending', '_selected_action': [pending.id, accepted.id]}, follow=True,
+        )
+        self.assertContains(response, '1 pending requests cancelled.')
+        self.assertEqual(BloodRequest.objects.get(id=pending.id).status, 'cancelled')
+        self.assertEqual(BloodRequest.objects.get(id=accepted.id).status, 'accepted')
+        entry = AuditLog.objects.get()
+        self.assertEqual((entry.action, entry.source, entry.rows, entry.actor), ('cancelled_requests', 'admin', 1, admin_user))
+
+        self.client.post(url, {'action': 'complete_accepted', '_selected_action': [accepted.id]})
+        self.assertEqual(BloodRequest.objects.get(id=accepted.id).status, 'completed')
+        self.assertEqual(Donation.objects.get().blood_request_id, accepted.id)
+
+    def test_set_availability_respects_donation_interval(self):
+        available = make_donor('available', 'O+')
+        waiting = make_donor('waiting', 'O+', last_donation_date=self.today - timedelta(days=10))
+        resting = make_donor('resting', 'O+', is_available=False)
+        self.assertTrue(DonorProfile.objects.get(id=waiting.id).held_until_eligible)
+        donors = DonorProfile.objects.all()
+
+        self.assertEqual(operations.set_availability(donors, False), 2)
+        self.assertFalse(DonorProfile.objects.filter(is_available=True).exists())
+        self.assertFalse(DonorProfile.objects.filter(held_until_eligible=True).exists())
+
+        self.assertEqual(operations.set_availability(donors, True), 3)
+        self.assertEqual(
+            set(DonorProfile.objects.filter(is_available=True).values_list('id', flat=True)), {available.id, resting.id},
+        )
+        self.assertTrue(DonorProfile.objects.get(id=waiting.id).held_until_eligible)
+        self.assertEqual(
+            list(AuditLog.objects.order_by('id').values_list('action', 'rows')),
+            [('donors_unavailable', 2), ('donors_available', 3)],
+        )
+
+
+class RequestTransitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.receiver = make_user('receiver', user_type='receiver')
+        self.donor = make_donor('donor', 'A+')
+        self.blood_request = make_request(self.receiver)
+
+    def test_accept_complete_flow(self):
+        self.client.force_login(self.donor.user)
+        self.client.get(reverse('bloodconnectapp:accept_request', args=[self.blood_request.id]))
+        self.blood_request.refresh_from_db()
+        self.assertEqual((self.blood_request.status, self.blood_request.donor), ('accepted', self.donor))
+
+        self.client.get(reverse('bloodconnectapp:complete_request', args=[self.blood_request.id]))
+        self.blood_request.refresh_from_db()
+        self.assertEqual(self.blood_request.status, 'completed')
+
+    def test_second_accept_is_rejected(self):
+        other = make_donor('other', 'O-')
+        BloodRequest.objects.filter(pk=self.blood_request.pk).transition('pending', 'accepted', donor=other)
+        self.client.force_login(self.donor.user)
+        response = self.client.get(reverse('bloodconnectapp:accept_request', args=[self.blood_request.id]), follow=True)
+        self.assertContains(response, 'This request is no longer available.')
+        self.blood_request.refresh_from_db()
+        self.assertEqual(self.blood_request.donor, other)
+
+    def test_only_requester_can_cancel(self):
+        self.client.force_login(self.donor.user)
+        self.client.get(reverse('bloodconnectapp:cancel_request', args=[self.blood_request.id]))
+        self.assertEqual(BloodRequest.objects.get().status, 'pending')
+        self.client.force_login(self.receiver)
+        self.client.get(reverse('bloodconnectapp:cancel_request', args=[self.blood_request.id]))
+        self.assertEqual(BloodRequest.objects.get().status, 'cancelled')
+
+    def test_transition_keeps_pending_counter_in_step(self):
+        counters.cached(counters.PENDING_REQUESTS_COUNT, lambda: 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = BloodRequest.objects.all().transition('pending', 'cancelled')
+        self.assertEqual(moved, [self.blood_request.id])
+        self.assertEqual(counters.cached(counters.PENDING_REQUESTS_COUNT, lambda: None), 0)
+
+
+class ConcurrentAcceptTests(TransactionTestCase):
+    """Fire many accepts at one request from separate threads and connections."""
+
+    DONORS = 100
+
+    def test_exactly_one_concurrent_accept_wins(self):
+        receiver = make_user('receiver', user_type='receiver')
+        blood_request = make_request(receiver)
+        donors = list(DonorProfile.objects.bulk_create([
+            DonorProfile(user=User.objects.create(username=f'racer{i}', email=f'racer{i}@example.com', user_type='donor'),
+                         blood_group='O-', gender='F', age=30)
+            for i in range(self.DONORS)
+        ]))
+        barrier = threading.Barrier(self.DONORS)
+        winners = []
+        errors = []
+
+        def accept(donor):
+            try:
+                barrier.wait()
+                while True:
+                    try:
+                        moved = BloodRequest.objects.filter(pk=blood_request.pk).transition(
+                            'pending', 'accepted', donor=donor,
+                        )
+                        break
+                    except OperationalError:
+                        # SQLite reports lock contention instead of waiting; retry like a client would.
+                        continue
+                if moved:
+                    winners.append(donor)
+            except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=accept, args=(donor,)) for donor in donors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(winners), 1)
+        blood_request.refresh_from_db()
+        self.assertEqual(blood_request.status, 'accepted')
+        self.assertEqual(blood_request.donor, winners[0])
+
+    def test_concurrent_pledges_never_over_allocate(self):
+        receiver = make_user('receiver', user_type='receiver')
+        blood_request = make_request(receiver, units_needed=10)
+        donors = list(DonorProfile.objects.bulk_create([
+            DonorProfile(user=User.objects.create(username=f'pledger{i}', email=f'pledger{i}@example.com', user_type='donor'),
+                         blood_group='O-', gender='F', age=30)
+            for i in range(self.DONORS)
+        ]))
+        barrier = threading.Barrier(self.DONORS)
+        granted = []
+        errors = []
+
+        def pledge(donor, units):
+            try:
+                barrier.wait()
+                while True:
+                    try:
+                        granted.append(pledges.pledge(blood_request.pk, donor, units)[0].units)
+                        break
+                    except OperationalError:
+                        continue
+                    except pledges.PledgeError:
+                        break
+            except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=pledge, args=(donor, 1 + i % 3)) for i, donor in enumerate(donors)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(granted), 10)
+        blood_request.refresh_from_db()
+        self.assertEqual((blood_request.status, blood_request.units_pledged), ('accepted', 10))
+        self.assertEqual(sum(Pledge.objects.values_list('units', flat=True)), 10)
+
+
+# Row counts the query budgets are checked at; trim locally with e.g. BLOODCONNECT_QUERY_BUDGET_SCALES=10,1000.
+QUERY_BUDGET_SCALES = tuple(
+    int(scale) for scale in os.environ.get('BLOODCONNECT_QUERY_BUDGET_SCALES', '10,1000,100000').split(',')
+)
+
+
+class QueryBudgetTests(TestCase):
+    """Every view runs a fixed number of queries, however many blood requests exist."""
+
+    def setUp(self):
+        self.receivers = [
+            make_user(f'receiver{i}', user_type='receiver', city=f'City {i}', first_name='Receiver', last_name=str(i))
+            for i in range(5)
+        ]
+        self.donor_user = make_user('donor_user')
+        self.donor = make_donor('registered_donor', 'O-')
+        for blood_group in ('A+', 'B+', 'O+'):
+            make_donor(f'donor_{blood_group}', blood_group)
+        Location.objects.update(latitude=13.0827, longitude=80.2707)
+        self.blood_request = make_request(self.receivers[0], 'A+')
+        self.seeded = 1
+
+    def seed(self, total):
+        """Top the BloodRequest table up to ``total`` rows, spread over all requesters."""
+        urgencies = [code for code, _ in BloodRequest.URGENCY_CHOICES]
+        blood_groups = [code for code, _ in DonorProfile.BLOOD_GROUP_CHOICES]
+        required_date = date.today() + timedelta(days=3)
+        rows = [
+            BloodRequest(
+                requester=self.receivers[i % len(self.receivers)],
+                blood_group=blood_groups[i % len(blood_groups)],
+                urgency=urgencies[i % len(urgencies)],
+                hospital_name=f'Hospital {i}',
+                hospital_address='1 Main Road',
+                reason='Surgery',
+                required_date=required_date,
+            )
+            for i in range(self.seeded, total)
+        ]
+        BloodRequest.objects.bulk_create(rows, batch_size=5000)
+        self.seeded = total
+
+    def budgets(self):
+        """(description, user, url, expected queries) for every view that renders for a GET."""
+        detail_url = reverse('bloodconnectapp:request_detail', args=[self.blood_request.id])
+        list_url = reverse('bloodconnectapp:request_list')
+        return [
+            ('home cold cache', None, reverse('bloodconnectapp:home'), 3),
+            ('home warm cache', None, reverse('bloodconnectapp:home'), 0),
+            ('request_list', None, list_url, 1),
+            ('request_list filtered', None, list_url + '?blood_group=A%2B&city=city&urgency=normal', 2),
+            ('request_list nearby', None, list_url + '?city=City+1&radius=25', 3),
+            ('request_detail', None, detail_url, 1),
+            ('request_detail as requester', self.receivers[0], detail_url, 4),
+            ('request_detail as donor', self.donor.user, detail_url, 4),
+            ('profile', self.receivers[0], reverse('bloodconnectapp:profile'), 3),
+            ('create_request', self.receivers[0], reverse('bloodconnectapp:create_request'), 2),
+            ('register_donor', self.donor_user, reverse('bloodconnectapp:register_donor'), 3),
+            ('register', None, reverse('bloodconnectapp:register'), 0),
+            ('login', None, reverse('bloodconnectapp:login_view'), 0),
+            ('api request list', None, reverse('bloodconnectapp:api_request_list'), 1),
+            ('api request detail', None, reverse('bloodconnectapp:api_request_detail', args=[self.blood_request.id]), 1),
+            ('api donor search', self.receivers[0], reverse('bloodconnectapp:api_donors') + '?blood_group=A%2B', 3),
+        ]
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        for scale in QUERY_BUDGET_SCALES:
+            self.seed(scale)
+            cache.clear()
+            for description, user, url, expected in self.budgets():
+                with self.subTest(scale=scale, view=description):
+                    if user is None:
+                        self.client.logout()
+                    else:
+                        self.client.force_login(user)
+                    with self.assertNumQueries(expected):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'bloodconnectapp'
 
@@ -22,8 +22,20 @@ urlpatterns = [
     # Blood Request Management
     path('requests/', views.request_list, name='request_list'),
     path('requests/create/', views.create_request, name='create_request'),
+    path('requests/events/', views.request_events, name='request_events'),
     path('requests/<int:request_id>/', views.request_detail, name='request_detail'),
     path('requests/<int:request_id>/accept/', views.accept_request, name='accept_request'),
     path('requests/<int:request_id>/complete/', views.complete_request, name='complete_request'),
     path('requests/<int:request_id>/cancel/', views.cancel_request, name='cancel_request'),
+    
+    # JSON API
+    path('api/v1/requests/', api.request_list, name='api_request_list'),
+    path('api/v1/requests/<int:request_id>/', api.request_detail, name='api_request_detail'),
+    path('api/v1/requests/<int:request_id>/accept/', api.accept_request, name='api_accept_request'),
+    path('api/v1/requests/<int:request_id>/complete/', api.complete_request, name='api_complete_request'),
+    path('api/v1/requests/<int:request_id>/cancel/', api.cancel_request, name='api_cancel_request'),
+    path('api/v1/donors/', api.donors, name='api_donors'),
+    
+    # Monitoring
+    path('metrics', views.metrics, name='metrics'),
 ] 
\ No newline at end of file
@@ -1,23 +1,65 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.http import require_http_methods
+from . import counters, eligibility, events, fragments, pledges, ratelimit, search
 from .models import User, DonorProfile, BloodRequest
 from .forms import UserRegistrationForm, UserProfileForm, DonorProfileForm, BloodRequestForm
+from .geo import location_ids_for_city
+from .matching import match_donors
+from .metrics import REGISTRY
+from .pagination import KeysetPage, KeysetPaginator
+
+REQUESTS_PER_PAGE = 20
+SEARCH_RESULTS = 50
+RADIUS_CHOICES_KM = (10, 25, 50, 100)
+# Orderings the request list offers; each is served by a partial index over pending requests.
+REQUEST_ORDERINGS = {
+    'priority': ('-priority', '-id'),
+    'newest': ('-created_at', '-id'),
+}
+EVENTS_HEARTBEAT_SECONDS = 15
+
+# Columns rendered by the request cards on the home and request list pages.
+REQUEST_CARD_FIELDS = (
+    'id', 'blood_group', 'units_needed', 'units_pledged', 'hospital_name', 'urgency', 'required_date', 'priority',
+    'created_at', 'updated_at',
+    'requester', 'requester__username', 'requester__first_name', 'requester__last_name', 'requester__city',
+)
+
+
+def pending_request_cards():
+    """Pending requests with the requester joined in and only the card columns loaded."""
+    return (
+        BloodRequest.objects.filter(status='pending')
+        .select_related('requester')
+        .only(*REQUEST_CARD_FIELDS)
+    )
 
 
 def home(request):
-    """Home page view showing donor count, pending requests, and recent requests."""
-    donors_count = DonorProfile.objects.count()
-    pending_requests = BloodRequest.objects.filter(status='pending').count()
-    recent_requests = BloodRequest.objects.filter(status='pending').order_by('-created_at')[:6]
+    """Home page view showing donor count, pending requests, and the most critical requests, served from the counter cache."""
+    donors_count = counters.cached(counters.DONORS_COUNT, DonorProfile.objects.count)
+    pending_requests = counters.cached(
+        counters.PENDING_REQUESTS_COUNT,
+        BloodRequest.objects.filter(status='pending').count,
+    )
+    recent_requests = counters.cached(
+        counters.RECENT_REQUESTS,
+        lambda: list(pending_request_cards().order_by('-priority', '-id')[:6]),
+    )
 
     context = {
         'donors_count': donors_count,
         'pending_requests': pending_requests,
-        'recent_requests': recent_requests,
+        'recent_requests': fragments.render_cards(fragments.HOME_CARD, recent_requests),
     }
     return render(request, 'bloodconnectapp/home.html', context)
 
@@ -27,6 +69,10 @@ def register(request):
     """User registration view handling donor and receiver types."""
     if request.method == 'POST':
         form = UserRegistrationForm(request.POST)
+        wait = ratelimit.attempt('register_ip', ratelimit.client_ip(request))
+        if wait:
+            messages.error(request, 'Too many registrations from your network. Please try again later.')
+            return too_many_attempts(request, 'bloodconnectapp/register.html', wait, {'form': form})
         if form.is_valid():
             user_type = form.cleaned_data.get('user_type')
             if user_type not in ['donor', 'receiver']:
@@ -41,11 +87,25 @@ def register(request):
     return render(request, 'bloodconnectapp/register.html', {'form': form})
 
 
+def too_many_attempts(request, template_name, wait, context=None):
+    """Render ``template_name`` as a 429 telling the client to retry after ``wait`` seconds."""
+    response = render(request, template_name, context, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
 def login_view(request):
-    """User login view."""
+    """User login view; attempts are rate limited per client and per email before any password is hashed."""
     if request.method == 'POST':
-        email = request.POST.get('email')
+        email = request.POST.get('email', '')
         password = request.POST.get('password')
+        wait = (
+            ratelimit.attempt('login_ip', ratelimit.client_ip(request))
+            or ratelimit.attempt('login_email', email.strip().lower())
+        )
+        if wait:
+            messages.error(request, 'Too many login attempts. Please try again later.')
+            return too_many_attempts(request, 'bloodconnectapp/login.html', wait)
         user = authenticate(request, username=email, password=password)
         if user is not None:
             login(request, user)
@@ -173,6 +233,7 @@ def create_request(request):
         if form.is_valid():
             blood_request = form.save(commit=False)
             blood_request.requester = request.user
+            blood_request.hospital_location_id = request.user.location_id
             blood_request.save()
             messages.success(request, 'Blood request created successfully!')
             return redirect('bloodconnectapp:request_detail', request_id=blood_request.id)
@@ -183,86 +244,151 @@ def create_request(request):
 
 
 def request_list(request):
-    """List all pending blood requests with optional filtering by blood group, city, and urgency."""
-    requests = BloodRequest.objects.filter(status='pending').order_by('-created_at')
+    """
+    List pending blood requests, most critical first (or newest with
+    ``sort=newest``), a page at a time, with optional filtering by blood group,
+    city, and urgency. A ``q`` search shows the best matches instead.
+    """
+    requests = pending_request_cards()
 
     blood_group = request.GET.get('blood_group')
     city = request.GET.get('city')
     urgency = request.GET.get('urgency')
+    sort = request.GET.get('sort', 'priority')
+    radius = request.GET.get('radius')
+    radius_km = int(radius) if radius and radius.isdigit() else None
 
     if blood_group:
         requests = requests.filter(blood_group=blood_group)
     if city:
-        requests = requests.filter(requester__city__icontains=city)
+        location_ids = location_ids_for_city(city, radius_km)
+        if location_ids:
+            requests = requests.filter(hospital_location__in=location_ids)
+        else:
+            # No normalized location matches yet: fall back to a substring match.
+            requests = requests.filter(requester__city__icontains=city)
     if urgency:
         requests = requests.filter(urgency=urgency)
 
+    query = request.GET.get('q', '').strip()
+    if query:
+        page = KeysetPage(search.ranked(requests, query, SEARCH_RESULTS))
+    else:
+        ordering = REQUEST_ORDERINGS.get(sort, REQUEST_ORDERINGS['priority'])
+        paginator = KeysetPaginator(requests, ordering=ordering, per_page=REQUESTS_PER_PAGE)
+        page = paginator.page(after=request.GET.get('after'), before=request.GET.get('before'))
+
+    filters = request.GET.copy()
+    filters.pop('after', None)
+    filters.pop('before', None)
+
     context = {
-        'requests': requests,
+        'requests': fragments.render_cards(fragments.LIST_CARD, page.object_list),
+        'page': page,
+        'filter_query': filters.urlencode(),
         'blood_groups': DonorProfile.BLOOD_GROUP_CHOICES,
         'urgency_levels': BloodRequest.URGENCY_CHOICES,
+        'radius_choices': RADIUS_CHOICES_KM,
+        'radius_km': radius_km,
+        'sort': sort,
+        'query': query,
     }
     return render(request, 'bloodconnectapp/request_list.html', context)
 
 
+async def request_events(request):
+    """Server-sent events for created, accepted, completed and cancelled requests, filtered like request_list."""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would hold a thread per stream; 204 tells EventSource not to reconnect.
+        return HttpResponse(status=204)
+
+    city = request.GET.get('city')
+    radius = request.GET.get('radius')
+    location_ids = None
+    if city:
+        location_ids = await sync_to_async(location_ids_for_city)(city, int(radius) if radius and radius.isdigit() else None)
+    response = StreamingHttpResponse(
+        events.stream(
+            events.event_filter(request.GET.get('blood_group'), request.GET.get('urgency'), location_ids),
+            last_event_id=request.headers.get('Last-Event-ID'),
+            heartbeat=EVENTS_HEARTBEAT_SECONDS,
+        ),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 def request_detail(request, request_id):
     """Show details of a single blood request and whether current donor can accept it."""
-    blood_request = get_object_or_404(BloodRequest, id=request_id)
+    blood_request = get_object_or_404(
+        BloodRequest.objects.select_related('requester__location', 'donor__user'), id=request_id
+    )
+    # One lookup on the unique user_id index instead of loading the donor profile.
     can_accept = (
+        blood_request.status == 'pending' and
         request.user.is_authenticated and
         request.user.user_type == 'donor' and
-        blood_request.status == 'pending' and
-        hasattr(request.user, 'donorprofile') and
-        request.user.donorprofile.is_available
+        DonorProfile.objects.eligible().filter(user=request.user).exclude(pledges__blood_request=blood_request).exists()
     )
 
+    matching_donors = []
+    if blood_request.status == 'pending' and request.user == blood_request.requester:
+        matching_donors = match_donors(blood_request, limit=10)
+
+    donor_pledges = []
+    if blood_request.units_pledged and request.user == blood_request.requester:
+        donor_pledges = blood_request.pledges.select_related('donor__user')
+
     context = {
         'request': blood_request,
         'can_accept': can_accept,
+        'matching_donors': matching_donors,
+        'pledges': donor_pledges,
     }
     return render(request, 'bloodconnectapp/request_detail.html', context)
 
 
 @login_required
 def accept_request(request, request_id):
-    """Allow donor to accept a pending blood request."""
+    """Let a donor pledge ``units`` (default 1) of a pending request; the pledge that fills it accepts it."""
     if request.user.user_type != 'donor':
         messages.error(request, 'Only donors can accept blood requests.')
         return redirect('bloodconnectapp:request_detail', request_id=request_id)
 
-    blood_request = get_object_or_404(BloodRequest, id=request_id)
-    if blood_request.status != 'pending':
-        messages.error(request, 'This request is no longer available.')
-        return redirect('bloodconnectapp:request_detail', request_id=request_id)
-
     donor_profile = get_object_or_404(DonorProfile, user=request.user)
-    if not donor_profile.is_available:
-        messages.error(request, 'You are currently marked as unavailable.')
+    error = eligibility.ineligible_reason(donor_profile)
+    if error:
+        messages.error(request, error)
         return redirect('bloodconnectapp:request_detail', request_id=request_id)
 
-    blood_request.donor = donor_profile
-    blood_request.status = 'accepted'
-    blood_request.save()
+    try:
+        pledge, accepted = pledges.pledge(request_id, donor_profile, pledges.requested_units(request.POST.get('units')))
+    except pledges.PledgeError as exc:
+        get_object_or_404(BloodRequest, id=request_id)
+        messages.error(request, str(exc))
+        return redirect('bloodconnectapp:request_detail', request_id=request_id)
 
-    messages.success(request, 'You have accepted the blood request.')
+    if accepted:
+        messages.success(request, 'You have accepted the blood request.')
+    else:
+        messages.success(request, f'You have pledged {pledge.units} unit(s) to the blood request.')
     return redirect('bloodconnectapp:request_detail', request_id=request_id)
 
 
 @login_required
 def complete_request(request, request_id):
-    """Mark a blood request as completed, authorized for requester or donor."""
-    blood_request = get_object_or_404(BloodRequest, id=request_id)
-
-    if blood_request.status != 'accepted':
-        messages.error(request, 'This request cannot be marked as completed.')
-        return redirect('bloodconnectapp:request_detail', request_id=request_id)
+    """Mark a blood request as completed, authorized for the requester, its donor or a pledger."""
+    blood_request = get_object_or_404(BloodRequest.objects.select_related('donor'), id=request_id)
 
-    if request.user != blood_request.requester and request.user != blood_request.donor.user:
+    if not pledges.can_complete(blood_request, request.user):
         messages.error(request, 'You are not authorized to complete this request.')
         return redirect('bloodconnectapp:request_detail', request_id=request_id)
 
-    blood_request.status = 'completed'
-    blood_request.save()
+    if not BloodRequest.objects.filter(id=request_id).transition('accepted', 'completed'):
+        messages.error(request, 'This request cannot be marked as completed.')
+        return redirect('bloodconnectapp:request_detail', request_id=request_id)
 
     messages.success(request, 'Blood request marked as completed.')
     return redirect('bloodconnectapp:request_detail', request_id=request_id)
@@ -273,16 +399,22 @@ def cancel_request(request, request_id):
     """Allow requester to cancel a pending blood request."""
     blood_request = get_object_or_404(BloodRequest, id=request_id)
 
-    if blood_request.status != 'pending':
-        messages.error(request, 'This request cannot be cancelled.')
-        return redirect('bloodconnectapp:request_detail', request_id=request_id)
-
-    if request.user != blood_request.requester:
+    if request.user.id != blood_request.requester_id:
         messages.error(request, 'You are not authorized to cancel this request.')
         return redirect('bloodconnectapp:request_detail', request_id=request_id)
 
-    blood_request.status = 'cancelled'
-    blood_request.save()
+    if not BloodRequest.objects.filter(id=request_id).transition('pending', 'cancelled'):
+        messages.error(request, 'This request cannot be cancelled.')
+        return redirect('bloodconnectapp:request_detail', request_id=request_id)
 
     messages.success(request, 'Blood request cancelled successfully.')
     return redirect('bloodconnectapp:request_list')
+
+
+@require_http_methods(['GET'])
+def metrics(request):
+    """Request metrics in the Prometheus text format, behind a bearer token if one is configured."""
+    token = settings.BLOODCONNECT_METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(REGISTRY.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')